@@ -0,0 +1,682 @@
+"""
+Benchmarks for the inventory manager.
+
+Run from the project folder, for example:
+
+    python benchmark.py memory --items 1000000
+    python benchmark.py stress --threads 16 --operations 5000
+    python benchmark.py import
+    python benchmark.py search --items 1000000
+    python benchmark.py suite --sizes 1000 10000 100000 1000000 --output report.json
+    python benchmark.py instrumentation
+"""
+import argparse
+import contextlib
+import datetime
+import gc
+import io
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+
+import mod
+from mod import InventoryApp, InventoryItem, InventoryManager, JsonSnapshotStorage, ShardedInventory
+
+
+def fake_catalog(item_count, seed=42):
+    """Yields (item_id, name, quantity, price) for a made-up catalog. The same seed gives the same catalog."""
+    rng = random.Random(seed)
+    for number in range(item_count):
+        item_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        yield item_id, f"product {number}", rng.randint(0, 500), round(rng.uniform(1, 999), 2)
+
+
+_BRANDS = ("Dorito's", "Acme", "Nestle", "Camlin", "Parle", "Classmate", "Reynolds", "Faber", "Tata", "Amul")
+_KINDS = ("Nachos", "Pens", "Notebook", "Stapler", "Biscuits", "Tea", "Butter", "Pencil", "Marker", "Paper")
+_VARIANTS = ("Blue", "Red", "Large", "Small", "Cool Ranch", "Classic", "A4", "Gel", "Family Pack", "Spicy")
+
+
+def fake_product_names(item_count, seed=42):
+    """Made-up but realistic looking product names ("Acme Gel Pens 1234"), all different."""
+    rng = random.Random(seed)
+    for number in range(item_count):
+        yield f"{rng.choice(_BRANDS)} {rng.choice(_VARIANTS)} {rng.choice(_KINDS)} {number}"
+
+
+class MemoryStorage:
+    """A storage backend that keeps nothing, so benchmarks measure the manager and not the disk."""
+
+    data_file = "benchmark-memory.json"
+
+    def load(self):
+        return {}
+
+    def write_change(self, items, item_id):
+        pass
+
+    def write_changes(self, items, item_ids):
+        pass
+
+    def save_all(self, items):
+        return True
+
+    def flush(self, items):
+        pass
+
+    def compact(self, items):
+        pass
+
+    def close(self, items):
+        pass
+
+
+def _latency_summary(timings):
+    timings = sorted(timings)
+    return {"p50_ms": timings[len(timings) // 2] * 1000, "p99_ms": timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000}
+
+
+def _typo(text, rng):
+    """The same text with one random letter dropped, doubled or swapped with its neighbour."""
+    position = rng.randrange(len(text) - 1)
+    mistake = rng.randrange(3)
+    if mistake == 0:
+        return text[:position] + text[position + 1:]
+    if mistake == 1:
+        return text[:position] + text[position] + text[position:]
+    return text[:position] + text[position + 1] + text[position] + text[position + 2:]
+
+
+def measure_search(item_count, queries=200):
+    """
+    Builds a manager with 'item_count' realistic names and times search_items() (substring, e.g. "ranch nach")
+    and fuzzy_search_items() (names with a typo). Reports the index build time and p50/p99 latency per query.
+    """
+    manager = InventoryManager(storage=MemoryStorage(), track_movements=False)
+    names = list(fake_product_names(item_count))
+    manager.bulk_upsert({"name": name, "quantity": 1, "price": 1.0} for name in names)
+
+    started = time.perf_counter()
+    manager.build_search_index()
+    build_seconds = time.perf_counter() - started
+
+    rng = random.Random(7)
+    substring_queries = [rng.choice(_VARIANTS).split()[-1][-4:].lower() + " " + rng.choice(_KINDS)[:4].lower() for _ in range(queries // 2)]
+    substring_queries += [rng.choice(names).split()[-1] for _ in range(queries // 2)]
+    fuzzy_queries = [_typo(rng.choice(names), rng) for _ in range(queries)]
+
+    results = {"items": item_count, "index_build_seconds": build_seconds}
+    for label, search, query_list in (("substring", manager.search_items, substring_queries),
+                                      ("fuzzy", manager.fuzzy_search_items, fuzzy_queries)):
+        timings = []
+        for query in query_list:
+            started = time.perf_counter()
+            search(query)
+            timings.append(time.perf_counter() - started)
+        results[label] = _latency_summary(timings)
+
+    print(f"Search over {item_count:,} names (index built in {build_seconds:.1f} s):")
+    for label in ("substring", "fuzzy"):
+        print(f"  {label:<10} p50 {results[label]['p50_ms']:6.1f} ms   p99 {results[label]['p99_ms']:6.1f} ms")
+    manager.close()
+    return results
+
+
+# --- The benchmark suite: every hot path on catalogs from 1,000 to 1,000,000 items ---
+
+SUITE_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+
+def write_fixture(path, item_count, seed=42):
+    """Writes an inventory.json with 'item_count' items from fake_catalog(). The same seed gives the same file."""
+    items = {item_id: InventoryItem(name, quantity, price) for item_id, name, quantity, price in fake_catalog(item_count, seed)}
+    with contextlib.redirect_stdout(io.StringIO()):
+        JsonSnapshotStorage(path).save_all(items)
+
+
+def _fixture(folder, item_count):
+    """The path of the fixture for this size in 'folder', written first if it isn't there yet."""
+    path = os.path.join(folder, f"inventory-{item_count}.json")
+    if not os.path.exists(path):
+        write_fixture(path, item_count)
+    return path
+
+
+class _FakeWidget:
+    """Stands in for labels, scrollbars and comboboxes: accepts whatever the app tells them."""
+
+    def config(self, **options):
+        pass
+
+    def set(self, *values):
+        pass
+
+    def event_generate(self, *args):
+        pass
+
+    def __setitem__(self, option, value):
+        pass
+
+
+class _FakeVariable:
+    def __init__(self, value=""):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class _FakeTreeview:
+    """
+    Enough of ttk.Treeview for the inventory table code: rows in order, keyed by iid.
+    The order is a plain list, so moving or deleting a row is one list search and shift (done in C)
+    rather than a rebuild of every row, and the fake doesn't add its own cost to what's being timed.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.order = []
+        self.focused = ""
+
+    def insert(self, parent, index, iid, values=(), tags=()):
+        self.rows[iid] = values
+        if index == "end":
+            self.order.append(iid)
+        else:
+            self.order.insert(index, iid)
+
+    def delete(self, *iids):
+        for iid in iids:
+            del self.rows[iid]
+        if len(iids) == 1:
+            self.order.remove(iids[0])
+        elif not self.rows:
+            self.order = []
+        elif iids:
+            self.order = [iid for iid in self.order if iid in self.rows]
+
+    def get_children(self, item=""):
+        return tuple(self.order)
+
+    def exists(self, iid):
+        return iid in self.rows
+
+    def item(self, iid, option=None, **changes):
+        if "values" in changes:
+            self.rows[iid] = changes["values"]
+        return self.rows[iid]
+
+    def move(self, iid, parent, index):
+        self.order.remove(iid)
+        self.order.insert(index, iid)
+
+    def focus(self, iid=None):
+        if iid is None:
+            return self.focused
+        self.focused = iid
+
+
+def headless_app(manager):
+    """
+    An InventoryApp showing 'manager' whose widgets are stand-ins, so the table code can be timed
+    without a display (no Tk window or Xvfb). Only Tkinter's constants are imported.
+    The table mode is picked the way display_mode="auto" would.
+    """
+    mod._load_gui_modules()
+    app = InventoryApp.__new__(InventoryApp)
+    app._init_table_state(manager)
+    app.item_tree = _FakeTreeview()
+    app.tree_scrollbar = _FakeWidget()
+    app.total_value_label = _FakeWidget()
+    for combobox, variable in (("delete_by_name_combobox", "delete_by_name_entry_var"),
+                               ("item_search_combobox", "item_search_entry_var"),
+                               ("update_qty_name_combobox", "update_qty_name_var")):
+        setattr(app, combobox, _FakeWidget())
+        setattr(app, variable, _FakeVariable())
+    return app
+
+
+def _time_calls(call, arguments):
+    """Calls call(*arguments[n]) for each n, timing each one. Returns the timings in seconds."""
+    timings = []
+    for call_arguments in arguments:
+        started = time.perf_counter()
+        call(*call_arguments)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _peak_memory(call, arguments):
+    """How far memory use rose above its starting point (in bytes) while making these calls."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline, _peak = tracemalloc.get_traced_memory()
+        for call_arguments in arguments:
+            call(*call_arguments)
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - baseline
+
+
+def _measure(item_count, operation, call, arguments, traced_arguments):
+    """
+    Times 'call' over 'arguments', then repeats it over 'traced_arguments' with tracemalloc on for the peak
+    memory (tracing slows everything down, so it's kept out of the timings). Returns one report row.
+    """
+    timings = _time_calls(call, arguments)
+    peak = _peak_memory(call, traced_arguments)
+    total = sum(timings)
+    row = {"items": item_count, "operation": operation, "calls": len(timings), "seconds": total,
+           "calls_per_second": len(timings) / total if total else 0.0, "peak_memory_mb": peak / 1e6}
+    row.update(_latency_summary(timings))
+    # The slowest call shows the occasional pause (a journal compaction, say) that p99 can hide.
+    row["max_ms"] = max(timings) * 1000
+    return row
+
+
+def run_suite_size(folder, item_count, calls=1000):
+    """
+    Runs every operation against a fresh copy of the fixture with 'item_count' items and returns the report rows.
+    The manager is set up like server.py's: journal storage, changes saved as they happen, movements recorded.
+    """
+    data_file = os.path.join(folder, "work", "inventory.json")
+    os.makedirs(os.path.dirname(data_file), exist_ok=True)
+    shutil.copyfile(_fixture(folder, item_count), data_file)
+    rng = random.Random(item_count)
+    # Whole-inventory operations are repeated less on big catalogs so a 1,000,000-item run stays a few minutes.
+    repeats = [()] * max(1, min(5, 1_000_000 // item_count))
+    rows = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = InventoryManager(data_file, storage_mode="journal")
+        try:
+            rows.append(_measure(item_count, "_load_data", manager._load_data, repeats, [()]))
+            rows.append(_measure(item_count, "_save_data", manager._save_data, repeats, [()]))
+
+            names = [item["name"] for item in manager.items.values()]
+            lookups = [(rng.choice(names),) for _ in range(calls)]
+            rows.append(_measure(item_count, "get_item_by_name", manager.get_item_by_name, lookups, lookups[:100]))
+
+            # Half new names, half deliveries of stock that is already there.
+            additions = [((f"benchmark item {number}" if number % 2 else rng.choice(names)), 5, 2.5) for number in range(calls)]
+            rows.append(_measure(item_count, "add_item", manager.add_item, additions,
+                                 [(f"traced item {number}", 5, 2.5) for number in range(100)]))
+
+            in_stock = [item_id for item_id, item in manager.items.items() if item["quantity"] >= 20]
+            spends = [(rng.choice(in_stock), 1) for _ in range(calls)]
+            rows.append(_measure(item_count, "record_spend", manager.record_spend, spends, spends[:100]))
+
+            app = headless_app(manager)
+            label = f"_update_item_list ({'virtual' if app.virtual_mode else 'full'})"
+            rows.append(_measure(item_count, label, app._update_item_list, repeats, [()]))
+
+            # Sorting and filtering walk the sort indexes, which every change from here on keeps up to date.
+            rows.append(_measure(item_count, "_build_sort_indexes", manager._build_sort_indexes, repeats, [()]))
+            manager.build_sort_indexes()
+            rows.append(_measure(item_count, "record_spend (sort indexes on)", manager.record_spend, spends, spends[:100]))
+            clicks = [(column,) for column in ("Quantity", "Price", "Stock Value", "ID", "Name")] * 4
+            label = f"_sort_by_column ({'virtual' if app.virtual_mode else 'full'})"
+            rows.append(_measure(item_count, label, app._sort_by_column, clicks, clicks[:5]))
+            low_stock = lambda offset: list(manager.iter_items(offset, 50, sort_key="quantity", high=10))
+            offsets = [(rng.randrange(max(1, manager.count_items("quantity", high=10))),) for _ in range(calls)]
+            rows.append(_measure(item_count, "iter_items (quantity < 10)", low_stock, offsets, offsets[:100]))
+        finally:
+            manager.close()
+    shutil.rmtree(os.path.dirname(data_file))
+    return rows
+
+
+def run_suite(sizes, calls=1000, fixtures_folder=None):
+    """
+    Runs run_suite_size() for every size and returns the report: a description of the machine and
+    one row per (size, operation) with the throughput, p50/p99 latency and peak extra memory.
+    Fixtures are generated in a temporary folder unless 'fixtures_folder' is given, where they are kept.
+    """
+    report = {"benchmark": "suite", "created": datetime.datetime.now().isoformat(timespec="seconds"),
+              "python": platform.python_version(), "platform": platform.platform(),
+              "numpy": getattr(mod._load_numpy(), "__version__", None), "calls": calls, "results": []}
+    with contextlib.ExitStack() as cleanup:
+        if fixtures_folder is None:
+            fixtures_folder = cleanup.enter_context(tempfile.TemporaryDirectory())
+        else:
+            os.makedirs(fixtures_folder, exist_ok=True)
+        for item_count in sizes:
+            print(f"{item_count:,} items:")
+            for row in run_suite_size(fixtures_folder, item_count, calls):
+                print(f"  {row['operation']:<28} {row['calls_per_second']:12,.1f} calls/s   p50 {row['p50_ms']:9.3f} ms"
+                      f"   p99 {row['p99_ms']:9.3f} ms   max {row['max_ms']:9.1f} ms   peak +{row['peak_memory_mb']:7.1f} MB")
+                report["results"].append(row)
+    return report
+
+
+def compare_reports(baseline, report):
+    """Prints how each (size, operation) in 'report' moved against the same row in 'baseline'."""
+    earlier = {(row["items"], row["operation"]): row for row in baseline["results"]}
+    print(f"Compared with the report from {baseline.get('created', 'an earlier run')} (p50 latency, lower is better):")
+    for row in report["results"]:
+        before = earlier.get((row["items"], row["operation"]))
+        if before is None or not before["p50_ms"]:
+            continue
+        change = row["p50_ms"] / before["p50_ms"] - 1
+        print(f"  {row['items']:>9,} {row['operation']:<28} {before['p50_ms']:9.3f} -> {row['p50_ms']:9.3f} ms  ({change:+.0%})")
+
+
+
+def measure_instrumentation(item_count=10_000, calls=200_000):
+    """
+    What instrumentation costs per call: get_item_by_name and record_spend on a manager that was never
+    instrumented, with instrumentation on, and after it's switched off again. Best of three rounds each.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = InventoryManager(storage=MemoryStorage(), track_movements=False)
+        manager.bulk_upsert({"name": name, "quantity": calls, "price": 1.0} for _item_id, name, _quantity, _price in fake_catalog(item_count))
+    item_ids = list(manager.items)
+    names = [manager.items[item_id]["name"] for item_id in item_ids]
+
+    def per_call_us(call, arguments):
+        best = math.inf
+        for _ in range(3):
+            best = min(best, sum(_time_calls(call, arguments)))
+        return best / len(arguments) * 1e6
+
+    rng = random.Random(3)
+    lookups = [(rng.choice(names),) for _ in range(calls)]
+    spends = [(rng.choice(item_ids), 1) for _ in range(calls // 10)]
+    results = {}
+    for label in ("off", "on", "switched off again"):
+        if label == "on":
+            manager.enable_instrumentation()
+        elif label == "switched off again":
+            manager.disable_instrumentation()
+        results[label] = {"get_item_by_name": per_call_us(manager.get_item_by_name, lookups),
+                          "record_spend": per_call_us(manager.record_spend, spends)}
+    manager.close()
+    print("Cost per call (microseconds):")
+    print(f"  {'instrumentation':<20} {'get_item_by_name':>17} {'record_spend':>13}")
+    for label, timings in results.items():
+        print(f"  {label:<20} {timings['get_item_by_name']:>17.2f} {timings['record_spend']:>13.2f}")
+    return results
+
+
+def measure_locations(location_count=8, item_count=1_000_000, workers=None):
+    """
+    Splits 'item_count' items over 'location_count' shard files and times the questions about all
+    locations (total_stock_value, global_stock) read one location after another and in the worker pool.
+    The first pooled call also starts the worker processes, so it's reported separately.
+    """
+    results = {"locations": location_count, "items": item_count}
+    with tempfile.TemporaryDirectory() as folder:
+        for number in range(location_count):
+            write_fixture(os.path.join(folder, f"store-{number}.json"), item_count // location_count, seed=number)
+        _item_id, name, _quantity, _price = next(fake_catalog(item_count // location_count, seed=0))
+
+        for label, worker_count in (("one by one", 0), ("worker pool", workers)):
+            inventory = ShardedInventory(folder, workers=worker_count, track_movements=False)
+            timings = {}
+            if worker_count != 0:
+                started = time.perf_counter()
+                inventory.total_stock_value()
+                timings["first call"] = time.perf_counter() - started
+            for question, ask in (("total_stock_value", inventory.total_stock_value),
+                                  ("global_stock", lambda: inventory.global_stock(name))):
+                started = time.perf_counter()
+                ask()
+                timings[question] = time.perf_counter() - started
+            inventory.close()
+            results[label] = timings
+            results[label + " workers"] = inventory.workers
+
+    print(f"{item_count:,} items over {location_count} locations:")
+    for label in ("one by one", "worker pool"):
+        timings = "   ".join(f"{question} {seconds:.2f} s" for question, seconds in results[label].items())
+        print(f"  {label:<12} ({results[label + ' workers']} workers)   {timings}")
+    return results
+
+
+def _traced_size(build):
+    """Returns how many bytes the object made by build() keeps alive."""
+    gc.collect()
+    tracemalloc.start()
+    kept = build()
+    size, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def measure_memory(item_count):
+    """
+    Compares the memory used by the old layout (one dict per item) with InventoryItem records.
+    Both layouts hold the same ids and names, so the difference is the per-item overhead.
+    """
+    catalog = list(fake_catalog(item_count))
+
+    def build_dicts():
+        return {item_id: {"name": name, "quantity": quantity, "price": price, "stock_value": quantity * price}
+                for item_id, name, quantity, price in catalog}
+
+    def build_records():
+        return {item_id: InventoryItem(name, quantity, price) for item_id, name, quantity, price in catalog}
+
+    results = {"dict": _traced_size(build_dicts), "InventoryItem": _traced_size(build_records)}
+    print(f"Memory for {item_count:,} items (ids and names included):")
+    for layout, size in results.items():
+        print(f"  {layout:<14} {size / 1e6:9.1f} MB   {size / item_count:6.0f} bytes/item")
+    saved = 1 - results["InventoryItem"] / results["dict"]
+    print(f"  InventoryItem uses {saved:.0%} less memory.")
+    return results
+
+
+def stress_test(thread_count, operations, item_count=50):
+    """
+    Hammers one InventoryManager from many threads at once and checks that no update got lost:
+      - every thread spends (singly and in baskets) and restocks random items, counting what succeeded; at the end each item's
+        quantity must be exactly its start + restocks - spends,
+      - all threads race to spend one scarce item; exactly its stock must be sold, never more,
+      - all threads add the same brand new name; it must be created once and hold every delivery,
+      - a reader thread keeps doing lookups, prefix searches and analytics the whole time,
+      - after close() the data on disk must match what was in memory.
+    Returns True if every check passed.
+    """
+    start_quantity = 1000
+    scarce_quantity = thread_count * operations // 4
+    with tempfile.TemporaryDirectory() as folder:
+        data_file = os.path.join(folder, "inventory.json")
+        manager = InventoryManager(data_file, storage_mode="journal")
+        for number in range(item_count):
+            manager.add_item(f"product {number}", start_quantity, 10.0)
+        manager.add_item("scarce part", scarce_quantity, 5.0)
+        item_ids = [manager.get_item_by_name(f"product {number}")[0] for number in range(item_count)]
+        scarce_id = manager.get_item_by_name("scarce part")[0]
+
+        net_changes = [[0] * item_count for _ in range(thread_count)]
+        scarce_sold = [0] * thread_count
+        start_line = threading.Barrier(thread_count + 1)
+        writers_done = threading.Event()
+        thread_errors = []
+
+        def writer(thread_number):
+            rng = random.Random(thread_number)
+            changes = net_changes[thread_number]
+            start_line.wait()
+            try:
+                spend_and_restock(rng, changes, thread_number)
+            except Exception as e:
+                thread_errors.append(e)
+
+        def spend_and_restock(rng, changes, thread_number):
+            for _ in range(operations):
+                row = rng.randrange(item_count)
+                amount = rng.randint(1, 5)
+                roll = rng.random()
+                if roll < 0.5:
+                    if manager.record_spend(item_ids[row], amount).startswith("Success"):
+                        changes[row] -= amount
+                elif roll < 0.6:
+                    # A small basket: several items locked together in one transaction.
+                    basket = [(rng.randrange(item_count), rng.randint(1, 5)) for _ in range(3)]
+                    if manager.record_spends([(item_ids[basket_row], units) for basket_row, units in basket])["applied"]:
+                        for basket_row, units in basket:
+                            changes[basket_row] -= units
+                else:
+                    manager.add_item(f"product {row}", amount, 10.0)
+                    changes[row] += amount
+                if manager.record_spend(scarce_id, 1).startswith("Success"):
+                    scarce_sold[thread_number] += 1
+                manager.add_item("new widget", 1, 2.5)
+
+        def reader():
+            while not writers_done.is_set():
+                try:
+                    manager.get_item_by_name("product 1")
+                    manager.get_names_with_prefix("product 1", limit=20)
+                    manager.total_stock_value()
+                    manager.top_items_by_value(5)
+                except Exception as e:
+                    thread_errors.append(e)
+                    return
+
+        threads = [threading.Thread(target=writer, args=(number,)) for number in range(thread_count)]
+        reader_thread = threading.Thread(target=reader)
+        for thread in threads:
+            thread.start()
+        reader_thread.start()
+        start_line.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        writers_done.set()
+        reader_thread.join()
+
+        failures = []
+        for row, item_id in enumerate(item_ids):
+            expected = start_quantity + sum(changes[row] for changes in net_changes)
+            actual = manager.items[item_id]["quantity"]
+            if actual != expected:
+                failures.append(f"'product {row}' has {actual} units, expected {expected}")
+        if sum(scarce_sold) != scarce_quantity or manager.items[scarce_id]["quantity"] != 0:
+            failures.append(f"sold {sum(scarce_sold)} scarce parts out of {scarce_quantity}")
+        widget_ids = [item_id for item_id, item in manager.items.items() if item["name"] == "new widget"]
+        expected_widgets = thread_count * operations
+        if len(widget_ids) != 1 or manager.items[widget_ids[0]]["quantity"] != expected_widgets:
+            failures.append(f"'new widget' exists {len(widget_ids)} times, expected once with {expected_widgets} units")
+        recomputed_total = math.fsum(item["stock_value"] for item in manager.items.values())
+        if not math.isclose(manager.total_stock_value(), recomputed_total, rel_tol=1e-9):
+            failures.append(f"running total {manager.total_stock_value():.2f} != recomputed {recomputed_total:.2f}")
+        failures.extend(f"a thread crashed: {e!r}" for e in thread_errors)
+
+        in_memory = {item_id: item.to_dict() for item_id, item in manager.items.items()}
+        manager.close()
+        reloaded = InventoryManager(data_file, storage_mode="journal")
+        if {item_id: item.to_dict() for item_id, item in reloaded.items.items()} != in_memory:
+            failures.append("the data on disk doesn't match what was in memory")
+        reloaded.close()
+
+    total_operations = thread_count * operations * 3
+    print(f"Stress test: {thread_count} threads, {total_operations:,} operations in {elapsed:.2f} s "
+          f"({total_operations / elapsed:,.0f} ops/s).")
+    if failures:
+        print("FAILED:")
+        for failure in failures:
+            print(f"  {failure}")
+        return False
+    print("  No lost updates, no overselling, no duplicate items, and the disk matches memory.")
+    return True
+
+
+# Runs in a fresh interpreter: times the import and reports the peak memory (ru_maxrss is in KB on Linux).
+_IMPORT_PROBE = """
+import resource, time
+started = time.perf_counter()
+import mod
+{extra}
+print(time.perf_counter() - started, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def measure_import(runs=5):
+    """
+    How long 'import mod' takes and how much memory the process needs afterwards, headless (the default)
+    versus with the GUI libraries and NumPy loaded as well, i.e. what every import used to cost.
+    Each figure is the best of 'runs' fresh interpreters. Needs a Unix system (for the resource module).
+    """
+    project_folder = os.path.dirname(os.path.abspath(__file__))
+    setups = {"headless": "", "with GUI + NumPy": "mod._load_gui_modules(); mod._load_numpy()"}
+    results = {}
+    for label, extra in setups.items():
+        timings, peaks = [], []
+        for _ in range(runs):
+            output = subprocess.run([sys.executable, "-c", _IMPORT_PROBE.format(extra=extra)], cwd=project_folder,
+                                    capture_output=True, text=True, check=True).stdout.split()
+            timings.append(float(output[-2]))
+            peaks.append(int(output[-1]))
+        results[label] = {"seconds": min(timings), "peak_rss_mb": min(peaks) / 1024}
+    print(f"import mod (best of {runs}):")
+    for label, result in results.items():
+        print(f"  {label:<18} {result['seconds'] * 1000:7.1f} ms   {result['peak_rss_mb']:6.1f} MB peak RSS")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the inventory manager.")
+    subcommands = parser.add_subparsers(dest="benchmark", required=True)
+    memory_parser = subcommands.add_parser("memory", help="Compare per-item memory of dicts and InventoryItem records.")
+    memory_parser.add_argument("--items", type=int, default=100_000, help="How many items to create (default: 100,000).")
+    stress_parser = subcommands.add_parser("stress", help="Hammer one manager from many threads and check for lost updates.")
+    stress_parser.add_argument("--threads", type=int, default=16, help="How many writer threads (default: 16).")
+    stress_parser.add_argument("--operations", type=int, default=2000, help="Loop iterations per thread (default: 2,000).")
+    import_parser = subcommands.add_parser("import", help="Time 'import mod' and its memory use, headless and with the GUI libraries.")
+    import_parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement (default: 5).")
+    search_parser = subcommands.add_parser("search", help="Time substring and fuzzy name search.")
+    search_parser.add_argument("--items", type=int, default=100_000, help="How many items to search (default: 100,000).")
+    subcommands.add_parser("instrumentation", help="Measure what instrumentation costs per call, on and off.")
+    locations_parser = subcommands.add_parser("locations", help="Time questions about all locations, one by one and in parallel.")
+    locations_parser.add_argument("--locations", type=int, default=8, help="How many location shards (default: 8).")
+    locations_parser.add_argument("--items", type=int, default=1_000_000, help="Items over all locations (default: 1,000,000).")
+    locations_parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU).")
+    suite_parser = subcommands.add_parser("suite", help="Time the hot paths on catalogs of several sizes and write a report.")
+    suite_parser.add_argument("--sizes", type=int, nargs="+", default=list(SUITE_SIZES),
+                              help="Catalog sizes to run (default: 1,000 10,000 100,000 1,000,000).")
+    suite_parser.add_argument("--calls", type=int, default=1000, help="Calls per single-item operation (default: 1,000).")
+    suite_parser.add_argument("--output", help="Write the report as JSON to this file.")
+    suite_parser.add_argument("--compare", help="An earlier report to compare against.")
+    suite_parser.add_argument("--fixtures", help="Keep the generated inventory files in this folder and reuse them next time.")
+    args = parser.parse_args()
+
+    if args.benchmark == "memory":
+        measure_memory(args.items)
+    elif args.benchmark == "stress":
+        if not stress_test(args.threads, args.operations):
+            sys.exit(1)
+    elif args.benchmark == "import":
+        measure_import(args.runs)
+    elif args.benchmark == "search":
+        measure_search(args.items)
+    elif args.benchmark == "instrumentation":
+        measure_instrumentation()
+    elif args.benchmark == "locations":
+        measure_locations(args.locations, args.items, args.workers)
+    elif args.benchmark == "suite":
+        report = run_suite(args.sizes, args.calls, args.fixtures)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as report_file:
+                json.dump(report, report_file, indent=2)
+            print(f"Report written to '{args.output}'.")
+        if args.compare:
+            with open(args.compare, encoding="utf-8") as baseline_file:
+                compare_reports(json.load(baseline_file), report)
+
+
+if __name__ == "__main__":
+    main()
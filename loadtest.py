@@ -0,0 +1,198 @@
+"""
+Load test for the inventory API in server.py.
+
+Against a server that is already running:
+
+    python server.py --port 8080
+    python loadtest.py --port 8080 --connections 500 --requests 50000
+
+Or let the load test start its own server on a throwaway inventory:
+
+    python loadtest.py --start-server
+
+Every connection is kept open and sends its requests one after another: a mix of lookups,
+page listings, spends and deliveries. At the end it prints the throughput, the latency
+percentiles and how many requests got each status code.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+
+class ApiConnection:
+    """One keep-alive HTTP connection to the inventory API."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, path, body=None):
+        """Sends one request and returns (status, parsed JSON answer)."""
+        data = json.dumps(body).encode("utf-8") if body is not None else b""
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n")
+        self.writer.write(head.encode("latin-1") + data)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("the server closed the connection")
+        status = int(status_line.split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        answer = await self.reader.readexactly(length)
+        return status, json.loads(answer) if answer else None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def _seed(host, port, item_count):
+    """Makes sure there are 'item_count' load-test items and returns their ids."""
+    connection = ApiConnection(host, port)
+    await connection.open()
+    item_ids = []
+    try:
+        for number in range(item_count):
+            status, answer = await connection.request("POST", "/items", {"name": f"load test item {number}", "quantity": 1000000, "price": 9.99})
+            if status not in (200, 201):
+                raise RuntimeError(f"Couldn't create the load-test items: {answer}")
+            item_ids.append(answer["id"])
+    finally:
+        connection.close()
+    return item_ids
+
+
+async def run_load(host, port, connection_count, request_count, item_count, seed=7):
+    """Runs the load test and returns the results as a dict."""
+    item_ids = await _seed(host, port, item_count)
+    rng = random.Random(seed)
+    latencies = []
+    statuses = {}
+    failures = []
+    remaining = [request_count]
+
+    def next_request():
+        roll = rng.random()
+        if roll < 0.35:
+            return "GET", f"/items/{rng.choice(item_ids)}", None
+        if roll < 0.55:
+            return "GET", f"/lookup?name=load%20test%20item%20{rng.randrange(item_count)}", None
+        if roll < 0.65:
+            return "GET", f"/items?offset={rng.randrange(item_count)}&limit=20", None
+        if roll < 0.90:
+            return "POST", f"/items/{rng.choice(item_ids)}/spend", {"amount": 1}
+        return "POST", "/items", {"name": f"load test item {rng.randrange(item_count)}", "quantity": 1, "price": 9.99}
+
+    async def client():
+        connection = ApiConnection(host, port)
+        try:
+            await connection.open()
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                method, path, body = next_request()
+                started = time.perf_counter()
+                status, _answer = await connection.request(method, path, body)
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+        except (OSError, ConnectionError, asyncio.IncompleteReadError) as e:
+            failures.append(repr(e))
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(connection_count)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {"connections": connection_count, "requests": len(latencies), "seconds": elapsed,
+            "requests_per_second": len(latencies) / elapsed if elapsed else 0.0,
+            "p50_ms": _percentile(latencies, 0.50) * 1000, "p99_ms": _percentile(latencies, 0.99) * 1000,
+            "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+            "statuses": statuses, "connection_errors": len(failures)}
+
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def _start_server(folder, port):
+    """Starts server.py on a throwaway inventory and waits until it accepts connections."""
+    server_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+    process = subprocess.Popen([sys.executable, server_script, "--port", str(port),
+                                "--data-file", os.path.join(folder, "inventory.json")],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("The inventory API didn't start.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the inventory API.")
+    parser.add_argument("--host", default="127.0.0.1", help="Server address (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=8080, help="Server port (default: 8080).")
+    parser.add_argument("--connections", type=int, default=200, help="Concurrent keep-alive connections (default: 200).")
+    parser.add_argument("--requests", type=int, default=20_000, help="Total requests to send (default: 20,000).")
+    parser.add_argument("--items", type=int, default=100, help="Items to create and work on (default: 100).")
+    parser.add_argument("--start-server", action="store_true", help="Start server.py on a temporary inventory first.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    args = parser.parse_args()
+
+    process = None
+    with tempfile.TemporaryDirectory() as folder:
+        if args.start_server:
+            args.host, args.port = "127.0.0.1", _free_port()
+            process = _start_server(folder, args.port)
+        try:
+            results = asyncio.run(run_load(args.host, args.port, args.connections, args.requests, args.items))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{results['requests']:,} requests over {results['connections']} connections in {results['seconds']:.2f} s "
+          f"({results['requests_per_second']:,.0f} requests/s)")
+    print(f"  latency: p50 {results['p50_ms']:.1f} ms, p99 {results['p99_ms']:.1f} ms, max {results['max_ms']:.1f} ms")
+    print(f"  status codes: {dict(sorted(results['statuses'].items()))}, connection errors: {results['connection_errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,151 +1,2609 @@
-print('-------------------------------------------------------------------------------------------------')
-import tkinter as tk
-from tkinter import messagebox, ttk
+import argparse
+import array
+import bisect
+import collections
+import contextlib
+import csv
+import functools
+import hashlib
+import heapq
+import itertools
 import json
+import math
+import numbers
 import os
+import re
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import types
 import uuid
-from PIL import Image, ImageTk # Import Image and ImageTk from Pillow
-import tkinter.font as tkFont # Import for custom fonts
 
-class InventoryManager:
-    
+# Startup timings (see InventoryApp.startup_timings) are measured from here.
+_IMPORT_STARTED = time.perf_counter()
+
+# The GUI libraries (Tkinter and Pillow) are only imported when they're needed, see _load_gui_modules().
+# That way batch jobs, the command line and the HTTP API can use InventoryManager on machines without a
+# display or Pillow, and start a lot faster.
+tk = ttk = messagebox = tkFont = Image = ImageTk = None
+
+# NumPy is optional and slow to import, so it's only imported by the first analytics query, see _load_numpy().
+# Without it the analytics queries fall back to plain Python loops.
+numpy = None
+_numpy_checked = False
+
+
+def _load_gui_modules():
+    """Imports Tkinter for InventoryApp. Does nothing after the first call."""
+    global tk, ttk, messagebox, tkFont
+    if tk is None:
+        import tkinter.font as tkFont # Import for custom fonts
+        from tkinter import messagebox, ttk
+        import tkinter as tk
+
+
+def _load_pillow():
+    """Imports Pillow, which is only needed to scale the logo when there's no cached copy yet."""
+    global Image, ImageTk
+    if Image is None:
+        from PIL import Image, ImageTk # Import Image and ImageTk from Pillow
+
+
+def _load_numpy():
+    """Returns the numpy module, or None if it isn't installed."""
+    global numpy, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy_checked = True
+    return numpy
+
+class InventoryItem:
+    """
+    One item in the inventory. It uses __slots__ instead of a per-item dict, which cuts the memory
+    per item by more than half on big catalogs, but still reads and writes like the old dicts did:
+    item["quantity"], item.get("price"), dict(item) and so on all keep working.
+
+    stock_value is not stored: it's always quantity x unit price, so it's worked out when it's read
+    and never written to disk.
+    """
+
+    __slots__ = ("name", "quantity", "price")
+    _FIELDS = ("name", "quantity", "price", "stock_value")
+    # The fields that actually get saved; stock_value is derived from them.
+    _STORED_FIELDS = ("name", "quantity", "price")
+
+    def __init__(self, name, quantity=0, price=0.0):
+        # Interning means repeated names (e.g. across reloads and imports) share one string object.
+        self.name = sys.intern(name)
+        self.quantity = quantity
+        self.price = price
+
+    @property
+    def stock_value(self):
+        return self.quantity * self.price
+
+    @classmethod
+    def from_dict(cls, details):
+        """
+        Builds an item from a stored dict. Missing numbers default to zero, and fields that older versions
+        saved (stock_value, spent_value, spent_quantity) are simply left behind.
+        """
+        quantity = details.get("quantity", 0)
+        price = details.get("price", 0.0)
+        return cls(details["name"], quantity, price)
+
+    def to_dict(self):
+        """The item as it is saved: name, quantity and price."""
+        return {"name": self.name, "quantity": self.quantity, "price": self.price}
+
+    def __getitem__(self, field):
+        if field not in self._FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __setitem__(self, field, value):
+        # stock_value can't be set; change the quantity or price instead.
+        if field not in self._STORED_FIELDS:
+            raise KeyError(field)
+        setattr(self, field, value)
+
+    def __contains__(self, field):
+        return field in self._FIELDS
+
+    def get(self, field, default=None):
+        return getattr(self, field) if field in self._FIELDS else default
+
+    def keys(self):
+        return self._FIELDS
+
+    def __eq__(self, other):
+        if isinstance(other, InventoryItem):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __repr__(self):
+        return f"InventoryItem({self.to_dict()!r})"
+
+
+class ItemColumns:
+    """
+    The quantity and price of every item packed into two arrays (one row per item), kept in step
+    with the manager on every change. Analytics run over these columns in one go, with NumPy
+    when it's installed, instead of visiting item records one by one.
+
+    'total_value' is the stock value of the whole inventory. Every change adjusts it by just the
+    difference it makes, so reading it never has to add up the catalog again. Floats drop the low digits
+    of small values while the total is huge, so when a big value leaves and the total shrinks a lot,
+    the column is added up again exactly (math.fsum) instead of trusting the adjustment.
+    """
+
+    # How much bigger than the new total a value taken out (or the old total) may be before it's added up again.
+    exact_total_ratio = 1024
+
+    def __init__(self):
+        self.item_ids = []
+        self.rows = {}
+        self.quantities = array.array("d")
+        self.prices = array.array("d")
+        self.total_value = 0.0
+
+    def rebuild(self, items):
+        self.item_ids = list(items)
+        self.rows = {item_id: row for row, item_id in enumerate(self.item_ids)}
+        self.quantities = array.array("d", (items[item_id]["quantity"] for item_id in self.item_ids))
+        self.prices = array.array("d", (items[item_id]["price"] for item_id in self.item_ids))
+        self.total_value = self._exact_total()
+
+    def _exact_total(self):
+        return math.fsum(quantity * price for quantity, price in zip(self.quantities, self.prices))
+
+    def _adjust_total(self, removed, added):
+        """Moves the total by one row's change of value (the columns already hold the new state)."""
+        before = self.total_value
+        after = before - removed + added
+        if max(abs(before), abs(removed), abs(added)) > abs(after) * self.exact_total_ratio:
+            after = self._exact_total()
+        self.total_value = after
+
+    def sync(self, items, item_ids):
+        """Copies the current quantity and price of these items into the columns (or drops deleted ones)."""
+        for item_id in item_ids:
+            item = items.get(item_id)
+            if item is None:
+                self._remove(item_id)
+                continue
+            row = self.rows.get(item_id)
+            removed = 0.0
+            if row is None:
+                self.rows[item_id] = len(self.item_ids)
+                self.item_ids.append(item_id)
+                self.quantities.append(item["quantity"])
+                self.prices.append(item["price"])
+            else:
+                removed = self.quantities[row] * self.prices[row]
+                self.quantities[row] = item["quantity"]
+                self.prices[row] = item["price"]
+            self._adjust_total(removed, item["quantity"] * item["price"])
+
+    def _remove(self, item_id):
+        """Removes a row by moving the last row into its place, so nothing has to shift."""
+        row = self.rows.pop(item_id, None)
+        if row is None:
+            return
+        removed = self.quantities[row] * self.prices[row]
+        last_row = len(self.item_ids) - 1
+        if row != last_row:
+            moved_id = self.item_ids[last_row]
+            self.item_ids[row] = moved_id
+            self.rows[moved_id] = row
+            self.quantities[row] = self.quantities[last_row]
+            self.prices[row] = self.prices[last_row]
+        self.item_ids.pop()
+        self.quantities.pop()
+        self.prices.pop()
+        self._adjust_total(removed, 0.0)
+
+    def copy(self):
+        """
+        A private copy of the columns (without the row lookup, which queries don't need).
+        Other threads can keep changing these columns while a query works through the copy.
+        """
+        columns = ItemColumns()
+        columns.item_ids = self.item_ids.copy()
+        columns.quantities = self.quantities[:]
+        columns.prices = self.prices[:]
+        columns.total_value = self.total_value
+        return columns
+
+    def numpy_views(self):
+        """
+        Zero-copy NumPy views of the two columns. Only use them inside a single query: while a view
+        is alive the arrays can't grow or shrink.
+        """
+        return (numpy.frombuffer(self.quantities, dtype=numpy.float64),
+                numpy.frombuffer(self.prices, dtype=numpy.float64))
+
+
+class SortedIndex:
+    """
+    Item ids kept in order of one field (quantity, price, ...), ties broken by item id, so the inventory
+    can be shown sorted by that field, or just the items within a range of it, without sorting anything.
+
+    The entries live in blocks of a few hundred. Finding one bisects the blocks' last entries and then
+    a single block, and adding or removing one only shifts that block, so keeping the index up to date
+    costs tens of microseconds per change even with a million items. Each block holds its keys and its
+    item ids in two parallel lists, which takes about half the memory of (key, item_id) pairs.
+    """
+
+    # Blocks are split in two once they grow past twice this size.
+    block_size = 512
+
+    def __init__(self, keys=(), item_ids=()):
+        """'keys' and 'item_ids' are lists of the starting entries, already in order."""
+        size = self.block_size
+        self.key_blocks = [keys[start:start + size] for start in range(0, len(keys), size)]
+        self.id_blocks = [item_ids[start:start + size] for start in range(0, len(item_ids), size)]
+        # The last key and item id of every block, for finding the block an entry belongs in.
+        self.last_keys = [keys[-1] for keys in self.key_blocks]
+        self.last_ids = [item_ids[-1] for item_ids in self.id_blocks]
+        self.length = len(keys)
+        # Position of each block's first entry, worked out again after the first read that follows a change.
+        self._block_starts = None
+
+    def __len__(self):
+        return self.length
+
+    @staticmethod
+    def _bisect_entries(keys, item_ids, key, item_id):
+        """
+        Where (key, item_id) goes in two parallel sorted lists. Keys can repeat (lots of items
+        with 0 in stock), so the ids are only bisected among the equal keys.
+        """
+        low = bisect.bisect_left(keys, key)
+        high = bisect.bisect_right(keys, key, low)
+        return bisect.bisect_left(item_ids, item_id, low, high)
+
+    def _find(self, key, item_id):
+        """The block an entry belongs in, and its position inside that block."""
+        number = min(self._bisect_entries(self.last_keys, self.last_ids, key, item_id), len(self.key_blocks) - 1)
+        return number, self._bisect_entries(self.key_blocks[number], self.id_blocks[number], key, item_id)
+
+    def _block_changed(self, number):
+        self.last_keys[number] = self.key_blocks[number][-1]
+        self.last_ids[number] = self.id_blocks[number][-1]
+
+    def add(self, key, item_id):
+        if not self.key_blocks:
+            self.key_blocks.append([key])
+            self.id_blocks.append([item_id])
+            self.last_keys.append(key)
+            self.last_ids.append(item_id)
+        else:
+            number, position = self._find(key, item_id)
+            keys = self.key_blocks[number]
+            item_ids = self.id_blocks[number]
+            keys.insert(position, key)
+            item_ids.insert(position, item_id)
+            if len(keys) > 2 * self.block_size:
+                half = len(keys) // 2
+                self.key_blocks[number:number + 1] = [keys[:half], keys[half:]]
+                self.id_blocks[number:number + 1] = [item_ids[:half], item_ids[half:]]
+                self.last_keys.insert(number, None)
+                self.last_ids.insert(number, None)
+                self._block_changed(number + 1)
+            self._block_changed(number)
+        self.length += 1
+        self._block_starts = None
+
+    def remove(self, key, item_id):
+        """Removes an entry. Raises ValueError if it isn't there."""
+        if self.key_blocks:
+            number, position = self._find(key, item_id)
+            keys = self.key_blocks[number]
+            item_ids = self.id_blocks[number]
+            if position < len(keys) and keys[position] == key and item_ids[position] == item_id:
+                del keys[position]
+                del item_ids[position]
+                if keys:
+                    self._block_changed(number)
+                else:
+                    del self.key_blocks[number]
+                    del self.id_blocks[number]
+                    del self.last_keys[number]
+                    del self.last_ids[number]
+                self.length -= 1
+                self._block_starts = None
+                return
+        raise ValueError(f"Item '{item_id}' isn't in the sort index under {key!r}.")
+
+    def _starts(self):
+        if self._block_starts is None:
+            self._block_starts = list(itertools.accumulate(map(len, self.key_blocks), initial=0))
+        return self._block_starts
+
+    def _position(self, key):
+        """How many entries have a key below 'key'."""
+        number = bisect.bisect_left(self.last_keys, key)
+        if number == len(self.key_blocks):
+            return self.length
+        return self._starts()[number] + bisect.bisect_left(self.key_blocks[number], key)
+
+    def bounds(self, low=None, high=None):
+        """The positions (start, stop) of the entries with low <= key < high. None leaves that end open."""
+        start = 0 if low is None else self._position(low)
+        stop = self.length if high is None else self._position(high)
+        return start, max(start, stop)
+
+    def item_ids(self, start, stop, reverse=False):
+        """The item ids at positions start..stop-1, in order (or backwards, from stop-1 down to start)."""
+        if start >= stop:
+            return []
+        starts = self._starts()
+        number = bisect.bisect_right(starts, start) - 1
+        position = start - starts[number]
+        found = []
+        while len(found) < stop - start:
+            item_ids = self.id_blocks[number]
+            found.extend(item_ids[position:position + stop - start - len(found)])
+            number += 1
+            position = 0
+        if reverse:
+            found.reverse()
+        return found
+
+
+class NameSearchIndex:
+    """
+    A trigram index over item names for substring and fuzzy (typo-tolerant) search.
+
+    Names are normalised first: case-folded, apostrophes dropped and other punctuation turned into spaces,
+    so "Dorito's Nachos" is searched as "doritos nachos". Each name is padded with a space on both sides and
+    cut into overlapping three-letter pieces (trigrams); for every trigram the index keeps a packed array of the
+    names that contain it. Names are numbered in the order they were added, deleted names just leave a gap
+    until there are so many gaps that a rebuild pays off.
+
+    - Substring search walks the shortest of the query's trigram lists and checks each name on it.
+    - Fuzzy search counts how many trigrams each name shares with the query and ranks the best candidates
+      by their Dice similarity (2 x shared / (query trigrams + name trigrams)), so small typos still match.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.item_ids = []
+        self.normalized_names = []
+        self.rows = {}
+        self.removed = 0
+
+    _APOSTROPHES = re.compile(r"['\u2019`]")
+    _SEPARATORS = re.compile(r"[\W_]+")
+    _SEPARATORS_BY_LINE = re.compile(r"[^\w\n]+")
+    _ASCII_SEPARATORS = bytes(code if chr(code).isalnum() or code == 10 else 32 for code in range(128)) + b" " * 128
+
+    @classmethod
+    def normalize(cls, name):
+        name = cls._APOSTROPHES.sub("", name.casefold())
+        return " ".join(cls._SEPARATORS.sub(" ", name).split())
+
+    @classmethod
+    def normalize_many(cls, names):
+        """normalize() for a whole list at once: a few passes over the joined names instead of a few per name."""
+        text = "\n".join(names)
+        if text.count("\n") != len(names) - 1:
+            return [cls.normalize(name) for name in names]
+        text = text.casefold().replace("'", "").replace("\u2019", "").replace("`", "")
+        if text.isascii():
+            # Plain ASCII (the usual case) can blank out punctuation with one byte-table pass.
+            text = text.encode("ascii").translate(cls._ASCII_SEPARATORS).decode("ascii")
+        else:
+            text = cls._SEPARATORS_BY_LINE.sub(" ", text.replace("_", " "))
+        return [" ".join(line.split()) for line in text.split("\n")]
+
+    @staticmethod
+    def trigrams(normalized_name):
+        padded = f" {normalized_name} "
+        return {padded[start:start + 3] for start in range(len(padded) - 2)}
+
+    def rebuild(self, items):
+        self.__init__()
+        self.item_ids = list(items)
+        self.normalized_names = self.normalize_many([item["name"] for item in items.values()])
+        self.rows = {item_id: row for row, item_id in enumerate(self.item_ids)}
+        numpy = _load_numpy()
+        if numpy is not None and len(items) >= 10_000:
+            self._build_postings_with_numpy(numpy)
+        else:
+            for row, normalized_name in enumerate(self.normalized_names):
+                self._add_postings(row, normalized_name)
+
+    def _build_postings_with_numpy(self, numpy, chunk_size=50_000, max_width=64):
+        """
+        Fills the postings for all names at once, a chunk of names at a time. The chunk becomes a grid of
+        character numbers (its own small alphabet), every (trigram, row) pair becomes one 64-bit key, and a
+        single sort groups the rows by trigram. Much faster than adding a million names one by one.
+        Names too long for the grid are added the plain way.
+        """
+        postings = self.postings
+        names = self.normalized_names
+        row_bits = chunk_size.bit_length()
+        for chunk_start in range(0, len(names), chunk_size):
+            rows = range(chunk_start, min(chunk_start + chunk_size, len(names)))
+            padded = [f" {names[row]} " for row in rows]
+            if max(map(len, padded)) > max_width:
+                for row in rows:
+                    if len(padded[row - chunk_start]) > max_width:
+                        self._add_postings(row, names[row])
+                rows = [row for row in rows if len(padded[row - chunk_start]) <= max_width]
+                padded = [text for text in padded if len(text) <= max_width]
+                if not padded:
+                    continue
+            width = max(3, max(map(len, padded)))
+            # Shorter names are filled up with code point 0, which normalised names never contain.
+            grid = numpy.array(padded, dtype=f"<U{width}").view(numpy.uint32).reshape(len(padded), width)
+            alphabet = numpy.flatnonzero(numpy.bincount(grid.ravel()))
+            size = len(alphabet)
+            if size ** 3 >= 1 << (63 - row_bits):
+                for row, text in zip(rows, padded):
+                    self._add_postings(row, text[1:-1])
+                continue
+            letter_of = numpy.zeros(alphabet[-1] + 1, dtype=numpy.int64)
+            letter_of[alphabet] = numpy.arange(size)
+            letters = letter_of[grid]
+            codes = (letters[:, :-2] * size + letters[:, 1:-1]) * size + letters[:, 2:]
+            keys = (codes << row_bits) | numpy.arange(len(padded), dtype=numpy.int64)[:, None]
+            # Drop trigrams running into the filler, then sort; a trigram seen twice in one name is listed once.
+            keys = numpy.sort(keys[grid[:, 2:] != 0])
+            keys = keys[numpy.r_[True, keys[1:] != keys[:-1]]]
+            codes = keys >> row_bits
+            chunk_rows = numpy.array(rows, dtype=numpy.uint32)[keys & ((1 << row_bits) - 1)]
+            starts = numpy.flatnonzero(numpy.r_[True, codes[1:] != codes[:-1]])
+            ends = numpy.r_[starts[1:], len(codes)]
+            characters = [chr(point) for point in alphabet.tolist()]
+            for code, start, end in zip(codes[starts].tolist(), starts.tolist(), ends.tolist()):
+                trigram = characters[code // (size * size)] + characters[code // size % size] + characters[code % size]
+                rows_array = postings.get(trigram)
+                if rows_array is None:
+                    rows_array = postings[trigram] = array.array("I")
+                rows_array.frombytes(chunk_rows[start:end].tobytes())
+
+    def add(self, item_id, name):
+        row = len(self.item_ids)
+        normalized_name = self.normalize(name)
+        self.item_ids.append(item_id)
+        self.normalized_names.append(normalized_name)
+        self.rows[item_id] = row
+        self._add_postings(row, normalized_name)
+
+    def _add_postings(self, row, normalized_name):
+        postings = self.postings
+        for trigram in self.trigrams(normalized_name):
+            rows = postings.get(trigram)
+            if rows is None:
+                rows = postings[trigram] = array.array("I")
+            rows.append(row)
+
+    def remove(self, item_id, items):
+        """Forgets a deleted item. 'items' is only used to rebuild once most of the index is gaps."""
+        row = self.rows.pop(item_id, None)
+        if row is None:
+            return
+        self.item_ids[row] = None
+        self.removed += 1
+        if self.removed > 1000 and self.removed * 2 > len(self.item_ids):
+            self.rebuild(items)
+
+    def snapshot(self, trigrams):
+        """
+        What a search needs, taken with the manager's index lock held: private copies of the posting arrays
+        for these trigrams (only the ones that exist) plus the id and name lists they number into. New names
+        are only ever appended and a rebuild makes new lists, so the search can then run without the lock.
+        """
+        postings = {trigram: self.postings[trigram][:] for trigram in trigrams if trigram in self.postings}
+        return postings, self.item_ids, self.normalized_names
+
+    @staticmethod
+    def find_substring(query_text, snapshot, limit):
+        """
+        Ids of the items whose normalised name contains the normalised 'query_text', best first: matches at the
+        start of a word come before matches inside one, then shorter names. At most 'limit' ids.
+        'snapshot' must come from snapshot(trigrams of the query).
+        """
+        postings, item_ids, names = snapshot
+        inner_trigrams = {query_text[start:start + 3] for start in range(len(query_text) - 2)}
+        if len(query_text) < 3:
+            candidates = range(len(names))
+        elif inner_trigrams - postings.keys():
+            return []
+        else:
+            candidates = min((postings[trigram] for trigram in inner_trigrams), key=len)
+        # Ranking needs a pool a bit bigger than 'limit'; very common queries stop once the pool is full.
+        pool_size = max(limit * 20, 200)
+        matches = []
+        for row in candidates:
+            name = names[row]
+            position = name.find(query_text)
+            if position < 0 or item_ids[row] is None:
+                continue
+            starts_word = position == 0 or name[position - 1] == " "
+            matches.append((not starts_word, len(name), name, row))
+            if len(matches) >= pool_size:
+                break
+        matches.sort()
+        return [item_ids[row] for _rank, _length, _name, row in matches[:limit]]
+
+    @classmethod
+    def find_similar(cls, query_trigrams, snapshot, limit, min_score):
+        """
+        (item_id, score) pairs for the names most similar to a query with these trigrams, best first.
+        'snapshot' must come from snapshot(query_trigrams).
+        """
+        postings, item_ids, names = snapshot
+        if not postings:
+            return []
+        # Candidates are the names sharing the most trigrams with the query; only they get scored exactly.
+        candidate_count = limit * 10
+        numpy = _load_numpy()
+        if numpy is not None:
+            shared = numpy.bincount(numpy.concatenate([numpy.frombuffer(rows, dtype=numpy.uint32) for rows in postings.values()]),
+                                    minlength=len(item_ids))
+            candidate_count = min(len(shared), candidate_count)
+            candidate_rows = [row for row in numpy.argpartition(-shared, candidate_count - 1)[:candidate_count].tolist() if shared[row]]
+        else:
+            # Counting in plain Python is slower, so trigrams found in a large share of all names
+            # (which say little about similarity anyway) are left out, keeping at least the three rarest.
+            by_length = sorted(postings.values(), key=len)
+            common = max(5000, len(item_ids) // 20)
+            shared = collections.Counter()
+            for number, rows in enumerate(by_length):
+                if number >= 3 and len(rows) > common:
+                    break
+                shared.update(rows)
+            candidate_rows = [row for row, _count in shared.most_common(candidate_count)]
+
+        scored = []
+        for row in candidate_rows:
+            if item_ids[row] is None:
+                continue
+            name_trigrams = cls.trigrams(names[row])
+            score = 2 * len(query_trigrams & name_trigrams) / (len(query_trigrams) + len(name_trigrams))
+            if score >= min_score:
+                scored.append((-score, names[row], row))
+        scored.sort()
+        return [(item_ids[row], -negative_score) for negative_score, _name, row in scored[:limit]]
+
+
+def _item_to_json(value):
+    """Lets json.dumps write InventoryItem objects exactly like the dicts they replaced."""
+    if isinstance(value, InventoryItem):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# --- Storage backends ---
+# InventoryManager keeps the working inventory in memory and hands every change to one of these.
+# A backend needs: load(), write_change(items, item_id), write_changes(items, item_ids), save_all(items),
+# flush(items), compact(items) and close(items).
+
+def _fsync_directory(path):
+    """Makes a rename inside this file's folder durable. Windows has no directory fsync, so it's skipped there."""
+    if os.name == "nt":
+        return
+    directory_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(directory_fd)
+    finally:
+        os.close(directory_fd)
+
+
+class JsonSnapshotStorage:
+    """
+    The classic storage: the whole inventory lives in one JSON file,
+    and every single change rewrites that file.
+    """
+
+    # First bytes of a snapshot that carries a checksum. Older files without one still load fine.
+    _CHECKSUM_HEADER = '{"checksum": "'
+    _ITEMS_HEADER = '"items": '
+    _FOOTER = '\n}\n'
+
     def __init__(self, data_file="inventory.json"):
-        
         self.data_file = data_file
-        self.items = {}
-        self._load_data()
+        self.journal_file = data_file + ".log"
+        self.backup_file = data_file + ".bak"
+        self.corrupt_file = data_file + ".corrupt"
+        self.temp_file = data_file + ".tmp"
 
-    def _load_data(self):
-        
+    def load(self):
+        """
+        Reads the snapshot and returns the raw items dict (empty if there's nothing usable).
+        If the snapshot is damaged it's moved aside to '<data_file>.corrupt' and the last good
+        snapshot ('<data_file>.bak') is used instead.
+        """
+        items = None
         if os.path.exists(self.data_file):
             try:
-                with open(self.data_file, 'r') as f:
-                    loaded_items = json.load(f).get("items", {})
-                    for item_id, details in loaded_items.items():
-                        details["quantity"] = details.get("quantity", 0)
-                        details["price"] = details.get("price", 0.0)
-                        details["stock_value"] = details["quantity"] * details["price"]
-
-                        if "spent_value" in details:
-                            del details["spent_value"]
-                        if "spent_quantity" in details:
-                            del details["spent_quantity"]
-                    self.items = loaded_items
-                print(f"Great! Loaded {len(self.items)} items from '{self.data_file}'.")
-            except json.JSONDecodeError:
-                print(f"Oops! Problem reading '{self.data_file}'. It seems corrupted. Starting with an empty inventory to be safe.")
-                self.items = {}
+                items = self._read_snapshot(self.data_file)
+                print(f"Great! Loaded {len(items)} items from '{self.data_file}'.")
+            except ValueError as e:
+                print(f"Oops! Problem reading '{self.data_file}': {e}. Moving it aside to '{self.corrupt_file}' and looking for the last good copy.")
+                os.replace(self.data_file, self.corrupt_file)
             except Exception as e:
                 print(f"An unexpected error happened while loading data: {e}. Starting with an empty inventory.")
-                self.items = {}
-        else:
-            print(f"Couldn't find the inventory file at '{self.data_file}'. Starting with a brand new, empty inventory.")
+                items = {}
 
-    def _save_data(self):
-        
+        if items is None and os.path.exists(self.backup_file):
+            try:
+                items = self._read_snapshot(self.backup_file)
+                print(f"Phew! Recovered {len(items)} items from the last good snapshot '{self.backup_file}'.")
+                self.save_all(items)
+            except ValueError as e:
+                print(f"The backup '{self.backup_file}' can't be used either: {e}.")
+
+        if items is None:
+            if os.path.exists(self.corrupt_file):
+                print("Starting with an empty inventory to be safe.")
+            else:
+                print(f"Couldn't find the inventory file at '{self.data_file}'. Starting with a brand new, empty inventory.")
+            items = {}
+
+        # A journal left behind by journal mode still holds changes, so fold it in before carrying on.
+        replayed, torn_tail = self._replay_journal(items)
+        if replayed or torn_tail:
+            self.compact(items)
+        return items
+
+    def read_items(self):
+        """
+        Reads the items (snapshot plus journal) without changing any file: nothing is moved aside,
+        recovered or compacted. For other processes reading an inventory its owner keeps writing to.
+        If the owner compacts while we read, the old snapshot and the emptied journal would miss changes,
+        so we read again (a few times at most) until the snapshot stays the same underneath us.
+        """
+        for _attempt in range(5):
+            before = self._snapshot_version()
+            items = {}
+            for path in (self.data_file, self.backup_file):
+                if os.path.exists(path):
+                    try:
+                        items = self._read_snapshot(path)
+                        break
+                    except ValueError:
+                        continue
+            self._replay_journal(items)
+            if self._snapshot_version() == before:
+                break
+        return items
+
+    def _snapshot_version(self):
         try:
-            with open(self.data_file, 'w') as f:
-                json.dump({"items": self.items}, f, indent=4)
-            print(f"Inventory saved! We now have {len(self.items)} items recorded in '{self.data_file}'.")
+            status = os.stat(self.data_file)
+        except FileNotFoundError:
+            return None
+        return status.st_ino, status.st_mtime_ns, status.st_size
+
+    def _replay_journal(self, items):
+        """
+        Re-applies any changes sitting in the journal file on top of the snapshot we just loaded.
+        A half-written last line (e.g. from a crash mid-append) is simply ignored.
+        Returns how many records were replayed and whether such a torn line was found.
+        """
+        if not os.path.exists(self.journal_file):
+            return 0, False
+
+        replayed = 0
+        torn_tail = False
+        with open(self.journal_file, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Skipping an incomplete record at the end of '{self.journal_file}'.")
+                    torn_tail = True
+                    break
+                if record["op"] == "put":
+                    items[record["id"]] = record["item"]
+                elif record["op"] == "del":
+                    items.pop(record["id"], None)
+                replayed += 1
+
+        if replayed:
+            print(f"Replayed {replayed} journal records from '{self.journal_file}'.")
+        return replayed, torn_tail
+
+    def write_change(self, items, item_id):
+        self.save_all(items)
+
+    def write_changes(self, items, item_ids):
+        self.save_all(items)
+
+    def _encode_snapshot(self, items):
+        """
+        Turns the items into the snapshot file contents. It's still plain JSON ({"checksum": ..., "items": ...}),
+        but the checksum covers the exact text of the items part, so a torn or damaged file is noticed on load.
+        """
+        items_text = json.dumps(items, indent=4, default=_item_to_json)
+        checksum = hashlib.sha256(items_text.encode("utf-8")).hexdigest()
+        return f'{self._CHECKSUM_HEADER}sha256:{checksum}",\n{self._ITEMS_HEADER}{items_text}{self._FOOTER}'.encode("utf-8")
+
+    def _read_snapshot(self, path):
+        """Reads and checks one snapshot file. Raises ValueError if it's damaged."""
+        with open(path, 'rb') as f:
+            text = f.read().decode("utf-8")
+
+        if not text.startswith(self._CHECKSUM_HEADER):
+            # An older snapshot without a checksum: all we can check is that it's valid JSON.
+            return json.loads(text).get("items", {})
+
+        header, _, body = text.partition("\n")
+        expected_checksum = header[len(self._CHECKSUM_HEADER):].rstrip('",')
+        if not body.startswith(self._ITEMS_HEADER) or not body.endswith(self._FOOTER):
+            raise ValueError("the file is incomplete")
+        items_text = body[len(self._ITEMS_HEADER):-len(self._FOOTER)]
+        actual_checksum = "sha256:" + hashlib.sha256(items_text.encode("utf-8")).hexdigest()
+        if actual_checksum != expected_checksum:
+            raise ValueError("the checksum doesn't match, so the contents are damaged")
+        return json.loads(items_text)
+
+    def save_all(self, items):
+        """
+        Writes the snapshot crash-safely: the new contents go to a temp file which is fsync'ed and then
+        renamed over the real file in one atomic step. The previous snapshot is kept as the backup.
+        Returns True if the snapshot made it to disk.
+        """
+        # A shallow copy, so other threads can add and delete items while we write.
+        items = items.copy()
+        try:
+            with open(self.temp_file, 'wb') as f:
+                f.write(self._encode_snapshot(items))
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(self.data_file):
+                os.replace(self.data_file, self.backup_file)
+            os.replace(self.temp_file, self.data_file)
+            _fsync_directory(self.data_file)
+            print(f"Inventory saved! We now have {len(items)} items recorded in '{self.data_file}'.")
+            return True
         except Exception as e:
             print(f"Oh dear! Couldn't save the inventory to '{self.data_file}': {e}")
+            return False
 
-    def add_item(self, name, quantity, price):
+    def flush(self, items):
+        pass
+
+    def compact(self, items):
+        """Writes a fresh snapshot and drops any journal, which is now fully contained in it."""
+        if self.save_all(items) and os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+
+    def close(self, items):
+        pass
+
+
+class JournalStorage(JsonSnapshotStorage):
+    """
+    The JSON snapshot plus an append-only journal ('<data_file>.log'). Every change appends one small line,
+    the journal is fsync'ed every 'fsync_every' records and folded back into the snapshot
+    once it holds 'compact_every' records (or when the manager is closed).
+    """
+
+    def __init__(self, data_file="inventory.json", fsync_every=50, compact_every=1000):
+        super().__init__(data_file)
+        self.fsync_every = max(1, fsync_every)
+        self.compact_every = max(1, compact_every)
+        self._journal = None
+        self._journal_records = 0
+        self._unsynced_records = 0
+
+    def _open_journal(self):
+        if self._journal is None:
+            self._journal = open(self.journal_file, 'a')
+        return self._journal
+
+    def write_change(self, items, item_id):
         """
-        This is how we add a brand new item to our inventory, or update an existing one if the name matches.
+        Appends the new state of one item (or its deletion). The line is flushed to the OS right away,
+        but only fsync'ed every 'fsync_every' records to keep disk syncs cheap.
+        """
+        self.write_changes(items, (item_id,))
+
+    def write_changes(self, items, item_ids):
+        """Appends one record per item id, then flushes (and maybe fsyncs or compacts) once for the lot."""
+        journal = self._open_journal()
+        for item_id in item_ids:
+            if item_id in items:
+                record = {"op": "put", "id": item_id, "item": items[item_id]}
+            else:
+                record = {"op": "del", "id": item_id}
+            journal.write(json.dumps(record, separators=(",", ":"), default=_item_to_json) + "\n")
+            self._journal_records += 1
+            self._unsynced_records += 1
+        journal.flush()
+        if self._unsynced_records >= self.fsync_every:
+            self.flush(items)
+        if self._journal_records >= self.compact_every:
+            self.compact(items)
+
+    def flush(self, items):
+        if self._journal is not None and self._unsynced_records:
+            os.fsync(self._journal.fileno())
+            self._unsynced_records = 0
+
+    def compact(self, items):
+        """
+        Folds the journal into a fresh snapshot and empties the journal.
+        The snapshot is written first, so a crash in between just replays the same records again.
+        If the snapshot couldn't be written, the journal is kept as it is.
+        """
+        if not self.save_all(items):
+            return
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+        self._journal_records = 0
+        self._unsynced_records = 0
+
+    def close(self, items):
+        if self._journal_records:
+            self.flush(items)
+            self.compact(items)
+        elif self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+
+class BinarySnapshotStorage(JsonSnapshotStorage):
+    """
+    Same crash-safe snapshot handling as JsonSnapshotStorage, but in a compact columnar binary format
+    that loads with a handful of bulk reads instead of parsing JSON item by item:
+
+        b"INVSNAP2" | item count (u64) | sha256 of everything after it (32 bytes) |
+        6 sections, each a u64 byte length followed by the data:
+            id offsets (u32) | id text (utf-8) | name offsets (u32) | name text (utf-8) |
+            quantities (f64) | prices (f64)
+
+    Offsets count characters into the decoded text, numbers are little-endian. stock_value isn't
+    stored, since it's always quantity x price. Quantities are doubles so fractional stock (2.5 kg)
+    survives a reload; whole ones come back as ints. "INVSNAP1" files, which stored quantities
+    as whole numbers (i64), still load.
+    """
+
+    _MAGIC = b"INVSNAP2"
+    # Older headers we can still read, with the typecode their quantities were stored in.
+    _OLD_QUANTITY_TYPECODES = {b"INVSNAP1": "q"}
+    _HEADER = struct.Struct("<8sQ32s")
+    _SECTION_LENGTH = struct.Struct("<Q")
+
+    @staticmethod
+    def _pack_texts(texts):
+        """Joins strings into one text plus the offsets of where each one starts and ends."""
+        offsets = array.array("I", [0])
+        position = 0
+        for text in texts:
+            position += len(text)
+            offsets.append(position)
+        return offsets, "".join(texts)
+
+    @staticmethod
+    def _array_bytes(values):
+        if sys.byteorder == "big":
+            values = array.array(values.typecode, values)
+            values.byteswap()
+        return values.tobytes()
+
+    @staticmethod
+    def _array_from(typecode, data):
+        values = array.array(typecode)
+        values.frombytes(data)
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+    def _encode_snapshot(self, items):
+        item_ids = list(items)
+        id_offsets, id_text = self._pack_texts(item_ids)
+        name_offsets, name_text = self._pack_texts([items[item_id]["name"] for item_id in item_ids])
+        quantities = array.array("d", (float(items[item_id].get("quantity", 0)) for item_id in item_ids))
+        prices = array.array("d", (float(items[item_id].get("price", 0.0)) for item_id in item_ids))
+
+        body = bytearray()
+        for section in (self._array_bytes(id_offsets), id_text.encode("utf-8"),
+                        self._array_bytes(name_offsets), name_text.encode("utf-8"),
+                        self._array_bytes(quantities), self._array_bytes(prices)):
+            body += self._SECTION_LENGTH.pack(len(section))
+            body += section
+        return self._HEADER.pack(self._MAGIC, len(item_ids), hashlib.sha256(body).digest()) + bytes(body)
+
+    def _read_snapshot(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < self._HEADER.size:
+            raise ValueError("the file is incomplete")
+        magic, count, checksum = self._HEADER.unpack_from(data)
+        if magic == self._MAGIC:
+            quantity_typecode = "d"
+        elif magic in self._OLD_QUANTITY_TYPECODES:
+            quantity_typecode = self._OLD_QUANTITY_TYPECODES[magic]
+        else:
+            raise ValueError("this isn't a binary inventory snapshot")
+        body = memoryview(data)[self._HEADER.size:]
+        if hashlib.sha256(body).digest() != checksum:
+            raise ValueError("the checksum doesn't match, so the contents are damaged")
+
+        sections = []
+        position = 0
+        for _ in range(6):
+            (length,) = self._SECTION_LENGTH.unpack_from(body, position)
+            position += self._SECTION_LENGTH.size
+            sections.append(body[position:position + length])
+            position += length
+
+        id_offsets = self._array_from("I", sections[0])
+        id_text = str(sections[1], "utf-8")
+        name_offsets = self._array_from("I", sections[2])
+        name_text = str(sections[3], "utf-8")
+        quantities = self._array_from(quantity_typecode, sections[4])
+        prices = self._array_from("d", sections[5])
+        if not len(id_offsets) == len(name_offsets) == count + 1 or not len(quantities) == len(prices) == count:
+            raise ValueError("the sections don't agree on the number of items")
+
+        # Slicing every string out through map() keeps the per-item work in C.
+        item_ids = map(id_text.__getitem__, map(slice, id_offsets[:-1], id_offsets[1:]))
+        names = map(name_text.__getitem__, map(slice, name_offsets[:-1], name_offsets[1:]))
+        quantities = quantities.tolist()
+        if quantity_typecode == "d":
+            quantities = [int(quantity) if quantity.is_integer() else quantity for quantity in quantities]
+        return dict(zip(item_ids, [InventoryItem(name, quantity, price)
+                                   for name, quantity, price in zip(names, quantities, prices.tolist())]))
+
+
+class BinaryJournalStorage(BinarySnapshotStorage, JournalStorage):
+    """The append-only journal on top of a binary snapshot instead of a JSON one."""
+
+
+def convert_snapshot(source_file, target_file):
+    """
+    Converts a snapshot between the JSON and the binary format, picked by file extension
+    ('.json' is JSON, anything else is binary), e.g. convert_snapshot("inventory.json", "inventory.snap").
+    Returns the number of items converted.
+    """
+    def storage_for(path):
+        if path.lower().endswith(".json"):
+            return JsonSnapshotStorage(path)
+        return BinarySnapshotStorage(path)
+
+    return migrate_storage(storage_for(source_file), storage_for(target_file))
+
+
+class SQLiteStorage:
+    """
+    Keeps the inventory in a SQLite database running in WAL mode. A change is a single-row
+    upsert or delete instead of a file rewrite, and commits are batched every 'commit_every' changes
+    (flush() or close() commit whatever is still pending).
+
+    If a write fails (a full disk, a locked database), the error is reported like the snapshot backends do,
+    and the items involved are written again with the next change or flush(), so the database catches up.
+
+    InventoryManager still reads every item into memory when it starts, because its indexes and the GUI
+    work from there. Tools that only need part of the data can skip that: get_item() and find_by_name()
+    read one row, and iter_items() walks the table a page at a time.
+    """
+
+    _UPSERT_SQL = "INSERT OR REPLACE INTO items (id, name, name_key, quantity, price) VALUES (?, ?, ?, ?, ?)"
+    _DELETE_SQL = "DELETE FROM items WHERE id = ?"
+
+    def __init__(self, db_file="inventory.db", commit_every=100):
+        self.data_file = db_file
+        self.commit_every = max(1, commit_every)
+        self._pending_changes = 0
+        # Items whose last write failed, to be written again next time.
+        self._unsaved_item_ids = set()
+        # The background writer (write_mode="background") talks to the database from its own thread,
+        # always one thread at a time, so sharing the connection across threads is safe.
+        self._connection = sqlite3.connect(db_file, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            "id TEXT PRIMARY KEY, name TEXT NOT NULL, name_key TEXT NOT NULL, "
+            "quantity INTEGER NOT NULL, price REAL NOT NULL)"
+        )
+        # Lets other tools look items up by name without scanning the table.
+        self._connection.execute("CREATE INDEX IF NOT EXISTS items_name_key ON items (name_key)")
+        self._connection.commit()
+
+    def _row(self, item_id, details):
+        return (item_id, details["name"], InventoryManager._name_key(details["name"]),
+                details.get("quantity", 0), details.get("price", 0.0))
+
+    def load(self):
+        items = self.read_items()
+        print(f"Great! Loaded {len(items)} items from '{self.data_file}'.")
+        return items
+
+    def read_items(self):
+        """Reads the committed items. Other processes can do this while the owner keeps writing (WAL mode)."""
+        return dict(self.iter_items())
+
+    def iter_items(self, page_size=1000):
+        """
+        Yields (item_id, details) for every item in id order, reading 'page_size' rows at a time,
+        so only one page is ever held in memory. Each page picks up after the last id of the one before.
+        """
+        last_id = ""
+        while True:
+            rows = self._connection.execute(
+                "SELECT id, name, quantity, price FROM items WHERE id > ? ORDER BY id LIMIT ?", (last_id, page_size)
+            ).fetchall()
+            for item_id, name, quantity, price in rows:
+                yield item_id, {"name": name, "quantity": quantity, "price": price}
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1][0]
+
+    def get_item(self, item_id):
+        """The details of one item, read by its id, or None if there's no such item."""
+        row = self._connection.execute("SELECT name, quantity, price FROM items WHERE id = ?", (item_id,)).fetchone()
+        if row is None:
+            return None
+        return {"name": row[0], "quantity": row[1], "price": row[2]}
+
+    def find_by_name(self, name):
+        """(item_id, details) for the item with this name (ignoring case and surrounding spaces), found through the name index, or None."""
+        row = self._connection.execute(
+            "SELECT id, name, quantity, price FROM items WHERE name_key = ?", (InventoryManager._name_key(name),)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], {"name": row[1], "quantity": row[2], "price": row[3]}
+
+    def write_change(self, items, item_id):
+        self.write_changes(items, (item_id,))
+
+    def write_changes(self, items, item_ids):
+        """Writes the current state of these items (and any whose last write failed). Returns True if that worked."""
+        item_ids = list(dict.fromkeys(list(self._unsaved_item_ids) + list(item_ids)))
+        self._unsaved_item_ids.clear()
+        # The SQL text never changes, so sqlite3's statement cache reuses the prepared statements.
+        upserts = [self._row(item_id, items[item_id]) for item_id in item_ids if item_id in items]
+        deletes = [(item_id,) for item_id in item_ids if item_id not in items]
+        try:
+            if upserts:
+                self._connection.executemany(self._UPSERT_SQL, upserts)
+            if deletes:
+                self._connection.executemany(self._DELETE_SQL, deletes)
+        except (sqlite3.Error, OverflowError) as e:
+            self._unsaved_item_ids.update(item_ids)
+            print(f"Oh dear! Couldn't save the latest changes to '{self.data_file}': {e}. They'll be tried again with the next change.")
+            return False
+        self._pending_changes += len(upserts) + len(deletes)
+        if self._pending_changes >= self.commit_every:
+            return self.flush(items)
+        return True
+
+    def save_all(self, items):
+        """Replaces the whole table with 'items' in one transaction."""
+        items = items.copy()
+        with self._connection:
+            self._connection.execute("DELETE FROM items")
+            self._connection.executemany(self._UPSERT_SQL, (self._row(item_id, details) for item_id, details in items.items()))
+        self._pending_changes = 0
+        print(f"Inventory saved! We now have {len(items)} items recorded in '{self.data_file}'.")
+        return True
+
+    def flush(self, items):
+        """Commits what's pending, after retrying any writes that failed. Returns True if everything is saved."""
+        if self._unsaved_item_ids and not self.write_changes(items, ()):
+            return False
+        if self._pending_changes:
+            try:
+                self._connection.commit()
+            except sqlite3.Error as e:
+                print(f"Oh dear! Couldn't commit the changes to '{self.data_file}': {e}. They'll be committed with the next flush.")
+                return False
+            self._pending_changes = 0
+        return True
+
+    def compact(self, items):
+        """Commits and copies the WAL back into the main database file."""
+        self.flush(items)
+        self._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self, items):
+        self.flush(items)
+        self._connection.close()
+
+
+def migrate_storage(source, target):
+    """
+    Copies every item from one storage backend into another, e.g. from the JSON file into SQLite:
+        migrate_storage(JsonSnapshotStorage("inventory.json"), SQLiteStorage("inventory.db"))
+    Returns the number of items copied.
+    """
+    items = source.load()
+    target.save_all(items)
+    target.close(items)
+    return len(items)
+
+
+def _create_storage(data_file, storage_mode="snapshot", snapshot_format="json",
+                    journal_fsync_every=50, compact_every=1000, sqlite_commit_every=100):
+    """The storage backend InventoryManager uses for these settings (see its docstring)."""
+    if snapshot_format == "binary" and storage_mode != "sqlite":
+        data_file = os.path.splitext(data_file)[0] + ".snap"
+    if storage_mode == "snapshot":
+        return BinarySnapshotStorage(data_file) if snapshot_format == "binary" else JsonSnapshotStorage(data_file)
+    if storage_mode == "journal":
+        journal_class = BinaryJournalStorage if snapshot_format == "binary" else JournalStorage
+        return journal_class(data_file, fsync_every=journal_fsync_every, compact_every=compact_every)
+    if storage_mode == "sqlite":
+        return SQLiteStorage(os.path.splitext(data_file)[0] + ".db", commit_every=sqlite_commit_every)
+    raise ValueError(f"Unknown storage mode '{storage_mode}'. Use 'snapshot', 'journal' or 'sqlite'.")
+
+
+# --- Stock movement history ---
+
+class MovementLedger:
+    """
+    An append-only history of every stock movement: deliveries ("add"), spends ("spend"), manual
+    quantity corrections ("adjust"), price changes ("price") and deletions ("delete").
+
+    Movements are packed into fixed-size 41-byte binary records (time, kind, quantity change, unit price,
+    item id) after an 8-byte header, so a year of busy trading stays small and loads quickly.
+    Quantities can be fractional (2.5 kg of flour), so the quantity change is stored as a float. Ledgers
+    written by older versions, which stored it as a whole number, are converted the first time they're opened.
+    Alongside the file, hourly and daily totals (units added and units spent) are kept per item, so
+    questions like "how fast is this selling?" add up a handful of buckets instead of scanning every movement.
+    Buckets are in UTC. Hourly buckets older than 'hourly_retention_hours' are dropped; daily ones are kept.
+    """
+
+    _MAGIC = b"INVLEDG2"
+    # time (seconds since the epoch), kind, quantity change, unit price, item id as 16 UUID bytes.
+    _RECORD = struct.Struct("<dBdd16s")
+    # Older headers we can still read, with the record layout they used.
+    _OLD_FORMATS = {b"INVLEDG1": struct.Struct("<dBqd16s")}
+    KINDS = ("add", "spend", "adjust", "price", "delete")
+    _KIND_CODES = {kind: code for code, kind in enumerate(KINDS, start=1)}
+    # Item ids that aren't UUIDs are stored under a UUID derived from them.
+    _ID_NAMESPACE = uuid.UUID("6f1d3c1e-5d8a-4b9e-9a43-2f1c8e0b7a51")
 
+    def __init__(self, ledger_file="inventory.ledger", hourly_retention_hours=14 * 24):
+        self.ledger_file = ledger_file
+        self.hourly_retention_hours = hourly_retention_hours
+        # Item key -> {hour or day number: [units added, units spent]}, oldest bucket first.
+        self._hourly = {}
+        self._daily = {}
+        self._lock = threading.Lock()
+        self._file = None
+        self._load()
+
+    @classmethod
+    def _item_key(cls, item_id):
+        try:
+            return uuid.UUID(item_id).bytes
+        except ValueError:
+            return uuid.uuid5(cls._ID_NAMESPACE, item_id).bytes
+
+    def _load(self):
+        """Rebuilds the rollups from the file and opens it for appending. A half-written last record is cut off."""
+        data = b""
+        if os.path.exists(self.ledger_file):
+            with open(self.ledger_file, 'rb') as f:
+                data = f.read()
+            old_magic = data[:len(self._MAGIC)]
+            if old_magic in self._OLD_FORMATS:
+                data = self._upgrade(data, self._OLD_FORMATS[old_magic])
+            elif data and not data.startswith(self._MAGIC):
+                os.replace(self.ledger_file, self.ledger_file + ".corrupt")
+                print(f"Uh oh! '{self.ledger_file}' isn't a movement ledger. It was moved to '{self.ledger_file}.corrupt' and a new history was started.")
+                data = b""
+        if not data:
+            with open(self.ledger_file, 'wb') as f:
+                f.write(self._MAGIC)
+            data = self._MAGIC
+        whole_records = (len(data) - len(self._MAGIC)) // self._RECORD.size
+        end = len(self._MAGIC) + whole_records * self._RECORD.size
+        if end != len(data):
+            print(f"Heads up! The end of '{self.ledger_file}' was only partly written; that last movement was dropped.")
+            with open(self.ledger_file, 'r+b') as f:
+                f.truncate(end)
+        for timestamp, kind_code, quantity_change, _price, key in self._RECORD.iter_unpack(memoryview(data)[len(self._MAGIC):end]):
+            self._add_to_rollups(key, timestamp, kind_code, quantity_change)
+        self._file = open(self.ledger_file, 'ab')
+
+    def _upgrade(self, data, old_record):
+        """Rewrites a ledger from an older record layout into the current one. Returns the new file contents."""
+        whole_records = (len(data) - len(self._MAGIC)) // old_record.size
+        body = memoryview(data)[len(self._MAGIC):len(self._MAGIC) + whole_records * old_record.size]
+        upgraded = bytearray(self._MAGIC)
+        for record in old_record.iter_unpack(body):
+            upgraded += self._RECORD.pack(*record)
+        temp_file = self.ledger_file + ".tmp"
+        with open(temp_file, 'wb') as f:
+            f.write(upgraded)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.ledger_file)
+        return bytes(upgraded)
+
+    def _add_to_rollups(self, key, timestamp, kind_code, quantity_change):
+        if kind_code == 1:
+            column, units = 0, quantity_change
+        elif kind_code == 2:
+            column, units = 1, -quantity_change
+        else:
+            return
+        hour = int(timestamp // 3600)
+        hourly = self._hourly.setdefault(key, {})
+        bucket = hourly.get(hour)
+        if bucket is None:
+            bucket = hourly[hour] = [0, 0]
+            # New hour for this item: drop the ones that have fallen out of the retention window.
+            oldest_kept = hour - self.hourly_retention_hours
+            for old_hour in [old_hour for old_hour in hourly if old_hour <= oldest_kept]:
+                del hourly[old_hour]
+        bucket[column] += units
+        daily = self._daily.setdefault(key, {})
+        day_bucket = daily.setdefault(int(timestamp // 86400), [0, 0])
+        day_bucket[column] += units
+
+    def record(self, kind, item_id, quantity_change, price, timestamp=None):
+        """
+        Appends one movement. 'quantity_change' is signed: positive for stock coming in, negative for stock going out.
+        The record is packed before anything is written, so a bad value raises without touching the file or the rollups.
+        """
+        self.record_many([(kind, item_id, quantity_change, price)], timestamp)
+
+    def record_many(self, movements, timestamp=None):
+        """
+        Appends several (kind, item_id, quantity_change, price) movements in one write. Every record is packed
+        first, so a bad value raises before any of them reaches the file or the rollups.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        entries, records = [], []
+        for kind, item_id, quantity_change, price in movements:
+            key, kind_code = self._item_key(item_id), self._KIND_CODES[kind]
+            records.append(self._RECORD.pack(timestamp, kind_code, quantity_change, price, key))
+            entries.append((key, kind_code, quantity_change))
+        with self._lock:
+            self._file.write(b"".join(records))
+            for key, kind_code, quantity_change in entries:
+                self._add_to_rollups(key, timestamp, kind_code, quantity_change)
+
+    def flush(self):
+        """Hands the buffered movements to the OS."""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def movements(self, item_id=None):
+        """
+        Reads the raw history back, oldest first, as (timestamp, kind, quantity_change, price, item_key) tuples,
+        item_key being the item id as a UUID string. With 'item_id', only that item's movements.
+        """
+        self.flush()
+        wanted = self._item_key(item_id) if item_id is not None else None
+        with open(self.ledger_file, 'rb') as f:
+            f.seek(len(self._MAGIC))
+            while True:
+                chunk = f.read(self._RECORD.size * 4096)
+                usable = len(chunk) - len(chunk) % self._RECORD.size
+                if not usable:
+                    return
+                for timestamp, kind_code, quantity_change, price, key in self._RECORD.iter_unpack(chunk[:usable]):
+                    if wanted is None or key == wanted:
+                        yield timestamp, self.KINDS[kind_code - 1], quantity_change, price, str(uuid.UUID(bytes=key))
+
+    def rollup(self, item_id, period="day", count=7, now=None):
+        """
+        The last 'count' hourly or daily buckets for an item, oldest first, as
+        (bucket start timestamp, units added, units spent). Buckets without movements count as zero.
+        """
+        if period == "hour":
+            buckets, size = self._hourly.get(self._item_key(item_id), {}), 3600
+        elif period == "day":
+            buckets, size = self._daily.get(self._item_key(item_id), {}), 86400
+        else:
+            raise ValueError(f"Unknown period '{period}'. Use 'hour' or 'day'.")
+        current = int((time.time() if now is None else now) // size)
+        result = []
+        for number in range(current - count + 1, current + 1):
+            added, spent = buckets.get(number, (0, 0))
+            result.append((number * size, added, spent))
+        return result
+
+    def consumption_rate(self, item_id, days=7, now=None):
+        """Average units spent per day over the last 'days' days (today included)."""
+        if days <= 0:
+            raise ValueError("'days' must be a positive number.")
+        return sum(spent for _start, _added, spent in self.rollup(item_id, "day", days, now)) / days
+
+
+# --- Streaming import/export helpers ---
+
+# Column order used when exporting to CSV.
+EXPORT_FIELDS = ("id", "name", "quantity", "price", "stock_value")
+
+def _is_csv_path(path):
+    return os.path.splitext(path)[1].lower() == ".csv"
+
+def _read_records(path):
+    """Yields (line number, record dict) one record at a time from a CSV (with a header row) or JSON Lines file."""
+    with open(path, 'r', newline='') as f:
+        if _is_csv_path(path):
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError:
+                    # Pass the broken line along; bulk_upsert will report it as a rejected record.
+                    yield line_number, line.strip()
+
+def _parse_number(value):
+    """
+    Turns a number written out as text (a CSV cell such as "5" or "2.50") into an int or a float.
+    Anything that isn't text is passed through untouched; whether it's an acceptable quantity or price
+    is up to InventoryManager._validate_new_stock. Text that isn't a number raises ValueError.
+    """
+    if not isinstance(value, str):
+        return value
+    text = value.strip()
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+def _chunked(records, chunk_size):
+    """Groups a stream of records into lists of at most 'chunk_size', without reading ahead any further."""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class TransactionError(Exception):
+    """
+    Raised when a transaction used as a 'with' block can't be applied. Nothing was changed.
+    'errors' lists every failing line as (position, message), position counting from 0 in the order the lines were added.
+    """
+
+    def __init__(self, errors):
+        super().__init__("Nothing was changed: " + " ".join(f"Line {position + 1}: {message}" for position, message in errors))
+        self.errors = errors
+
+
+class InventoryTransaction:
+    """
+    A batch of changes that is applied all-or-nothing and saved in one go. Get one from InventoryManager.transaction():
+
+        with manager.transaction() as transaction:
+            transaction.add("Apples", 10, 0.5)
+            transaction.spend(pears_id, 3)
+
+    Leaving the 'with' block commits. Lines are checked in order and each one sees the lines before it
+    (you can add stock and spend it in the same transaction, using the id add() returns). If any line fails, none of them are applied
+    and TransactionError says which ones failed and why. An exception inside the block throws the lines away.
+    commit() can also be called directly; it returns the result instead of raising.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.lines = []
+        self.result = None
+
+    def add(self, name, quantity, price):
+        """
+        Adds stock by name, like add_item. Returns the id later lines can use for the item: the id the new
+        item will get, or, if an item with that name already exists at commit time, a stand-in for that item.
+        """
+        item_id = str(uuid.uuid4())
+        self.lines.append(("add", name, quantity, price, item_id))
+        return item_id
+
+    def spend(self, item_id, amount):
+        """Records 'amount' units of an item as spent, like record_spend."""
+        self.lines.append(("spend", item_id, amount))
+
+    def update(self, item_id, quantity=None, price=None):
+        """Sets an item's quantity and/or price, like update_item."""
+        self.lines.append(("update", item_id, quantity, price))
+
+    def delete(self, item_id):
+        """Removes an item, like delete_item."""
+        self.lines.append(("delete", item_id))
+
+    def commit(self):
+        """
+        Applies every line, or none of them. Returns {"applied": True/False, "errors": [(position, message), ...]}.
+        """
+        if self.result is not None:
+            raise RuntimeError("This transaction has already been committed.")
+        self.result = self.manager._commit_transaction(self.lines)
+        return self.result
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            result = self.commit()
+            if not result["applied"]:
+                raise TransactionError(result["errors"])
+        return False
+
+
+# --- Instrumentation ---
+# Opt-in timing of the hot paths in InventoryManager and InventoryApp. While it's off nothing is wrapped
+# at all, so it costs nothing; turning it on swaps timed wrappers in for the methods of that one object.
+
+class MetricsRecorder:
+    """
+    The default metrics sink: call counts and a timing histogram per operation, plus plain counters, all in memory.
+
+    A sink is anything with record(operation, seconds) and count(counter, amount=1), so the numbers can just as
+    well go to a log file, statsd or Prometheus; this one simply needs nothing else. It's safe to share between threads.
+    Histogram bucket n holds the calls that took less than 2**n microseconds (and at least half that).
+    """
+
+    # 2**26 microseconds is about 67 s; anything slower still lands in the last bucket.
+    bucket_count = 27
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # operation -> [calls, total seconds, slowest call in seconds, per-bucket call counts]
+        self.timings = {}
+        self.counters = {}
+
+    def record(self, operation, seconds):
+        bucket = min(int(seconds * 1e6).bit_length(), self.bucket_count - 1)
+        with self._lock:
+            timing = self.timings.get(operation)
+            if timing is None:
+                timing = self.timings[operation] = [0, 0.0, 0.0, [0] * self.bucket_count]
+            timing[0] += 1
+            timing[1] += seconds
+            if seconds > timing[2]:
+                timing[2] = seconds
+            timing[3][bucket] += 1
+
+    def count(self, counter, amount=1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self.timings = {}
+            self.counters = {}
+
+    @staticmethod
+    def _percentile(calls, slowest, buckets, fraction):
+        """Upper edge of the bucket holding this fraction of the calls (never more than the slowest call)."""
+        wanted = max(1, math.ceil(calls * fraction))
+        seen = 0
+        for bucket, bucket_calls in enumerate(buckets):
+            seen += bucket_calls
+            if seen >= wanted:
+                return min(2 ** bucket / 1e6, slowest)
+        return slowest
+
+    def snapshot(self):
         """
-        cleaned_name = name.strip().lower()
-        if not cleaned_name:
+        Everything recorded so far as plain data (easy to turn into JSON):
+        {"timings": {operation: {"calls", "total_ms", "mean_ms", "p50_ms", "p99_ms", "max_ms", "histogram"}}, "counters": {...}}.
+        p50/p99 are read off the histogram, so they're accurate to within a factor of two.
+        "histogram" maps each bucket's upper edge in microseconds to its number of calls (empty buckets left out).
+        """
+        with self._lock:
+            timings = {operation: (calls, total, slowest, buckets[:])
+                       for operation, (calls, total, slowest, buckets) in self.timings.items()}
+            counters = dict(self.counters)
+        report = {}
+        for operation, (calls, total, slowest, buckets) in timings.items():
+            report[operation] = {
+                "calls": calls,
+                "total_ms": total * 1000,
+                "mean_ms": total / calls * 1000,
+                "p50_ms": self._percentile(calls, slowest, buckets, 0.50) * 1000,
+                "p99_ms": self._percentile(calls, slowest, buckets, 0.99) * 1000,
+                "max_ms": slowest * 1000,
+                "histogram": {2 ** bucket: bucket_calls for bucket, bucket_calls in enumerate(buckets) if bucket_calls},
+            }
+        return {"timings": report, "counters": counters}
+
+    def report(self):
+        """Prints the timings (most total time first) and the counters."""
+        snapshot = self.snapshot()
+        if not snapshot["timings"]:
+            print("No instrumented calls recorded yet.")
+            return
+        print(f"{'Operation':<36} {'calls':>8} {'total ms':>11} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for operation, timing in sorted(snapshot["timings"].items(), key=lambda entry: -entry[1]["total_ms"]):
+            print(f"{operation:<36} {timing['calls']:>8,} {timing['total_ms']:>11.1f} {timing['mean_ms']:>9.3f} "
+                  f"{timing['p50_ms']:>9.3f} {timing['p99_ms']:>9.3f} {timing['max_ms']:>9.1f}")
+        for counter, value in sorted(snapshot["counters"].items()):
+            print(f"{counter:<36} {value:>8,}")
+
+
+class Instrumentation:
+    """
+    Times calls to chosen methods of an object and hands every timing to a metrics sink
+    (a MetricsRecorder unless you pass your own). Usually set up for you:
+
+        instrumentation = manager.enable_instrumentation()
+        ... use the manager ...
+        instrumentation.sink.report()
+
+    attach() replaces the methods on that one object (not its class), so other objects and the
+    uninstrumented case don't pay anything; detach() puts the originals back.
+    Operations that fail are counted too: "<operation>.exceptions" for exceptions and
+    "<operation>.errors" for the "Error: ..." messages the manager answers with.
+
+    'profile' names operations (as they appear in the metrics, e.g. "add_item" or "storage.save_all")
+    to run under cProfile as well. Their stats add up across calls; dump_profiles() writes them out
+    and print_profiles() shows the most expensive functions.
+    """
+
+    def __init__(self, sink=None, profile=()):
+        self.sink = sink if sink is not None else MetricsRecorder()
+        self.profiled_operations = set(profile)
+        self.profiles = {}
+        # cProfile follows one thread at a time, so only one profiled call runs at once (see _profiled).
+        self._profile_lock = threading.Lock()
+        self._attached = []
+
+    def attach(self, target, operations, prefix=""):
+        """Swaps timed wrappers in for target.<operation>, recorded as '<prefix><operation>'. Returns self."""
+        for operation in operations:
+            setattr(target, operation, self._timed(prefix + operation, getattr(target, operation)))
+            self._attached.append((target, operation))
+        return self
+
+    def detach(self, target=None):
+        """Puts the original methods back, on 'target' only or on everything this instrumentation was attached to."""
+        still_attached = []
+        for attached_target, operation in self._attached:
+            if target is not None and attached_target is not target:
+                still_attached.append((attached_target, operation))
+            elif operation in vars(attached_target):
+                # The wrapper lives on the object itself; removing it brings back the class's method.
+                delattr(attached_target, operation)
+        self._attached = still_attached
+
+    def _timed(self, operation, function):
+        sink = self.sink
+        perf_counter = time.perf_counter
+        if operation in self.profiled_operations:
+            function = self._profiled(operation, function)
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            started = perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            except BaseException:
+                sink.record(operation, perf_counter() - started)
+                sink.count(operation + ".exceptions")
+                raise
+            sink.record(operation, perf_counter() - started)
+            if type(result) is str and result.startswith("Error"):
+                sink.count(operation + ".errors")
+            return result
+
+        return timed
+
+    def _profiled(self, operation, function):
+        @functools.wraps(function)
+        def profiled(*args, **kwargs):
+            # A call that overlaps another profiled one (another thread, or nested inside it) runs unprofiled;
+            # a nested call still shows up inside the outer call's profile.
+            if not self._profile_lock.acquire(blocking=False):
+                return function(*args, **kwargs)
+            try:
+                profile = self.profiles.get(operation)
+                if profile is None:
+                    import cProfile
+                    profile = self.profiles[operation] = cProfile.Profile()
+                return profile.runcall(function, *args, **kwargs)
+            finally:
+                self._profile_lock.release()
+
+        return profiled
+
+    def dump_profiles(self, folder="profiles"):
+        """Writes the stats of every profiled operation to '<folder>/<operation>.prof' (for pstats, snakeviz...). Returns the paths."""
+        os.makedirs(folder, exist_ok=True)
+        paths = []
+        with self._profile_lock:
+            for operation, profile in self.profiles.items():
+                path = os.path.join(folder, f"{operation}.prof")
+                profile.dump_stats(path)
+                paths.append(path)
+        return paths
+
+    def print_profiles(self, limit=15):
+        """Prints the 'limit' most expensive functions (by cumulative time) of each profiled operation."""
+        import pstats
+        with self._profile_lock:
+            for operation, profile in self.profiles.items():
+                print(f"Profile of {operation}:")
+                pstats.Stats(profile).sort_stats("cumulative").print_stats(limit)
+
+
+class InventoryManager:
+
+    # How many locks item ids (and item names) are spread over. More stripes means fewer
+    # unrelated items sharing a lock; the memory cost is fixed no matter how big the inventory gets.
+    lock_stripes = 64
+    # What enable_instrumentation() times: the public operations, plus the inner steps that tell apart
+    # where a slow call spent its time (name index, saving, listeners...).
+    instrumented_operations = (
+        "add_item", "bulk_upsert", "import_file", "export_file", "update_item", "record_spend", "record_spends",
+        "delete_item", "delete_item_by_name", "get_item_by_name", "get_names_with_prefix", "get_all_items",
+        "list_items", "search_items", "fuzzy_search_items", "build_search_index", "total_stock_value",
+        "stock_value_by_price_band", "top_items_by_value", "items_below_reorder_level", "flush", "compact",
+        "_load_data", "_save_data", "_rebuild_name_index", "_commit_transaction", "_persist_changes",
+        "_write_dirty_items", "_notify_listeners",
+    )
+    # Storage backend methods timed as "storage.<name>", e.g. how long JSON encoding and writing a snapshot takes.
+    instrumented_storage_operations = ("load", "save_all", "write_changes", "flush", "compact")
+    # The most stock one item can hold. Every storage backend keeps a quantity up to this exactly
+    # (it fits a double and SQLite's 64-bit integers), so what's on disk always matches what's in memory.
+    max_quantity = 10 ** 12
+
+    def __init__(self, data_file="inventory.json", storage_mode="snapshot",
+                 journal_fsync_every=50, compact_every=1000, sqlite_commit_every=100, storage=None,
+                 write_mode="immediate", flush_interval=1.0, snapshot_format="json", track_movements=True,
+                 instrumentation=None):
+        """
+        Sets up the manager and loads whatever is already on disk.
+
+        'storage_mode' decides how changes reach the disk:
+          - "snapshot": every change rewrites the whole inventory file (the classic way).
+          - "journal": every change appends one small line to '<data_file>.log'. The log is
+            fsync'ed every 'journal_fsync_every' records and folded back into the snapshot
+            once it holds 'compact_every' records (or when close() is called).
+          - "sqlite": items live in a SQLite database next to 'data_file' (inventory.json -> inventory.db),
+            with a commit every 'sqlite_commit_every' changes.
+        Any other backend object can be plugged in directly through 'storage'.
+
+        'snapshot_format' is "json" (the readable inventory.json) or "binary", a compact columnar file
+        next to 'data_file' (inventory.json -> inventory.snap) that is about half the size and loads much faster.
+        It applies to the "snapshot" and "journal" modes; convert_snapshot() moves data between the two formats.
+
+        'write_mode' decides when changes are handed to the storage:
+          - "immediate": inside the mutation itself, before add_item() & co. return.
+          - "background": mutations only mark the item as dirty. A writer thread collects the dirty items
+            and writes them all together every 'flush_interval' seconds, so callers (like GUI buttons)
+            never wait on the disk. flush() writes immediately, close() writes and stops the thread.
+
+        How safe is a change once the call returns?
+          - snapshot + immediate: on disk.
+          - journal + immediate: handed to the OS (survives a program crash), fsync'ed every 'journal_fsync_every' records.
+          - sqlite + immediate: committed every 'sqlite_commit_every' changes; a crash can lose the uncommitted ones.
+          - background (any storage): only in memory until the next flush, so a crash can lose up to
+            'flush_interval' seconds of changes on top of the above. flush() and close() always write everything.
+
+        With 'track_movements' every delivery, spend, correction, price change and deletion is also written
+        to a MovementLedger next to 'data_file' (inventory.json -> inventory.ledger), which answers
+        consumption_rate(), forecast_stockout() and movement_rollup().
+
+        The manager can be shared between threads (say, one per barcode scanner calling record_spend).
+        Changes to one item hold that item's lock, so a check like "is there enough stock?" and the
+        decrement that follows happen as one step. Changes to different items run side by side.
+        Lookups (get_item_by_name, get_names_with_prefix, the analytics) never wait for a writer.
+
+        Passing an Instrumentation turns on enable_instrumentation() right away, so loading is timed too.
+        """
+        if write_mode not in ("immediate", "background"):
+            raise ValueError(f"Unknown write mode '{write_mode}'. Use 'immediate' or 'background'.")
+        if snapshot_format not in ("json", "binary"):
+            raise ValueError(f"Unknown snapshot format '{snapshot_format}'. Use 'json' or 'binary'.")
+        if storage is None:
+            storage = _create_storage(data_file, storage_mode, snapshot_format,
+                                      journal_fsync_every, compact_every, sqlite_commit_every)
+        else:
+            storage_mode = "custom"
+
+        self.storage = storage
+        self.storage_mode = storage_mode
+        self.data_file = storage.data_file
+        self.items = {}
+        # Read-only window onto self.items (see items_view) and the cached snapshot from items_snapshot(),
+        # which every add or delete throws away.
+        self._items_view = types.MappingProxyType(self.items)
+        self._items_snapshot = None
+        # Case-folded item name -> item_id, so name lookups don't have to scan every item.
+        self._name_index = {}
+        # The same keys kept in sorted order, so prefix searches are a bisect instead of a scan.
+        self._sorted_name_keys = []
+        self._has_duplicate_names = False
+        # Callbacks that want to hear about changes, see add_change_listener().
+        self._change_listeners = []
+        # Columnar copy of quantities and prices for the analytics queries.
+        self._columns = ItemColumns()
+        # Trigram index for search_items() and fuzzy_search_items(), built the first time it's needed.
+        self._search_index = None
+        # Field -> SortedIndex for sorted and filtered walks (see iter_items), built the first time one is needed.
+        self._sort_indexes = None
+        # Locks are always taken in this order: name lock, item lock, index lock, storage lock.
+        # add_item & co. hold the lock for the item *name* while they decide between merging and creating,
+        # so two threads adding the same new name can't both create it.
+        self._name_locks = [threading.Lock() for _ in range(self.lock_stripes)]
+        # Every change to an item holds its item lock (item ids are striped over a fixed set of locks).
+        self._item_locks = [threading.Lock() for _ in range(self.lock_stripes)]
+        # Guards adding/removing entries of self.items, the name index and the columns. Only held for that bookkeeping.
+        self._index_lock = threading.Lock()
+        # Only one thread at a time may talk to the storage backend.
+        self._storage_lock = threading.Lock()
+        self.write_mode = write_mode
+        self.flush_interval = flush_interval
+        # Item ids changed since the last background write (a dict keeps them in order without duplicates).
+        self._dirty_item_ids = {}
+        self._dirty_lock = threading.Lock()
+        self._dirty_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._writer_thread = None
+        # The stock movement history, or None when it isn't being tracked.
+        self.ledger = MovementLedger(os.path.splitext(self.data_file)[0] + ".ledger") if track_movements else None
+        self.instrumentation = None
+        if instrumentation is not None:
+            self.enable_instrumentation(instrumentation)
+        self._load_data()
+        if write_mode == "background":
+            self._writer_thread = threading.Thread(target=self._background_writer_loop, name="inventory-writer", daemon=True)
+            self._writer_thread.start()
+
+    def enable_instrumentation(self, instrumentation=None):
+        """
+        Starts timing this manager: every method in 'instrumented_operations', and the storage backend's
+        'instrumented_storage_operations' as "storage.<name>". Returns the Instrumentation (a new one with
+        a MetricsRecorder if none is given); instrumentation.sink.report() prints what it has seen.
+        Nothing is timed until this is called, so an uninstrumented manager runs at full speed.
+        """
+        self.disable_instrumentation()
+        if instrumentation is None:
+            instrumentation = Instrumentation()
+        instrumentation.attach(self, self.instrumented_operations)
+        instrumentation.attach(self.storage, self.instrumented_storage_operations, prefix="storage.")
+        self.instrumentation = instrumentation
+        return instrumentation
+
+    def disable_instrumentation(self):
+        """Stops timing this manager. What was recorded stays in the sink."""
+        if self.instrumentation is not None:
+            self.instrumentation.detach(self)
+            self.instrumentation.detach(self.storage)
+            self.instrumentation = None
+
+    def _load_data(self):
+        
+        loaded_items = self.storage.load()
+        for item_id, details in loaded_items.items():
+            # JSON and SQLite hand back plain dicts; from_dict also drops the old spent_value/spent_quantity fields.
+            if not isinstance(details, InventoryItem):
+                loaded_items[item_id] = InventoryItem.from_dict(details)
+        self.items = loaded_items
+        self._items_view = types.MappingProxyType(self.items)
+        self._items_snapshot = None
+        self._search_index = None
+        self._sort_indexes = None
+        self._rebuild_name_index()
+        self._columns.rebuild(self.items)
+
+    @staticmethod
+    def _name_key(name):
+        """The form we compare item names in: no surrounding spaces, case-folded."""
+        return name.strip().casefold()
+
+    @staticmethod
+    def _is_finite(number):
+        """False for NaN and the infinities. Whole numbers are always finite (math.isfinite can't take huge ones)."""
+        return isinstance(number, int) or math.isfinite(number)
+
+    @classmethod
+    def _quantity_error(cls, quantity, allow_zero=False):
+        """
+        The one rule for every quantity (new stock, corrections, spends, imports and the HTTP API alike):
+        a number, whole or fractional, above zero (or zero too, with 'allow_zero') and at most max_quantity.
+        NaN and infinity are turned away, since NaN slips past every comparison and infinity makes every total infinite.
+        Returns what's wrong as the end of a sentence ("must be a positive number"), or None if it's fine.
+        """
+        if isinstance(quantity, bool) or not isinstance(quantity, numbers.Real) or not cls._is_finite(quantity):
+            return "must be a number"
+        if quantity < 0 or (quantity == 0 and not allow_zero):
+            return "can't be negative" if allow_zero else "must be a positive number"
+        if quantity > cls.max_quantity:
+            return f"can be at most {cls.max_quantity:,}"
+        return None
+
+    @classmethod
+    def _too_much_stock(cls, name, quantity):
+        """The error for a delivery that would take an item past max_quantity."""
+        return f"Error: Adding {quantity} to '{name}' would take its stock past {cls.max_quantity:,}, the most an item can hold."
+
+    def _name_lock(self, key):
+        return self._name_locks[hash(key) % len(self._name_locks)]
+
+    def _item_lock(self, item_id):
+        return self._item_locks[hash(item_id) % len(self._item_locks)]
+
+    @staticmethod
+    def _striped_locks(locks, keys):
+        """The locks covering all 'keys', each once and in stripe order, so threads taking several never deadlock."""
+        return [locks[stripe] for stripe in sorted({hash(key) % len(locks) for key in keys})]
+
+    def _rebuild_name_index(self):
+        """
+        Builds the name -> item_id index from scratch. Only needed after loading;
+        every mutation keeps it in sync on its own after that.
+        If old data has the same name twice, the first item wins, just like the old linear scan.
+        """
+        self._name_index = {}
+        self._has_duplicate_names = False
+        for item_id, details in self.items.items():
+            key = self._name_key(details["name"])
+            if key in self._name_index:
+                self._has_duplicate_names = True
+            else:
+                self._name_index[key] = item_id
+        self._sorted_name_keys = sorted(self._name_index)
+
+    def _index_name(self, item_id, key, new_keys=None, name=None):
+        """
+        Adds a new name to the index (with the index lock held). The sorted name keys are never changed
+        in place; a new list replaces the old one, so readers can walk the list they picked up without locking.
+        Bulk operations collect their keys in 'new_keys' and hand them to _merge_name_keys once at the end,
+        which is much cheaper than inserting them one by one.
+        'name' (as the user typed it) goes into the search index, if that has been built.
+        """
+        self._name_index[key] = item_id
+        if self._search_index is not None:
+            self._search_index.add(item_id, name if name is not None else key)
+        if new_keys is not None:
+            new_keys.append(key)
+        else:
+            sorted_keys = self._sorted_name_keys.copy()
+            bisect.insort(sorted_keys, key)
+            self._sorted_name_keys = sorted_keys
+
+    def _merge_name_keys(self, new_keys):
+        """Merges the keys collected by a bulk operation into the sorted name keys (with the index lock held)."""
+        # Another thread may have deleted some of these names in the meantime.
+        new_keys = sorted(key for key in new_keys if key in self._name_index)
+        if new_keys:
+            sorted_keys = self._sorted_name_keys + new_keys
+            sorted_keys.sort()
+            self._sorted_name_keys = sorted_keys
+
+    def _unindex_name(self, item_id, name):
+        """Removes a deleted item's name from the index (with the index lock held)."""
+        if self._search_index is not None:
+            self._search_index.remove(item_id, self.items)
+        key = self._name_key(name)
+        if self._name_index.get(key) != item_id:
+            return
+        del self._name_index[key]
+        # Legacy files can hold duplicate names; let the next one with this name take over.
+        if self._has_duplicate_names:
+            for other_id, details in self.items.items():
+                if self._name_key(details["name"]) == key:
+                    self._name_index[key] = other_id
+                    return
+        sorted_keys = self._sorted_name_keys
+        position = bisect.bisect_left(sorted_keys, key)
+        # A name added by a bulk operation that is still running isn't in the sorted keys yet.
+        if position < len(sorted_keys) and sorted_keys[position] == key:
+            self._sorted_name_keys = sorted_keys[:position] + sorted_keys[position + 1:]
+
+    def get_names_with_prefix(self, prefix, limit=None):
+        """
+        Returns item names starting with 'prefix' (case-insensitive), in alphabetical order.
+        Uses the sorted name keys, so the cost is a binary search plus the number of matches returned.
+        An empty prefix gives back every name (up to 'limit').
+        """
+        key_prefix = self._name_key(prefix)
+        # Writers replace the list rather than change it, so this one stays consistent while we read it.
+        sorted_keys = self._sorted_name_keys
+        position = bisect.bisect_left(sorted_keys, key_prefix)
+        matches = []
+        while position < len(sorted_keys):
+            if limit is not None and len(matches) >= limit:
+                break
+            key = sorted_keys[position]
+            if not key.startswith(key_prefix):
+                break
+            item = self.items.get(self._name_index.get(key))
+            # Skip names deleted by another thread since we picked up the list.
+            if item is not None:
+                matches.append(item["name"])
+            position += 1
+        return matches
+
+    def build_search_index(self):
+        """
+        Builds the trigram index behind search_items() and fuzzy_search_items() now, instead of on the first search.
+        Takes a few seconds for a million items; after that every change keeps it up to date.
+        """
+        with self._index_lock:
+            if self._search_index is None:
+                search_index = NameSearchIndex()
+                search_index.rebuild(self.items)
+                self._search_index = search_index
+            return self._search_index
+
+    # How each sort index orders the items: field -> key(item_id, quantity, price).
+    _SORT_INDEX_KEYS = {
+        "quantity": lambda item_id, quantity, price: quantity,
+        "price": lambda item_id, quantity, price: price,
+        "stock_value": lambda item_id, quantity, price: quantity * price,
+        "id": lambda item_id, quantity, price: item_id,
+    }
+
+    def build_sort_indexes(self):
+        """
+        Builds the sort indexes behind sorted and filtered iter_items() calls and count_items() now,
+        instead of on the first such call. Takes a second or two for a million items (more without NumPy);
+        after that every change keeps them up to date.
+        """
+        with self._index_lock:
+            if self._sort_indexes is None:
+                self._sort_indexes = self._build_sort_indexes()
+            return self._sort_indexes
+
+    def _build_sort_indexes(self):
+        """Sorts the columns once per field. Called with the index lock held."""
+        columns = self._columns
+        item_ids = columns.item_ids
+        id_order = sorted(range(len(item_ids)), key=item_ids.__getitem__)
+        sorted_ids = [item_ids[row] for row in id_order]
+        sort_indexes = {"id": SortedIndex(sorted_ids, sorted_ids)}
+        if _load_numpy() is not None and item_ids:
+            # Sorting a million (key, item_id) tuples in Python takes seconds when many keys are equal,
+            # because every tie compares two id strings. NumPy breaks the ties by each id's rank instead.
+            id_ranks = numpy.empty(len(item_ids), dtype=numpy.int64)
+            id_ranks[numpy.array(id_order, dtype=numpy.int64)] = numpy.arange(len(item_ids))
+            id_column = numpy.array(item_ids, dtype=object)
+            quantities, prices = columns.numpy_views()
+            for field, keys in (("quantity", quantities), ("price", prices), ("stock_value", quantities * prices)):
+                order = numpy.lexsort((id_ranks, keys))
+                sort_indexes[field] = SortedIndex(keys[order].tolist(), id_column[order].tolist())
+            return sort_indexes
+        for field in ("quantity", "price", "stock_value"):
+            key = self._SORT_INDEX_KEYS[field]
+            entries = sorted((key(item_id, quantity, price), item_id)
+                             for item_id, quantity, price in zip(item_ids, columns.quantities, columns.prices))
+            sort_indexes[field] = SortedIndex([entry[0] for entry in entries], [entry[1] for entry in entries])
+        return sort_indexes
+
+    def _sync_columns(self, item_ids):
+        """
+        Copies the current quantity and price of these items into the columns (see ItemColumns.sync),
+        first moving them in the sort indexes while the columns still know their old values.
+        Called with the index lock held.
+        """
+        sort_indexes = self._sort_indexes
+        if sort_indexes is not None:
+            columns = self._columns
+            for item_id in item_ids:
+                row = columns.rows.get(item_id)
+                old_values = None if row is None else (columns.quantities[row], columns.prices[row])
+                item = self.items.get(item_id)
+                new_values = None if item is None else (float(item["quantity"]), float(item["price"]))
+                if old_values == new_values:
+                    continue
+                for field, sort_index in sort_indexes.items():
+                    key = self._SORT_INDEX_KEYS[field]
+                    old_key = None if old_values is None else key(item_id, *old_values)
+                    new_key = None if new_values is None else key(item_id, *new_values)
+                    if old_values is not None and new_values is not None and old_key == new_key:
+                        continue
+                    if old_values is not None:
+                        sort_index.remove(old_key, item_id)
+                    if new_values is not None:
+                        sort_index.add(new_key, item_id)
+                columns.sync(self.items, (item_id,))
+            return
+        self._columns.sync(self.items, item_ids)
+
+    def search_items(self, text, limit=20):
+        """
+        Items whose name contains 'text' anywhere, ignoring case and punctuation ("nachos" finds "Dorito's Nachos").
+        Returns up to 'limit' (item_id, name) pairs: names with a word starting with 'text' first, then shorter names.
+        """
+        query_text = NameSearchIndex.normalize(text)
+        if not query_text:
+            return []
+        search_index = self.build_search_index()
+        with self._index_lock:
+            snapshot = search_index.snapshot(query_text[start:start + 3] for start in range(len(query_text) - 2))
+        matches = []
+        for item_id in NameSearchIndex.find_substring(query_text, snapshot, limit):
+            item = self.items.get(item_id)
+            if item is not None:
+                matches.append((item_id, item["name"]))
+        return matches
+
+    def fuzzy_search_items(self, text, limit=10, min_score=0.3):
+        """
+        Items whose name looks like 'text', typos and all ("dorito nachos" finds "Dorito's Nachos").
+        Returns up to 'limit' (item_id, name, score) tuples, most similar first; score runs from 0 to 1 (identical).
+        """
+        query_text = NameSearchIndex.normalize(text)
+        if not query_text:
+            return []
+        query_trigrams = NameSearchIndex.trigrams(query_text)
+        search_index = self.build_search_index()
+        with self._index_lock:
+            snapshot = search_index.snapshot(query_trigrams)
+        matches = []
+        for item_id, score in NameSearchIndex.find_similar(query_trigrams, snapshot, limit, min_score):
+            item = self.items.get(item_id)
+            # Skip items another thread deleted since the snapshot was taken.
+            if item is not None:
+                matches.append((item_id, item["name"], score))
+        return matches
+
+    def _persist_change(self, item_id):
+        """
+        Called after every mutation of 'item_id'. The storage backend decides how much work that is:
+        a full rewrite for snapshots, one appended line for the journal, one row for SQLite.
+        """
+        self._persist_changes((item_id,))
+
+    def _persist_changes(self, item_ids):
+        if self.write_mode == "background":
+            with self._dirty_lock:
+                for item_id in item_ids:
+                    self._dirty_item_ids[item_id] = True
+            self._dirty_event.set()
+            return
+        with self._storage_lock:
+            self.storage.write_changes(self.items, item_ids)
+        if self.ledger is not None:
+            self.ledger.flush()
+
+    def _background_writer_loop(self):
+        """
+        Runs on the writer thread: waits for something to become dirty, gives further changes
+        'flush_interval' seconds to pile up, then writes them all in one go.
+        """
+        while not self._stop_event.is_set():
+            self._dirty_event.wait()
+            self._stop_event.wait(self.flush_interval)
+            try:
+                self._write_dirty_items()
+            except Exception as e:
+                print(f"Oh dear! The background writer couldn't save the inventory: {e}")
+
+    def _write_dirty_items(self):
+        """Hands every dirty item to the storage backend and flushes it. Safe to call from any thread."""
+        with self._storage_lock:
+            with self._dirty_lock:
+                item_ids = list(self._dirty_item_ids)
+                self._dirty_item_ids.clear()
+                self._dirty_event.clear()
+            if item_ids:
+                # A snapshot, so the main thread can keep adding and deleting items while the backend works
+                # through them. Between adds and deletes it's reused, so saving spends and updates copies nothing.
+                self.storage.write_changes(self.items_snapshot(), item_ids)
+                self.storage.flush(self.items)
+            if self.ledger is not None:
+                self.ledger.flush()
+
+    def _item_changed(self, item_id, change):
+        """
+        Every mutation ends up here: the change is persisted first, then everyone listening is told
+        which item changed and how ("added", "updated" or "deleted").
+        Called with the item's lock held, so the changes to one item are persisted and announced in order.
+        """
+        with self._index_lock:
+            self._sync_columns((item_id,))
+        self._persist_change(item_id)
+        self._notify_listeners(change, item_id)
+
+    def _record_movement(self, kind, item_id, quantity_change, price):
+        """
+        Adds a movement to the ledger (if movements are tracked). See MovementLedger for the kinds.
+        Callers record the movement before they touch the item, so if the ledger can't take it
+        (a full disk, say) the error reaches them with the inventory still unchanged.
+        """
+        self._record_movements([(kind, item_id, quantity_change, price)])
+
+    def _record_movements(self, movements):
+        """Like _record_movement, for several (kind, item_id, quantity_change, price) movements written all at once."""
+        if self.ledger is not None and movements:
+            self.ledger.record_many(movements)
+
+    def _notify_listeners(self, change, item_id):
+        for listener in list(self._change_listeners):
+            listener(change, item_id)
+
+    def add_change_listener(self, listener):
+        """
+        Registers 'listener(change, item_id)' to be called after every mutation.
+        'change' is one of "added", "updated" or "deleted". This lets views patch just the rows
+        that changed instead of redrawing the whole inventory. After bulk operations the change is
+        "reset" (with item_id None), meaning "lots changed, redraw everything".
+        Listeners run on the thread that made the change.
+        """
+        self._change_listeners.append(listener)
+
+    def remove_change_listener(self, listener):
+        if listener in self._change_listeners:
+            self._change_listeners.remove(listener)
+
+    def flush(self):
+        """Pushes any batched or not-yet-written changes down to the disk right now."""
+        self._write_dirty_items()
+        with self._storage_lock:
+            self.storage.flush(self.items)
+
+    def compact(self):
+        """Folds whatever the backend has accumulated (journal, WAL) into its main file."""
+        self._write_dirty_items()
+        with self._storage_lock:
+            self.storage.compact(self.items)
+
+    def close(self):
+        """
+        Makes sure everything is safely on disk. Call this before the program exits.
+        """
+        if self._writer_thread is not None:
+            self._stop_event.set()
+            self._dirty_event.set()
+            self._writer_thread.join()
+            self._writer_thread = None
+        self._write_dirty_items()
+        with self._storage_lock:
+            self.storage.close(self.items)
+        if self.ledger is not None:
+            self.ledger.close()
+
+    def _save_data(self):
+        with self._storage_lock:
+            self.storage.save_all(self.items)
+
+    def _validate_new_stock(self, name, quantity, price):
+        """
+        The rules every new delivery of stock has to pass, wherever it comes from: add_item, bulk_upsert
+        (and so import_file), transactions and the HTTP API. Returns an error message, or None if it's fine.
+        """
+        if not self._name_key(name):
             return "Error: Please give your item a name. It can't be empty!"
-        if quantity <= 0:
-            return "Error: Quantity in stock must be a positive number when adding new items."
-        if price <= 0:
+        quantity_error = self._quantity_error(quantity)
+        if quantity_error:
+            return f"Error: Quantity in stock {quantity_error} when adding new items."
+        if isinstance(price, bool) or not isinstance(price, numbers.Real) or not self._is_finite(price) or price <= 0:
             return "Error: Price per unit must be a positive number. Items usually cost more than zero!"
+        return None
 
-        existing_item_id = None
-        for item_id, item_details in self.items.items():
-            if item_details["name"].lower() == cleaned_name:
-                existing_item_id = item_id
-                break
+    def _apply_add(self, name, quantity, price, new_keys=None, announce=False):
+        """
+        Adds the stock in memory (the caller holds the name lock): merges into the item with the same name,
+        or creates a new one. Returns (item_id, old_quantity, new_quantity), where old_quantity is None for a new item,
+        or None (with nothing changed) if merging would take the item past max_quantity.
+        With 'announce' set, the change is also persisted and announced while the item's lock is still held.
+        """
+        cleaned_name = self._name_key(name)
+        existing_item_id = self._name_index.get(cleaned_name)
 
         if existing_item_id:
-            item = self.items[existing_item_id]
-            old_quantity = item["quantity"]
-            item["quantity"] += quantity
-            item["price"] = price
-            item["stock_value"] = item["quantity"] * item["price"]
-            self._save_data()
-            return f"Success: Item '{name}' (ID: {existing_item_id}) already exists. Quantity updated from {old_quantity} to {item['quantity']}, and Unit Price updated to ₹{price:.2f}."
+            with self._item_lock(existing_item_id):
+                item = self.items[existing_item_id]
+                old_quantity = item["quantity"]
+                if old_quantity + quantity > self.max_quantity:
+                    return None
+                self._record_movement("add", existing_item_id, quantity, price)
+                item["quantity"] += quantity
+                item["price"] = price
+                new_quantity = item["quantity"]
+                if announce:
+                    self._item_changed(existing_item_id, "updated")
+            return existing_item_id, old_quantity, new_quantity
+
+        item_id = str(uuid.uuid4())
+        with self._item_lock(item_id):
+            self._record_movement("add", item_id, quantity, price)
+            with self._index_lock:
+                self.items[item_id] = InventoryItem(name.strip(), quantity, price)
+                self._items_snapshot = None
+                self._index_name(item_id, cleaned_name, new_keys, name.strip())
+            if announce:
+                self._item_changed(item_id, "added")
+        return item_id, None, quantity
+
+    def add_item(self, name, quantity, price):
+        """
+        This is how we add a brand new item to our inventory, or update an existing one if the name matches.
+
+        """
+        error_message = self._validate_new_stock(name, quantity, price)
+        if error_message:
+            return error_message
+
+        with self._name_lock(self._name_key(name)):
+            added = self._apply_add(name, quantity, price, announce=True)
+        if added is None:
+            return self._too_much_stock(name, quantity)
+        item_id, old_quantity, new_quantity = added
+
+        if old_quantity is not None:
+            return f"Success: Item '{name}' (ID: {item_id}) already exists. Quantity updated from {old_quantity} to {new_quantity}, and Unit Price updated to ₹{price:.2f}."
         else:
-            item_id = str(uuid.uuid4())
-            self.items[item_id] = {
-                "name": name.strip(),
-                "quantity": quantity,
-                "price": price,
-                "stock_value": quantity * price
-            }
-            self._save_data()
             return f"Success! Added new item '{name}' (ID: {item_id}) to your inventory."
 
+    def bulk_upsert(self, records, line_numbers=None):
+        """
+        Adds many deliveries of stock at once. Each record is a dict with 'name', 'quantity' and 'price'
+        (strings are fine, e.g. straight from a CSV file). Records go through exactly the same checks as add_item
+        (_validate_new_stock) and merge by name the same way, but everything is persisted in one go at the end
+        instead of once per item.
+
+        Returns a summary: {"added": ..., "updated": ..., "errors": [(record, message), ...]}, each message
+        starting with "Line N:". N counts the records from 1, or comes from 'line_numbers' (one per record) if given.
+        """
+        summary = {"added": 0, "updated": 0, "errors": []}
+        changed_item_ids = {}
+        new_keys = []
+        line_numbers = iter(line_numbers) if line_numbers is not None else itertools.count(1)
+        for record, line_number in zip(records, line_numbers):
+            try:
+                name = str(record["name"])
+                quantity = _parse_number(record["quantity"])
+                price = _parse_number(record["price"])
+            except (KeyError, TypeError, ValueError):
+                summary["errors"].append((record, f"Line {line_number}: Error: Each record needs a name, a number for quantity and a number for price."))
+                continue
+
+            error_message = self._validate_new_stock(name, quantity, price)
+            if error_message:
+                summary["errors"].append((record, f"Line {line_number}: {error_message}"))
+                continue
+
+            with self._name_lock(self._name_key(name)):
+                added = self._apply_add(name, quantity, price, new_keys)
+            if added is None:
+                summary["errors"].append((record, f"Line {line_number}: {self._too_much_stock(name, quantity)}"))
+                continue
+            item_id, old_quantity, _new_quantity = added
+            if old_quantity is None:
+                summary["added"] += 1
+            else:
+                summary["updated"] += 1
+            changed_item_ids[item_id] = True
+
+        if changed_item_ids:
+            with self._index_lock:
+                self._merge_name_keys(new_keys)
+                self._sync_columns(changed_item_ids)
+            self._persist_changes(list(changed_item_ids))
+            self._notify_listeners("reset", None)
+        return summary
+
+    def import_file(self, path, chunk_size=5000):
+        """
+        Streams a CSV (columns: name, quantity, price) or JSON Lines file into the inventory.
+        Records are read lazily and handed to bulk_upsert in chunks of 'chunk_size', so memory stays flat
+        no matter how big the file is, and the inventory is persisted once per chunk.
+        Returns the combined summary of all chunks.
+        """
+        summary = {"added": 0, "updated": 0, "errors": []}
+        for chunk in _chunked(_read_records(path), chunk_size):
+            chunk_summary = self.bulk_upsert([record for _line_number, record in chunk],
+                                             [line_number for line_number, _record in chunk])
+            summary["added"] += chunk_summary["added"]
+            summary["updated"] += chunk_summary["updated"]
+            summary["errors"].extend(chunk_summary["errors"])
+        print(f"Imported '{path}': {summary['added']} new items, {summary['updated']} updated, {len(summary['errors'])} rejected.")
+        for _record, message in summary["errors"][:20]:
+            print(f"  {message}")
+        if len(summary["errors"]) > 20:
+            print(f"  ...and {len(summary['errors']) - 20} more.")
+        return summary
+
+    def export_file(self, path):
+        """
+        Writes the whole inventory to a CSV or JSON Lines file (picked by the file extension),
+        one item at a time. Returns the number of items written.
+        """
+        written = 0
+        # Work from a snapshot, so other threads can keep adding and deleting items meanwhile.
+        items = self.items_snapshot()
+        with open(path, 'w', newline='') as f:
+            if _is_csv_path(path):
+                writer = csv.writer(f)
+                writer.writerow(EXPORT_FIELDS)
+                for item_id, details in items.items():
+                    writer.writerow((item_id, details["name"], details["quantity"], details["price"], details["stock_value"]))
+                    written += 1
+            else:
+                for item_id, details in items.items():
+                    row = {"id": item_id, "name": details["name"], "quantity": details["quantity"],
+                           "price": details["price"], "stock_value": details["stock_value"]}
+                    f.write(json.dumps(row, separators=(",", ":")) + "\n")
+                    written += 1
+        print(f"Exported {written} items to '{path}'.")
+        return written
+
     def update_item(self, item_id, new_quantity=None, new_price=None):
        
-        if item_id not in self.items:
-            return f"Error: Couldn't find any item with ID '{item_id}'. Are you sure that's the right one?"
+        with self._item_lock(item_id):
+            item = self.items.get(item_id)
+            if item is None:
+                return f"Error: Couldn't find any item with ID '{item_id}'. Are you sure that's the right one?"
 
-        item = self.items[item_id]
-        updated_something = False
+            old_quantity, old_price = item["quantity"], item["price"]
 
-        if new_quantity is not None:
-            if new_quantity >= 0:
-                item["quantity"] = new_quantity
-                updated_something = True
-            else:
-                return "Error: New quantity for total stock can't be negative."
-        
-        if new_price is not None:
-            if new_price > 0:
-                item["price"] = new_price
-                updated_something = True
-            else:
+            # Both values are checked before either is assigned, so a bad price can't leave a new quantity behind.
+            quantity_error = self._quantity_error(new_quantity, allow_zero=True) if new_quantity is not None else None
+            if quantity_error:
+                return f"Error: New quantity for total stock {quantity_error}."
+            if new_price is not None and (not self._is_finite(new_price) or new_price <= 0):
                 return "Error: New price must be a positive number. Even free items are ₹0.00, not negative!"
 
-        if updated_something:
-            item["stock_value"] = item["quantity"] * item["price"]
-            self._save_data()
-            return f"Success: Item '{item['name']}' (ID: {item_id}) has been updated."
-        else:
-            return "No valid updates provided for the item."
+            updated_something = new_quantity is not None or new_price is not None
+            if updated_something:
+                quantity = old_quantity if new_quantity is None else new_quantity
+                price = old_price if new_price is None else new_price
+                movements = []
+                if quantity != old_quantity:
+                    movements.append(("adjust", item_id, quantity - old_quantity, price))
+                if price != old_price:
+                    movements.append(("price", item_id, 0, price))
+                self._record_movements(movements)
+                item["quantity"] = quantity
+                item["price"] = price
+                self._item_changed(item_id, "updated")
+                return f"Success: Item '{item['name']}' (ID: {item_id}) has been updated."
+            else:
+                return "No valid updates provided for the item."
 
     def record_spend(self, item_id, amount_spent):
         """
         This function records when a certain amount of an item has been 'spent' 
-        It will decrease the main 'quantity' and then recalculate the 'stock_value' accordingly.
+        It will decrease the main 'quantity', which brings the 'stock_value' down with it.
+        The stock check and the decrement happen under the item's lock, so two threads can never
+        both spend the last units.
         """
         if item_id not in self.items:
             return f"Error: Item with ID '{item_id}' not found. Cannot record spend."
         
-        if amount_spent <= 0:
-            return "Error: Amount spent must be a positive number."
-
-        item = self.items[item_id]
-        if item["quantity"] >= amount_spent:
-            item["quantity"] -= amount_spent
-            item["stock_value"] = item["quantity"] * item["price"]
-            self._save_data()
-            return f"Success: Recorded {amount_spent} units of '{item['name']}' (ID: {item_id}) as spent. Current stock value is now ₹{item['stock_value']:.2f}."
-        else:
-            return f"Error: Not enough '{item['name']}' (ID: {item_id}) in stock. Available: {item['quantity']}, Tried to spend: {amount_spent}."
+        quantity_error = self._quantity_error(amount_spent)
+        if quantity_error:
+            return f"Error: Amount spent {quantity_error}."
+
+        with self._item_lock(item_id):
+            item = self.items.get(item_id)
+            if item is None:
+                return f"Error: Item with ID '{item_id}' not found. Cannot record spend."
+            if item["quantity"] >= amount_spent:
+                self._record_movement("spend", item_id, -amount_spent, item["price"])
+                item["quantity"] -= amount_spent
+                self._item_changed(item_id, "updated")
+                return f"Success: Recorded {amount_spent} units of '{item['name']}' (ID: {item_id}) as spent. Current stock value is now ₹{item['stock_value']:.2f}."
+            else:
+                return f"Error: Not enough '{item['name']}' (ID: {item_id}) in stock. Available: {item['quantity']}, Tried to spend: {amount_spent}."
+
+    def transaction(self):
+        """Starts a batch of changes that is applied all-or-nothing and saved once, see InventoryTransaction."""
+        return InventoryTransaction(self)
+
+    def record_spends(self, spends):
+        """
+        Records many spends at once, e.g. a burst of sales from a till. 'spends' is a list of (item_id, amount).
+        Either every spend is recorded or, if any of them fails (unknown item, not enough stock, ...), none are.
+        Everything is saved once at the end instead of once per spend.
+
+        Returns {"applied": True/False, "errors": [(position, message), ...]}, position being the index in 'spends'.
+        """
+        transaction = self.transaction()
+        for item_id, amount in spends:
+            transaction.spend(item_id, amount)
+        return transaction.commit()
+
+    def _commit_transaction(self, lines):
+        """
+        Applies the lines of a transaction. Every name and item they touch is locked for the whole commit,
+        the lines are first tried out on a scratch copy, and only if all of them pass is the inventory changed.
+        """
+        # Ids for items the transaction might create (made by add()), so their locks can be taken with the rest.
+        new_item_ids = [line[4] if line[0] == "add" else None for line in lines]
+        name_keys = set()
+        for line in lines:
+            if line[0] == "add":
+                name_keys.add(self._name_key(line[1]))
+            elif line[0] == "delete" and line[1] in self.items:
+                name_keys.add(self._name_key(self.items[line[1]]["name"]))
+
+        with contextlib.ExitStack() as held_locks:
+            for lock in self._striped_locks(self._name_locks, name_keys):
+                held_locks.enter_context(lock)
+            # With the name locks held, the items these names point to can't change any more.
+            item_ids = {line[1] for line in lines if line[0] != "add"}
+            item_ids.update(item_id for item_id in new_item_ids if item_id)
+            item_ids.update(self._name_index[key] for key in name_keys if key in self._name_index)
+            for lock in self._striped_locks(self._item_locks, item_ids):
+                held_locks.enter_context(lock)
+
+            errors, outcome, movements = self._check_transaction(lines, new_item_ids)
+            if errors:
+                return {"applied": False, "errors": errors}
+            self._apply_transaction(outcome, movements)
+        return {"applied": True, "errors": []}
+
+    def _check_transaction(self, lines, new_item_ids):
+        """
+        Plays the lines on a scratch copy of the items they touch, with the same rules as the single-item methods.
+        Returns (errors, outcome, movements): outcome maps item_id -> [name, quantity, price], or None for
+        deleted items, and movements lists the (kind, item_id, quantity_change, price) to put in the ledger.
+        """
+        outcome = {}
+        movements = []
+        # Name key -> item_id for items this transaction creates.
+        new_names = {}
+        created_item_ids = set()
+        # The id add() handed out -> the existing item the stock went to instead, when the name was taken.
+        merged_item_ids = {}
+        errors = []
+
+        def current(item_id):
+            if item_id in outcome:
+                return outcome[item_id]
+            item = self.items.get(item_id)
+            if item is None:
+                return None
+            outcome[item_id] = [item["name"], item["quantity"], item["price"]]
+            return outcome[item_id]
+
+        for position, (line, new_item_id) in enumerate(zip(lines, new_item_ids)):
+            kind = line[0]
+            item_id = merged_item_ids.get(line[1], line[1]) if kind != "add" else None
+            if kind == "add":
+                _kind, name, quantity, price, _item_id = line
+                error_message = self._validate_new_stock(name, quantity, price)
+                if error_message:
+                    errors.append((position, error_message))
+                    continue
+                key = self._name_key(name)
+                existing_item_id = new_names.get(key) or self._name_index.get(key)
+                state = current(existing_item_id) if existing_item_id else None
+                if state is None:
+                    outcome[new_item_id] = [name.strip(), quantity, price]
+                    new_names[key] = new_item_id
+                    created_item_ids.add(new_item_id)
+                    movements.append(("add", new_item_id, quantity, price))
+                elif state[1] + quantity > self.max_quantity:
+                    errors.append((position, self._too_much_stock(name, quantity)))
+                else:
+                    state[1] += quantity
+                    state[2] = price
+                    merged_item_ids[new_item_id] = existing_item_id
+                    movements.append(("add", existing_item_id, quantity, price))
+            elif kind == "spend":
+                amount = line[2]
+                state = current(item_id)
+                if state is None:
+                    errors.append((position, f"Error: Item with ID '{item_id}' not found. Cannot record spend."))
+                elif self._quantity_error(amount):
+                    errors.append((position, f"Error: Amount spent {self._quantity_error(amount)}."))
+                elif state[1] < amount:
+                    errors.append((position, f"Error: Not enough '{state[0]}' (ID: {item_id}) in stock. Available: {state[1]}, Tried to spend: {amount}."))
+                else:
+                    state[1] -= amount
+                    movements.append(("spend", item_id, -amount, state[2]))
+            elif kind == "update":
+                _kind, _item_id, quantity, price = line
+                state = current(item_id)
+                if state is None:
+                    errors.append((position, f"Error: Couldn't find any item with ID '{item_id}'. Are you sure that's the right one?"))
+                elif quantity is not None and self._quantity_error(quantity, allow_zero=True):
+                    errors.append((position, f"Error: New quantity for total stock {self._quantity_error(quantity, allow_zero=True)}."))
+                elif price is not None and (not self._is_finite(price) or price <= 0):
+                    errors.append((position, "Error: New price must be a positive number. Even free items are ₹0.00, not negative!"))
+                elif quantity is None and price is None:
+                    errors.append((position, "No valid updates provided for the item."))
+                else:
+                    if quantity is not None and quantity != state[1]:
+                        movements.append(("adjust", item_id, quantity - state[1], state[2] if price is None else price))
+                        state[1] = quantity
+                    if price is not None and price != state[2]:
+                        movements.append(("price", item_id, 0, price))
+                        state[2] = price
+            elif kind == "delete":
+                state = current(item_id)
+                if state is None:
+                    errors.append((position, f"Error: Couldn't delete item. ID '{item_id}' not found in inventory."))
+                else:
+                    movements.append(("delete", item_id, -state[1], state[2]))
+                    outcome[item_id] = None
+            else:
+                errors.append((position, f"Error: Unknown transaction line '{kind}'."))
+        # An item created and deleted again within the transaction never really existed: it leaves no
+        # trace in the inventory, and its movements would only inflate the ledger's totals.
+        short_lived = {item_id for item_id in created_item_ids if outcome[item_id] is None}
+        if short_lived:
+            for item_id in short_lived:
+                del outcome[item_id]
+            movements = [movement for movement in movements if movement[1] not in short_lived]
+        return errors, outcome, movements
+
+    def _apply_transaction(self, outcome, movements):
+        """Writes a checked transaction into the inventory (all its locks held), then saves it once and tells the listeners."""
+        changes = []
+        self._record_movements(movements)
+        with self._index_lock:
+            # Deletions go first, so an item deleted and re-added by name in the same transaction gets its name back.
+            for item_id, state in outcome.items():
+                if state is None and item_id in self.items:
+                    item = self.items.pop(item_id)
+                    self._items_snapshot = None
+                    self._unindex_name(item_id, item["name"])
+                    changes.append(("deleted", item_id))
+            for item_id, state in outcome.items():
+                if state is None:
+                    continue
+                item = self.items.get(item_id)
+                if item is None:
+                    self.items[item_id] = InventoryItem(*state)
+                    self._items_snapshot = None
+                    self._index_name(item_id, self._name_key(state[0]), name=state[0])
+                    changes.append(("added", item_id))
+                else:
+                    item["quantity"] = state[1]
+                    item["price"] = state[2]
+                    changes.append(("updated", item_id))
+            self._sync_columns([item_id for _change, item_id in changes])
+        if changes:
+            self._persist_changes([item_id for _change, item_id in changes])
+        for change, item_id in changes:
+            self._notify_listeners(change, item_id)
+
+    def _remove_item(self, item_id):
+        """Deletes an item (the caller holds the lock for its name). Returns its name, or None if it's already gone."""
+        with self._item_lock(item_id):
+            item = self.items.get(item_id)
+            if item is None:
+                return None
+            self._record_movement("delete", item_id, -item["quantity"], item["price"])
+            with self._index_lock:
+                del self.items[item_id]
+                self._items_snapshot = None
+                self._unindex_name(item_id, item["name"])
+            self._item_changed(item_id, "deleted")
+        return item["name"]
 
     def delete_item(self, item_id):
         """
         This function helps us remove an item from our inventory using its unique ID.
 
         """
-        if item_id in self.items:
-            item_name = self.items[item_id]["name"]
-            del self.items[item_id]
-            self._save_data()
+        item = self.items.get(item_id)
+        item_name = None
+        if item is not None:
+            with self._name_lock(self._name_key(item["name"])):
+                item_name = self._remove_item(item_id)
+        if item_name is not None:
             return f"Success: Item '{item_name}' (ID: {item_id}) has been removed from inventory."
         else:
             return f"Error: Couldn't delete item. ID '{item_id}' not found in inventory."
@@ -155,21 +2613,14 @@ class InventoryManager:
         Deletes an item from the inventory based on its name.
         
         """
-        cleaned_name = name.strip().lower()
-        item_found = False
-        item_id_to_delete = None
-        item_name_actual = ""
+        cleaned_name = self._name_key(name)
+        item_name_actual = None
+        with self._name_lock(cleaned_name):
+            item_id_to_delete = self._name_index.get(cleaned_name)
+            if item_id_to_delete:
+                item_name_actual = self._remove_item(item_id_to_delete)
 
-        for item_id, details in self.items.items():
-            if details["name"].lower() == cleaned_name:
-                item_id_to_delete = item_id
-                item_name_actual = details["name"]
-                item_found = True
-                break
-        
-        if item_found and item_id_to_delete:
-            del self.items[item_id_to_delete]
-            self._save_data()
+        if item_name_actual is not None:
             return f"Success: Item '{item_name_actual}' (ID: {item_id_to_delete}) has been removed from inventory."
         else:
             return f"Error: Couldn't delete item. Item named '{name}' not found in inventory."
@@ -179,69 +2630,554 @@ class InventoryManager:
         Retrieves an item's details based on its name (case-insensitive).
         
         """
-        cleaned_name = name.strip().lower()
-        for item_id, details in self.items.items():
-            if details["name"].lower() == cleaned_name:
-                return item_id, details
-        return None
+        item_id = self._name_index.get(self._name_key(name))
+        item = self.items.get(item_id)
+        if item is None:
+            return None
+        return item_id, item
 
 
     def get_all_items(self):
         """
         Need to see everything in your inventory? This function gives you a list of all items.
 
-        
+        It's a fresh copy of the whole inventory each time, which you may change as you like. To just
+        read, items_view(), items_snapshot() and iter_items() give you the same items without copying.
         """
         return self.items.copy()
 
+    def items_view(self):
+        """
+        A live, read-only view of the inventory (item_id -> item): nothing is copied and it always shows
+        the current items. Don't change the item records through it; use the manager's methods.
+        Adds and deletes show up in the view right away, so walk it on the thread that makes the changes
+        (like the window does). Other threads should use items_snapshot() or iter_items().
+        """
+        return self._items_view
+
+    def items_snapshot(self):
+        """
+        A read-only mapping of the items as they are now. Which items it holds stays fixed even while other
+        threads add or delete items, so it's safe to walk from anywhere; the quantities and prices are
+        still the live ones. It's copied once and then handed out again until the next add or delete.
+        """
+        snapshot = self._items_snapshot
+        if snapshot is None:
+            with self._index_lock:
+                snapshot = self._items_snapshot
+                if snapshot is None:
+                    snapshot = self._items_snapshot = types.MappingProxyType(self.items.copy())
+        return snapshot
+
+    # Fields iter_items() can sort and filter by through the sort indexes (it can sort by "name" too).
+    _SORT_FIELDS = ("quantity", "price", "stock_value", "id")
+
+    def iter_items(self, offset=0, limit=None, sort_key=None, reverse=False, low=None, high=None, filter_field=None):
+        """
+        Walks the inventory without copying it: yields (item_id, item) pairs, skipping the first 'offset'
+        and stopping after 'limit' of them (None for no limit).
+
+        'sort_key' picks the order:
+          - None: the order the items were added in (walked over items_snapshot()).
+          - "name": alphabetical, straight off the sorted name keys, so a page costs about 'limit' steps
+            however big the inventory is.
+          - "quantity", "price", "stock_value" or "id": straight off that field's sort index (ties go by item id),
+            so a page costs about 'limit' steps too. The indexes are built by the first such call, see build_sort_indexes().
+          - A function that takes an item and returns its sort key. With a 'limit' only the first
+            offset + limit items are kept while sorting, so early pages stay cheap.
+        'reverse' walks the same order backwards. Items deleted while the walk is under way are skipped.
+
+        'low' and 'high' keep only the items whose 'filter_field' is at least 'low' and below 'high' (leave
+        either out for an open end). 'filter_field' is one of the indexed fields and defaults to 'sort_key';
+        without a 'sort_key' the items come in 'filter_field' order. Only the matching items are visited,
+        e.g. iter_items(sort_key="quantity", high=10) walks just the items with fewer than 10 in stock.
+        """
+        stop = None if limit is None else offset + limit
+        if filter_field is None and (low is not None or high is not None):
+            filter_field = sort_key
+        if filter_field is not None:
+            self._check_filter(filter_field, low, high)
+            if sort_key is None or sort_key == filter_field:
+                return self._iter_by_index(filter_field, offset, stop, reverse, low, high)
+            # Sorted by another field: only the matching items get sorted.
+            pairs = list(self._iter_by_index(filter_field, 0, None, False, low, high))
+        elif sort_key in self._SORT_FIELDS:
+            return self._iter_by_index(sort_key, offset, stop, reverse)
+        elif sort_key is None:
+            pairs = self.items_snapshot().items()
+            return itertools.islice(reversed(pairs) if reverse else pairs, offset, stop)
+        else:
+            pairs = self.items_snapshot().items()
+
+        if sort_key == "name":
+            if filter_field is None and not self._has_duplicate_names:
+                return self._iter_by_name(self._sorted_name_keys, offset, stop, reverse)
+            # Old files can hold the same name twice and the name index only knows one of them.
+            sort_key = lambda item: self._name_key(item["name"])
+        elif sort_key == "id":
+            # Every item gets the same key, so the tie-break (the item id) decides.
+            sort_key = lambda item: 0
+        elif sort_key in self._SORT_FIELDS:
+            field = sort_key
+            sort_key = lambda item: item[field]
+        elif not callable(sort_key):
+            raise ValueError(f"Can't sort by '{sort_key}'. Use None, 'name', {', '.join(map(repr, self._SORT_FIELDS))} or a function.")
+
+        def pair_key(pair):
+            # Ties are broken by item id, so pages never overlap or skip an item.
+            return sort_key(pair[1]), pair[0]
+
+        if stop is None:
+            ordered = sorted(pairs, key=pair_key, reverse=reverse)
+        else:
+            ordered = (heapq.nlargest if reverse else heapq.nsmallest)(stop, pairs, key=pair_key)
+        return itertools.islice(ordered, offset, None)
+
+    def count_items(self, filter_field=None, low=None, high=None):
+        """
+        How many items have 'filter_field' at least 'low' and below 'high' (the same filter as iter_items()),
+        or how many items there are without a 'filter_field'. A couple of bisects on the field's sort index.
+        """
+        if filter_field is None:
+            return len(self.items)
+        self._check_filter(filter_field, low, high)
+        sort_index = self.build_sort_indexes()[filter_field]
+        with self._index_lock:
+            start, stop = sort_index.bounds(low, high)
+        return stop - start
+
+    def _check_filter(self, filter_field, low, high):
+        """
+        Raises ValueError (with a message saying why) unless 'filter_field' is an indexed field and 'low'/'high'
+        can be compared with it: text for "id", finite numbers for the others. The sort indexes are bisected
+        with these, so a wrong type would otherwise fail halfway through with a TypeError, and NaN would match nothing.
+        """
+        if filter_field not in self._SORT_FIELDS:
+            raise ValueError(f"Can't filter by '{filter_field}'. Use {', '.join(map(repr, self._SORT_FIELDS))}.")
+        for bound_name, bound in (("low", low), ("high", high)):
+            if bound is None:
+                continue
+            if filter_field == "id":
+                if not isinstance(bound, str):
+                    raise ValueError(f"'{bound_name}' has to be text when filtering by 'id', not {bound!r}.")
+            elif isinstance(bound, bool) or not isinstance(bound, numbers.Real) or bound != bound:
+                raise ValueError(f"'{bound_name}' has to be a number when filtering by '{filter_field}', not {bound!r}.")
+
+    def _iter_by_index(self, field, offset, stop, reverse, low=None, high=None):
+        # Only the page of ids is read under the lock; the items are looked up (and deleted ones skipped) afterwards.
+        sort_index = self.build_sort_indexes()[field]
+        with self._index_lock:
+            start, end = sort_index.bounds(low, high)
+            first = min(offset, end - start)
+            last = end - start if stop is None else min(stop, end - start)
+            if reverse:
+                item_ids = sort_index.item_ids(end - last, end - first, reverse=True)
+            else:
+                item_ids = sort_index.item_ids(start + first, start + last)
+        return self._with_items(item_ids)
+
+    def _with_items(self, item_ids):
+        for item_id in item_ids:
+            item = self.items.get(item_id)
+            if item is not None:
+                yield item_id, item
+
+    def _iter_by_name(self, sorted_keys, offset, stop, reverse):
+        # The sorted key list is never changed in place (see _index_name), so it can be walked without locking.
+        count = len(sorted_keys)
+        stop = count if stop is None else min(stop, count)
+        for position in range(offset, stop):
+            key = sorted_keys[count - 1 - position] if reverse else sorted_keys[position]
+            item_id = self._name_index.get(key)
+            item = self.items.get(item_id)
+            if item is not None:
+                yield item_id, item
+
+    def list_items(self, offset=0, limit=50):
+        """
+        One page of the inventory in alphabetical order, for callers that can't take everything at once.
+        Returns (total, [(item_id, item), ...]). Walks the sorted name keys, so a page costs about
+        'limit' steps no matter how big the inventory is, and it never waits for writers.
+        """
+        total = len(self.items) if self._has_duplicate_names else len(self._sorted_name_keys)
+        return total, list(self.iter_items(offset, limit, sort_key="name"))
+
+    # --- Stock movement history ---
+
+    def _require_ledger(self):
+        if self.ledger is None:
+            raise ValueError("Stock movements aren't being tracked. Create the manager with track_movements=True.")
+        return self.ledger
+
+    def movement_rollup(self, item_id, period="day", count=7):
+        """
+        How much of an item came in and went out in each of the last 'count' hours or days (period "hour" or "day"),
+        oldest first, as (bucket start timestamp, units added, units spent).
+        """
+        return self._require_ledger().rollup(item_id, period, count)
+
+    def consumption_rate(self, item_id, days=7):
+        """Average units of an item spent per day over the last 'days' days."""
+        return self._require_ledger().consumption_rate(item_id, days)
+
+    def forecast_stockout(self, item_id, days=7, reorder_level=0):
+        """
+        Roughly how many days until an item's stock falls to 'reorder_level' if it keeps selling at
+        its rate over the last 'days' days. 0 if it's already there, None if it isn't selling at all.
+        """
+        item = self.items.get(item_id)
+        if item is None:
+            return None
+        rate = self.consumption_rate(item_id, days)
+        if item["quantity"] <= reorder_level:
+            return 0.0
+        if rate <= 0:
+            return None
+        return (item["quantity"] - reorder_level) / rate
+
+    # --- Analytics: whole-inventory questions answered from the quantity/price columns ---
+
+    def _read_columns(self):
+        """
+        A copy of the columns for one query. Copying is a quick memory copy; the query itself then runs
+        without holding any lock, so writers never wait for it (and NumPy views never pin the live arrays).
+        """
+        with self._index_lock:
+            return self._columns.copy()
+
+    def total_stock_value(self):
+        """
+        The value of everything in stock (sum of quantity x unit price over all items).
+        This is a running total kept up to date by every change, so it's instant at any catalog size.
+        """
+        if not self._columns.item_ids:
+            return 0.0
+        return self._columns.total_value
+
+    def stock_value_by_price_band(self, band_edges=(0, 10, 50, 100, 500, 1000)):
+        """
+        Splits the inventory into unit-price bands and reports how many items and how much stock value
+        fall into each. 'band_edges' must be sorted; the bands are [edge, next edge) and the last one
+        is open-ended. Returns a list of {"low", "high", "items", "stock_value"} dicts (high is None for the last band).
+        """
+        band_edges = list(band_edges)
+        band_count = len(band_edges)
+        item_counts = [0] * band_count
+        band_values = [0.0] * band_count
+        columns = self._read_columns()
+
+        if _load_numpy() is not None and columns.item_ids:
+            quantities, prices = columns.numpy_views()
+            bands = numpy.searchsorted(numpy.asarray(band_edges, dtype=numpy.float64), prices, side="right") - 1
+            in_a_band = bands >= 0
+            item_counts = numpy.bincount(bands[in_a_band], minlength=band_count).tolist()
+            band_values = numpy.bincount(bands[in_a_band], weights=(quantities * prices)[in_a_band], minlength=band_count).tolist()
+        else:
+            for quantity, price in zip(columns.quantities, columns.prices):
+                band = bisect.bisect_right(band_edges, price) - 1
+                if band >= 0:
+                    item_counts[band] += 1
+                    band_values[band] += quantity * price
+
+        return [{"low": band_edges[band],
+                 "high": band_edges[band + 1] if band + 1 < band_count else None,
+                 "items": int(item_counts[band]),
+                 "stock_value": float(band_values[band])}
+                for band in range(band_count)]
+
+    def top_items_by_value(self, count=10):
+        """The 'count' items with the highest stock value, as (item_id, stock_value) pairs, highest first."""
+        if count <= 0:
+            return []
+        columns = self._read_columns()
+        if not columns.item_ids:
+            return []
+        if _load_numpy() is not None:
+            quantities, prices = columns.numpy_views()
+            values = quantities * prices
+            if count < len(values):
+                # argpartition finds the top 'count' without sorting everything; only those get sorted.
+                top_rows = numpy.argpartition(-values, count - 1)[:count]
+            else:
+                top_rows = numpy.arange(len(values))
+            top_rows = top_rows[numpy.argsort(-values[top_rows], kind="stable")]
+            return [(columns.item_ids[row], float(values[row])) for row in top_rows.tolist()]
+        values = ((quantity * price, row) for row, (quantity, price) in enumerate(zip(columns.quantities, columns.prices)))
+        return [(columns.item_ids[row], value) for value, row in heapq.nlargest(count, values, key=lambda pair: pair[0])]
+
+    def items_below_reorder_level(self, reorder_level):
+        """Ids of all items whose quantity is below 'reorder_level', i.e. the ones that need restocking."""
+        columns = self._read_columns()
+        if _load_numpy() is not None and columns.item_ids:
+            quantities, _prices = columns.numpy_views()
+            return [columns.item_ids[row] for row in numpy.flatnonzero(quantities < reorder_level).tolist()]
+        return [item_id for item_id, quantity in zip(columns.item_ids, columns.quantities) if quantity < reorder_level]
+
+
+# --- Multiple locations ---
+
+def _summarize_location(location, data_file, storage_mode, snapshot_format, name_keys):
+    """
+    Runs in a worker process: reads one location's shard from disk (without changing it) and sums it up.
+    Returns {"location", "items", "stock_value", "stock"}, where "stock" maps each of 'name_keys'
+    found there to its [quantity, stock_value].
+    """
+    with open(os.devnull, "w") as quiet, contextlib.redirect_stdout(quiet):
+        storage = _create_storage(data_file, storage_mode, snapshot_format)
+        try:
+            # SQLite can hand the rows over a page at a time; the file formats have to be read whole.
+            items = storage.iter_items() if isinstance(storage, SQLiteStorage) else storage.read_items().items()
+            summary = _sum_up_items(location, items, name_keys)
+        finally:
+            storage.close({})
+    return summary
+
+
+def _sum_up_items(location, items, name_keys):
+    """The _summarize_location() result for an iterable of (item_id, details) pairs."""
+    wanted = set(name_keys)
+    stock = {}
+    values = []
+    for _item_id, details in items:
+        value = details["quantity"] * details["price"]
+        values.append(value)
+        if wanted:
+            key = InventoryManager._name_key(details["name"])
+            if key in wanted:
+                found = stock.setdefault(key, [0, 0.0])
+                found[0] += details["quantity"]
+                found[1] += value
+    return {"location": location, "items": len(values), "stock_value": math.fsum(values), "stock": stock}
+
+
+class ShardedInventory:
+    """
+    The inventories of many stores and warehouses, one shard per location. Every location is an ordinary
+    inventory file in 'folder' (<folder>/<location>.json with the default settings) that InventoryManager can
+    open on its own, so adding a location adds a file instead of growing one giant one.
+
+    Changes go to the owning location's InventoryManager, which is opened the first time it's needed;
+    location(name) hands it out for anything else. Questions about all locations at once (total_stock_value,
+    stock_by_location, global_stock) read the shard files in a pool of 'workers' processes (one per CPU by
+    default), one location per task, so they use every core and don't need all locations loaded here.
+    With workers=0 they run in this process instead.
+
+    'storage_mode', 'snapshot_format' and any other 'manager_options' (write_mode, track_movements, ...)
+    are passed to each location's InventoryManager.
+    """
+
+    # Location names end up as file names, so they're kept to letters, digits, '-' and '_'.
+    _LOCATION_NAME = re.compile(r"[\w-]+")
+
+    def __init__(self, folder="locations", storage_mode="journal", snapshot_format="json", workers=None, **manager_options):
+        if "storage" in manager_options:
+            raise ValueError("Every location keeps its own file, so a single 'storage' can't be passed in.")
+        if snapshot_format not in ("json", "binary"):
+            raise ValueError(f"Unknown snapshot format '{snapshot_format}'. Use 'json' or 'binary'.")
+        if storage_mode not in ("snapshot", "journal", "sqlite"):
+            raise ValueError(f"Unknown storage mode '{storage_mode}'. Use 'snapshot', 'journal' or 'sqlite'.")
+        self.folder = folder
+        self.storage_mode = storage_mode
+        self.snapshot_format = snapshot_format
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.manager_options = manager_options
+        os.makedirs(folder, exist_ok=True)
+        # Location name -> its InventoryManager, for the locations opened so far.
+        self._managers = {}
+        self._managers_lock = threading.Lock()
+        # The worker processes, started by the first question about all locations.
+        self._pool = None
+
+    def _shard_file(self, location):
+        if not isinstance(location, str) or not self._LOCATION_NAME.fullmatch(location):
+            raise ValueError(f"'{location}' can't be used as a location name. Use letters, digits, '-' and '_'.")
+        return os.path.join(self.folder, f"{location}.json")
+
+    def _shard_suffix(self):
+        """The file name ending of the shard files (the InventoryManager storage decides it)."""
+        if self.storage_mode == "sqlite":
+            return ".db"
+        return ".snap" if self.snapshot_format == "binary" else ".json"
+
+    def locations(self):
+        """Every location, in name order: the ones with a shard file plus the ones opened since."""
+        suffix = self._shard_suffix()
+        found = set()
+        for file_name in os.listdir(self.folder):
+            # Until its first compaction, a location in journal mode only has its journal ('<shard file>.log').
+            location = file_name.removesuffix(".log").removesuffix(suffix)
+            if location != file_name.removesuffix(".log") and self._LOCATION_NAME.fullmatch(location):
+                found.add(location)
+        with self._managers_lock:
+            found.update(self._managers)
+        return sorted(found)
+
+    def location(self, location):
+        """The InventoryManager of one location, opened (or created, for a new location) on first use."""
+        data_file = self._shard_file(location)
+        with self._managers_lock:
+            manager = self._managers.get(location)
+            if manager is None:
+                manager = InventoryManager(data_file, storage_mode=self.storage_mode,
+                                           snapshot_format=self.snapshot_format, **self.manager_options)
+                self._managers[location] = manager
+            return manager
+
+    # --- Changes, routed to the location that owns the item ---
+
+    def add_item(self, location, name, quantity, price):
+        return self.location(location).add_item(name, quantity, price)
+
+    def update_item(self, location, item_id, new_quantity=None, new_price=None):
+        return self.location(location).update_item(item_id, new_quantity, new_price)
+
+    def record_spend(self, location, item_id, amount_spent):
+        return self.location(location).record_spend(item_id, amount_spent)
+
+    def delete_item(self, location, item_id):
+        return self.location(location).delete_item(item_id)
+
+    # --- Questions about every location, answered in parallel ---
+
+    def _summaries(self, name_keys=()):
+        """One _summarize_location() result per location, in location order."""
+        # The workers read the files, so everything changed here has to be on disk first.
+        self.flush()
+        locations = self.locations()
+        tasks = [(location, self._shard_file(location), self.storage_mode, self.snapshot_format, tuple(name_keys))
+                 for location in locations]
+        if self.workers <= 0 or len(tasks) <= 1:
+            return [_summarize_location(*task) for task in tasks]
+        return list(self._worker_pool().map(_summarize_location, *zip(*tasks)))
+
+    def _worker_pool(self):
+        if self._pool is None:
+            # Only needed once there's a question about all locations, so imported here.
+            import concurrent.futures
+            import multiprocessing
+            # "spawn" starts fresh processes, which never inherit a lock held by one of our threads.
+            self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers,
+                                                                mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def stock_by_location(self):
+        """How many items each location has and what its stock is worth: {location: {"items", "stock_value"}}."""
+        return {summary["location"]: {"items": summary["items"], "stock_value": summary["stock_value"]}
+                for summary in self._summaries()}
+
+    def total_stock_value(self):
+        """The value of everything in stock at every location."""
+        return math.fsum(summary["stock_value"] for summary in self._summaries())
+
+    def global_stock(self, name):
+        """
+        How much of the item called 'name' (ignoring case) there is across all locations:
+        {"name", "quantity", "stock_value", "locations": {location: quantity}}, listing only the locations that stock it.
+        """
+        key = InventoryManager._name_key(name)
+        stock = {"name": name, "quantity": 0, "stock_value": 0.0, "locations": {}}
+        for summary in self._summaries((key,)):
+            found = summary["stock"].get(key)
+            if found is not None:
+                stock["quantity"] += found[0]
+                stock["stock_value"] += found[1]
+                stock["locations"][summary["location"]] = found[0]
+        return stock
+
+    def flush(self):
+        """Pushes every open location's pending changes to disk."""
+        with self._managers_lock:
+            managers = list(self._managers.values())
+        for manager in managers:
+            manager.flush()
+
+    def close(self):
+        """Closes every open location and stops the worker processes."""
+        with self._managers_lock:
+            managers = list(self._managers.values())
+            self._managers.clear()
+        for manager in managers:
+            manager.close()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
 class InventoryApp:
-    
-    def __init__(self, master_window):
+
+    # How many names an autocomplete dropdown shows at most. Keeps typing snappy on huge catalogs.
+    autocomplete_limit = 200
+    # With display_mode="auto", inventories bigger than this get the virtual (windowed) table.
+    virtual_threshold = 5000
+    # Extra rows created below the visible ones in the virtual table, so partly visible rows still show.
+    virtual_buffer_rows = 2
+    # What gets timed (as "app.<name>") when the window is opened with an Instrumentation:
+    # table refreshes, autocomplete and the button handlers.
+    instrumented_operations = (
+        "_finish_startup", "_update_item_list", "_render_virtual_window", "_on_inventory_change", "_sort_by_column",
+        "_refresh_combobox_suggestions", "_on_item_select", "_add_item_gui", "_delete_item_by_name_gui",
+        "_check_stock_value_gui", "_update_quantity_by_name_gui", "_apply_filter_gui",
+    )
+    # Table column -> the field InventoryManager.iter_items() sorts (and filters) that column by.
+    column_fields = {"Name": "name", "Quantity": "quantity", "Price": "price", "Stock Value": "stock_value", "ID": "id"}
+    # Columns the filter bar above the table can narrow the inventory down by.
+    filter_columns = ("Quantity", "Price", "Stock Value")
+
+    def __init__(self, master_window, display_mode="auto", startup_report=False, instrumentation=None):
         """
         Sets up our main application window and connects all the pieces.
 
-        
+        'display_mode' picks how the inventory table is drawn:
+          - "full": one Treeview row per item (fine for everyday inventories).
+          - "virtual": only the rows that fit on screen exist; scrolling just swaps their contents.
+          - "auto": "virtual" once the inventory has more than 'virtual_threshold' items.
+
+        To get the window on screen sooner, the inventory table and the autocomplete lists are only
+        filled in once the window has been drawn. How long each step of startup took ends up in
+        'startup_timings' (seconds since mod.py was imported); with 'startup_report' it's printed too.
+
+        With an 'instrumentation' (see Instrumentation) both the window's 'instrumented_operations' and its
+        InventoryManager are timed. It has to be given here, before the buttons are wired to the methods.
         """
+        if display_mode not in ("auto", "full", "virtual"):
+            raise ValueError(f"Unknown display mode '{display_mode}'. Use 'auto', 'full' or 'virtual'.")
+        self.instrumentation = instrumentation
+        if instrumentation is not None:
+            instrumentation.attach(self, self.instrumented_operations, prefix="app.")
+        self.startup_timings = []
+        self.startup_report = startup_report
+        self._mark_startup("window requested")
+        _load_gui_modules()
+        self._mark_startup("GUI modules imported")
         self.master = master_window
         master_window.title("NeoASJ's Inventory System") # Set a generic title for the main window title bar
         master_window.geometry("900x600")
         master_window.resizable(True, True)
 
-        # Load and resize the image for the custom title/logo
+        # Load the logo for the custom title, scaled down (from the cache when possible)
         try:
             # Construct the path to the uploaded image. Assuming it's in the same directory.
             # Updated image path to the new image
             image_path = "2.png" 
-            original_image = Image.open(image_path)
-            # Define target width and height for the logo
-            target_width = 50 # Smaller width for the icon
-            target_height = 50 # Smaller height for the icon
-            # Resize image while maintaining aspect ratio
-            original_width, original_height = original_image.size
-            aspect_ratio = original_width / original_height
-            if target_width / target_height > aspect_ratio:
-                # Target is wider, so scale by height
-                new_height = target_height
-                new_width = int(new_height * aspect_ratio)
-            else:
-                # Target is taller or aspect ratios match, so scale by width
-                new_width = target_width
-                new_height = int(new_width / aspect_ratio)
-
-            resized_image = original_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            self.app_logo = ImageTk.PhotoImage(resized_image)
+            self.app_logo = _load_logo(image_path, target_width=50, target_height=50) # Smaller size for the icon
         except FileNotFoundError:
             messagebox.showerror("Image Error", f"Logo image not found at '{image_path}'. Make sure it's in the correct directory.")
             self.app_logo = None
         except Exception as e:
             messagebox.showerror("Image Error", f"Failed to load or process logo: {e}")
             self.app_logo = None
+        self._mark_startup("logo loaded")
 
         # Define a bold font for "NeoTrack" label
         self.neotrack_font = tkFont.Font(family="Helvetica", size=18, weight="bold")
 
 
-        self.inventory_manager = InventoryManager()
+        # Journal mode keeps every button click down to a tiny append instead of a full file rewrite,
+        # and the background writer takes even that off the button handlers.
+        self._init_table_state(InventoryManager(storage_mode="journal", write_mode="background", instrumentation=instrumentation),
+                               display_mode)
+        master_window.protocol("WM_DELETE_WINDOW", self._on_close)
+        self._mark_startup("inventory loaded")
 
         master_window.grid_rowconfigure(0, weight=1)
         master_window.grid_columnconfigure(0, weight=1)
@@ -279,15 +3215,69 @@ class InventoryApp:
         # --- Right Pane (Display Frame) ---
         self.display_frame = ttk.LabelFrame(master_window, text="Current Inventory")
         self.display_frame.grid(row=0, column=1, padx=10, pady=10, sticky="nsew")
-        self.display_frame.grid_rowconfigure(0, weight=1) # Treeview will now start from row 0 and take all vertical space
+        self.display_frame.grid_rowconfigure(1, weight=1) # Treeview sits under the filter bar and takes all vertical space
         self.display_frame.grid_columnconfigure(0, weight=1)
         
         current_row_display_frame = 0 # Start from row 0 as there are no elements above now
 
         # Now, create the display widgets (Treeview) starting from 'current_row_display_frame'
         self._create_display_widgets(self.display_frame, start_row=current_row_display_frame)
-        
+        self._mark_startup("widgets built")
+
+        # The rows and suggestions aren't needed for the first paint, so fill them in once the window is up.
+        master_window.after_idle(self._finish_startup)
+
+    def _init_table_state(self, inventory_manager, display_mode="auto"):
+        """
+        Everything the window keeps track of besides its widgets: the inventory, the table mode, its ordering
+        and filter, and the virtual window. Needs no Tk at all, so the benchmarks can set up a window without a display.
+        """
+        self.inventory_manager = inventory_manager
+        if display_mode == "auto":
+            self.virtual_mode = len(inventory_manager.items_view()) > self.virtual_threshold
+        else:
+            self.virtual_mode = display_mode == "virtual"
+        # Table ordering (column header clicks), the filter bar's (column, low, high) and the state of the virtual window.
+        self._sort_column = None
+        self._sort_reverse = False
+        self._row_filter = None
+        self._row_order = []
+        self._row_offset = 0
+        self._visible_rows = 20
+        self._selected_item_id = None
+        # Set by a helper thread once substring/fuzzy name search is ready (see _finish_startup).
+        self._search_ready = False
+
+    def _mark_startup(self, step):
+        self.startup_timings.append((step, time.perf_counter() - _IMPORT_STARTED))
+
+    def _finish_startup(self):
+        """Runs right after the window is first drawn: fills in the table and starts listening for changes."""
+        self._mark_startup("first paint")
         self._update_item_list()
+        # From now on, only the rows that actually change get redrawn.
+        self.inventory_manager.add_change_listener(self._on_inventory_change)
+        self._mark_startup("inventory shown")
+        # The search and sort indexes take a moment on big inventories, so they're built off the GUI thread.
+        threading.Thread(target=self._build_indexes, name="inventory-indexes", daemon=True).start()
+        if self.startup_report:
+            self._print_startup_report()
+
+    def _build_indexes(self):
+        """
+        Runs on a helper thread. Until it's done, the name boxes only suggest names by prefix,
+        and the first column sort or filter waits for the sort indexes.
+        """
+        self.inventory_manager.build_sort_indexes()
+        self.inventory_manager.build_search_index()
+        self._search_ready = True
+
+    def _print_startup_report(self):
+        print("Startup timings (since mod.py was imported):")
+        previous = 0.0
+        for step, elapsed in self.startup_timings:
+            print(f"  {step:<22} {elapsed * 1000:8.1f} ms  (+{(elapsed - previous) * 1000:.1f} ms)")
+            previous = elapsed
 
     def _create_input_widgets(self, frame_to_fill, start_row=0):
         """
@@ -402,16 +3392,39 @@ class InventoryApp:
         Now with 'Stock Value' instead of 'Spent Value'.
         
         """
+        # --- Filter bar: only show the items whose quantity, price or stock value is in a range ---
+        filter_frame = tk.Frame(frame_to_fill)
+        filter_frame.grid(row=start_row, column=0, columnspan=2, sticky="ew", padx=5, pady=(5, 0))
+        tk.Label(filter_frame, text="Show items with").pack(side=tk.LEFT)
+        self.filter_column_var = tk.StringVar(value=self.filter_columns[0])
+        self.filter_column_combobox = ttk.Combobox(filter_frame, textvariable=self.filter_column_var,
+                                                   values=self.filter_columns, state="readonly", width=11)
+        self.filter_column_combobox.pack(side=tk.LEFT, padx=5)
+        tk.Label(filter_frame, text="from").pack(side=tk.LEFT)
+        self.filter_low_entry = ttk.Entry(filter_frame, width=8)
+        self.filter_low_entry.pack(side=tk.LEFT, padx=5)
+        tk.Label(filter_frame, text="below").pack(side=tk.LEFT)
+        self.filter_high_entry = ttk.Entry(filter_frame, width=8)
+        self.filter_high_entry.pack(side=tk.LEFT, padx=5)
+        self.filter_button = ttk.Button(filter_frame, text="Filter", command=self._apply_filter_gui)
+        self.filter_button.pack(side=tk.LEFT, padx=5)
+        self.clear_filter_button = ttk.Button(filter_frame, text="Show All", command=self._clear_filter_gui)
+        self.clear_filter_button.pack(side=tk.LEFT)
+        # Pressing Enter in either box filters too.
+        self.filter_low_entry.bind("<Return>", lambda event: self._apply_filter_gui())
+        self.filter_high_entry.bind("<Return>", lambda event: self._apply_filter_gui())
+        start_row += 1
+
         # --- The Treeview: Our Inventory Table ---
         # We now have columns for Name, Quantity, Price, Stock Value, and ID.
         self.item_tree = ttk.Treeview(frame_to_fill, columns=("Name", "Quantity", "Price", "Stock Value", "ID"), show="headings")
 
-        # --- Setting up the column headings ---
-        self.item_tree.heading("Name", text="Item Name", anchor=tk.W)
-        self.item_tree.heading("Quantity", text="Current Qty", anchor=tk.W)
-        self.item_tree.heading("Price", text="Unit Price", anchor=tk.W)
-        self.item_tree.heading("Stock Value", text="Stock Value", anchor=tk.W)
-        self.item_tree.heading("ID", text="Item ID", anchor=tk.W) 
+        # --- Setting up the column headings (click one to sort by it, click again to reverse) ---
+        self.item_tree.heading("Name", text="Item Name", anchor=tk.W, command=lambda: self._sort_by_column("Name"))
+        self.item_tree.heading("Quantity", text="Current Qty", anchor=tk.W, command=lambda: self._sort_by_column("Quantity"))
+        self.item_tree.heading("Price", text="Unit Price", anchor=tk.W, command=lambda: self._sort_by_column("Price"))
+        self.item_tree.heading("Stock Value", text="Stock Value", anchor=tk.W, command=lambda: self._sort_by_column("Stock Value"))
+        self.item_tree.heading("ID", text="Item ID", anchor=tk.W, command=lambda: self._sort_by_column("ID"))
 
         # --- Setting column sizes and behavior ---
         self.item_tree.column("Name", width=150, minwidth=100, stretch=tk.YES)
@@ -424,55 +3437,63 @@ class InventoryApp:
         self.item_tree.grid(row=start_row, column=0, sticky="nsew", padx=5, pady=5)
 
         # --- Adding a Scrollbar for the Treeview ---
-        scrollbar = ttk.Scrollbar(frame_to_fill, orient="vertical", command=self.item_tree.yview)
-        self.item_tree.configure(yscrollcommand=scrollbar.set)
-        scrollbar.grid(row=start_row, column=1, sticky="ns", padx=(0,5), pady=5)
+        if self.virtual_mode:
+            # In virtual mode the scrollbar moves our window over the whole inventory,
+            # not the Treeview itself (which only ever holds one screenful of rows).
+            self.tree_scrollbar = ttk.Scrollbar(frame_to_fill, orient="vertical", command=self._on_virtual_scroll)
+            self.item_tree.bind("<Configure>", self._on_virtual_resize)
+            self.item_tree.bind("<MouseWheel>", self._on_virtual_mousewheel)
+            self.item_tree.bind("<Button-4>", lambda event: self._on_virtual_scroll("scroll", -3, "units") or "break")
+            self.item_tree.bind("<Button-5>", lambda event: self._on_virtual_scroll("scroll", 3, "units") or "break")
+            self.item_tree.bind("<Up>", lambda event: self._on_virtual_arrow_key(-1))
+            self.item_tree.bind("<Down>", lambda event: self._on_virtual_arrow_key(1))
+            # Rows get rebuilt while scrolling, so the selected item is remembered and highlighted by tag.
+            self.item_tree.tag_configure("selected_row", background="#cce4ff")
+        else:
+            self.tree_scrollbar = ttk.Scrollbar(frame_to_fill, orient="vertical", command=self.item_tree.yview)
+            self.item_tree.configure(yscrollcommand=self.tree_scrollbar.set)
+        self.tree_scrollbar.grid(row=start_row, column=1, sticky="ns", padx=(0,5), pady=5)
 
         # --- Making items selectable ---
         self.item_tree.bind("<<TreeviewSelect>>", self._on_item_select)
 
+        # --- Total value of the whole inventory, read from the manager's running total ---
+        self.total_value_label = tk.Label(frame_to_fill, text="", anchor=tk.W)
+        self.total_value_label.grid(row=start_row + 1, column=0, columnspan=2, sticky="ew", padx=5, pady=(0, 5))
+
     def _update_autocomplete_suggestions(self, event=None):
         """
-        Updates the suggestions in all comboboxes (delete_by_name, item_search, update_qty_name)
-        based on user input. This function is called every time a key is released in a combobox.
+        Updates the suggestions in the comboboxes (delete_by_name, item_search, update_qty_name)
+        based on user input. On a key release only the combobox that got the key is refreshed;
+        without an event (e.g. after the inventory changed) all three are refreshed.
         """
-        all_item_names = [details["name"] for details in self.inventory_manager.get_all_items().values()]
-        
-        # --- For Delete by Name Combobox ---
-        typed_text_delete = self.delete_by_name_entry_var.get().strip().lower()
-        if typed_text_delete:
-            filtered_names_delete = sorted([name for name in all_item_names if name.lower().startswith(typed_text_delete)])
+        comboboxes = {
+            self.delete_by_name_combobox: self.delete_by_name_entry_var,
+            self.item_search_combobox: self.item_search_entry_var,
+            self.update_qty_name_combobox: self.update_qty_name_var,
+        }
+        if event is not None and event.widget in comboboxes:
+            self._refresh_combobox_suggestions(event.widget, comboboxes[event.widget])
         else:
-            filtered_names_delete = sorted(all_item_names)
-        self.delete_by_name_combobox['values'] = filtered_names_delete
-        if filtered_names_delete and len(typed_text_delete) > 0:
-             self.delete_by_name_combobox.event_generate('<Button-1>')
-        elif not typed_text_delete:
-            self.delete_by_name_combobox.event_generate('<Button-1>')
-
-        # --- For Item Search Combobox ---
-        typed_text_search = self.item_search_entry_var.get().strip().lower()
-        if typed_text_search:
-            filtered_names_search = sorted([name for name in all_item_names if name.lower().startswith(typed_text_search)])
-        else:
-            filtered_names_search = sorted(all_item_names)
-        self.item_search_combobox['values'] = filtered_names_search
-        if filtered_names_search and len(typed_text_search) > 0:
-            self.item_search_combobox.event_generate('<Button-1>')
-        elif not typed_text_search:
-            self.item_search_combobox.event_generate('<Button-1>')
-
-        # --- For Update Quantity by Name Combobox ---
-        typed_text_update_qty = self.update_qty_name_var.get().strip().lower()
-        if typed_text_update_qty:
-            filtered_names_update_qty = sorted([name for name in all_item_names if name.lower().startswith(typed_text_update_qty)])
-        else:
-            filtered_names_update_qty = sorted(all_item_names)
-        self.update_qty_name_combobox['values'] = filtered_names_update_qty
-        if filtered_names_update_qty and len(typed_text_update_qty) > 0:
-            self.update_qty_name_combobox.event_generate('<Button-1>')
-        elif not typed_text_update_qty:
-            self.update_qty_name_combobox.event_generate('<Button-1>')
+            for combobox, text_var in comboboxes.items():
+                self._refresh_combobox_suggestions(combobox, text_var)
+
+    def _refresh_combobox_suggestions(self, combobox, text_var):
+        """
+        Fills one combobox with the names that start with what has been typed into it, followed by
+        names that contain it somewhere else ("nachos" also offers "Dorito's Nachos").
+        The manager keeps its names sorted and indexed, so these are quick lookups, not scans.
+        """
+        typed_text = text_var.get().strip()
+        suggestions = self.inventory_manager.get_names_with_prefix(typed_text, limit=self.autocomplete_limit)
+        if typed_text and self._search_ready and len(suggestions) < self.autocomplete_limit:
+            already_listed = set(suggestions)
+            for _item_id, name in self.inventory_manager.search_items(typed_text, limit=self.autocomplete_limit):
+                if name not in already_listed and len(suggestions) < self.autocomplete_limit:
+                    suggestions.append(name)
+        combobox['values'] = suggestions
+        if suggestions or not typed_text:
+            combobox.event_generate('<Button-1>')
 
 
     def _on_item_select(self, event):
@@ -484,6 +3505,7 @@ class InventoryApp:
         selected_item_id_in_tree = self.item_tree.focus()
         
         if selected_item_id_in_tree:
+            self._selected_item_id = selected_item_id_in_tree
             values_from_tree = self.item_tree.item(selected_item_id_in_tree, 'values')
             
             actual_item_id = values_from_tree[4] 
@@ -533,7 +3555,7 @@ class InventoryApp:
             self.name_entry.delete(0, tk.END)
             self.quantity_entry.delete(0, tk.END)
             self.price_entry.delete(0, tk.END)
-            self._update_item_list()
+            self._update_autocomplete_suggestions() # The table row was already patched by _on_inventory_change
 
     def _delete_item_by_name_gui(self):
         """
@@ -553,7 +3575,7 @@ class InventoryApp:
             messagebox.showinfo("Delete Item Status", result_message)
             
             if "Success" in result_message:
-                self._update_item_list()
+                self._update_autocomplete_suggestions() # The table row was already patched by _on_inventory_change
                 self.delete_by_name_entry_var.set("")
                 self.name_entry.delete(0, tk.END)
                 self.quantity_entry.delete(0, tk.END)
@@ -585,7 +3607,12 @@ class InventoryApp:
             )
             self.stock_value_display_label.config(text=display_text)
         else:
-            self.stock_value_display_label.config(text=f"Item '{search_name}' not found in inventory.")
+            message = f"Item '{search_name}' not found in inventory."
+            if self._search_ready:
+                close_matches = self.inventory_manager.fuzzy_search_items(search_name, limit=3)
+                if close_matches:
+                    message += "\nDid you mean: " + ", ".join(name for _item_id, name, _score in close_matches) + "?"
+            self.stock_value_display_label.config(text=message)
 
     def _update_quantity_by_name_gui(self):
         """
@@ -622,31 +3649,520 @@ class InventoryApp:
         messagebox.showinfo("Update Quantity Status", result_message)
 
         if "Success" in result_message:
-            self._update_item_list()
+            self._update_autocomplete_suggestions() # The table row was already patched by _on_inventory_change
             self.update_qty_name_var.set("")
             self.new_quantity_entry.delete(0, tk.END)
             self.stock_value_display_label.config(text="")
 
 
+    def _on_close(self):
+        """Flushes the inventory to disk before the window goes away."""
+        self.inventory_manager.close()
+        self.master.destroy()
+
+    def _tree_row_values(self, item_id, item_details):
+        """The values shown for one item in the inventory table."""
+        return (item_details["name"],
+                item_details["quantity"],
+                f"₹{item_details['price']:.2f}",
+                f"₹{item_details['stock_value']:.2f}",
+                item_id)
+
+    def _update_total_value_label(self):
+        label_text = f"Total Stock Value: ₹{self.inventory_manager.total_stock_value():.2f}"
+        if self._row_filter is not None:
+            column, low, high = self._row_filter
+            shown = self.inventory_manager.count_items(self.column_fields[column], low, high)
+            label_text += f"   (showing {shown:,} of {len(self.inventory_manager.items_view()):,} items)"
+        self.total_value_label.config(text=label_text)
+
+    def _on_inventory_change(self, change, item_id):
+        """
+        Called by the InventoryManager after every mutation. Instead of rebuilding the whole table,
+        we only touch the one row that changed, using the item_id as the Treeview iid.
+        """
+        self._update_total_value_label()
+        if change == "reset":
+            self._update_item_list()
+            return
+
+        if self.virtual_mode:
+            self._on_virtual_change(change, item_id)
+            return
+
+        if change == "deleted":
+            if self.item_tree.exists(item_id):
+                self.item_tree.delete(item_id)
+            return
+
+        item_details = self.inventory_manager.items_view().get(item_id)
+        if item_details is None:
+            # The manager and the table disagree about this item, so fall back to a full rebuild.
+            self._update_item_list()
+            return
+
+        if self._row_filter is not None and not self._row_in_filter(item_details):
+            # The change took the item out of the filtered range (or it never was in it).
+            if self.item_tree.exists(item_id):
+                self.item_tree.delete(item_id)
+            return
+
+        row_values = self._tree_row_values(item_id, item_details)
+        if self.item_tree.exists(item_id):
+            self.item_tree.item(item_id, values=row_values)
+        else:
+            self.item_tree.insert("", tk.END, iid=item_id, values=row_values)
+        if self._uses_manager_order():
+            self._move_to_sorted_position(item_id)
+
+    # --- Sorting and filtering: the order comes from the manager's sort indexes ---
+
+    def _uses_manager_order(self):
+        """True once the table is sorted by a column or filtered, i.e. its rows come from iter_items()."""
+        return self._sort_column is not None or self._row_filter is not None
+
+    def _table_query(self):
+        """The iter_items() arguments for the table's sort column and filter."""
+        query = {"reverse": self._sort_reverse}
+        if self._sort_column is not None:
+            query["sort_key"] = self.column_fields[self._sort_column]
+        if self._row_filter is not None:
+            column, query["low"], query["high"] = self._row_filter
+            query["filter_field"] = self.column_fields[column]
+        return query
+
+    def _row_in_filter(self, item_details):
+        column, low, high = self._row_filter
+        value = item_details[self.column_fields[column]]
+        return (low is None or value >= low) and (high is None or value < high)
+
+    def _row_sort_key(self, item_id):
+        """
+        How an item is ordered in the table: by the sort column, or by the filtered column while
+        nothing is sorted (the same order iter_items() gives).
+        """
+        column = self._sort_column
+        if column is None and self._row_filter is not None:
+            column = self._row_filter[0]
+        item_details = self.inventory_manager.items_view()[item_id]
+        if column == "Name":
+            return (item_details["name"].strip().casefold(), item_id)
+        if column == "Quantity":
+            return (item_details["quantity"], item_id)
+        if column == "Price":
+            return (item_details["price"], item_id)
+        if column == "Stock Value":
+            return (item_details["stock_value"], item_id)
+        return (item_id,)
+
+    def _move_to_sorted_position(self, item_id):
+        """Moves one row of the full table to where it belongs in the current order."""
+        other_ids = [row_id for row_id in self.item_tree.get_children() if row_id != item_id]
+        if self._sort_reverse:
+            other_ids.reverse()
+        position = bisect.bisect_left(other_ids, self._row_sort_key(item_id), key=self._row_sort_key)
+        if self._sort_reverse:
+            position = len(other_ids) - position
+        self.item_tree.move(item_id, "", position)
+
+    def _sort_by_column(self, column):
+        """
+        Sorts the table by the clicked column. Clicking the same column again flips the order.
+        Nothing gets sorted here: the manager keeps a sort index per column, so the rows are simply
+        read off it in order (and backwards for the flipped order).
+        """
+        if self._sort_column == column:
+            self._sort_reverse = not self._sort_reverse
+        else:
+            self._sort_column = column
+            self._sort_reverse = False
+
+        if self.virtual_mode:
+            self._row_offset = 0
+            self._render_virtual_window()
+        else:
+            ordered_ids = [item_id for item_id, _item in self.inventory_manager.iter_items(**self._table_query())]
+            for position, item_id in enumerate(ordered_ids):
+                if self.item_tree.exists(item_id):
+                    self.item_tree.move(item_id, "", position)
+
+    def _apply_filter_gui(self):
+        """
+        Handles the 'Filter' button: only the items whose chosen column is at least 'from' and below 'below'
+        stay in the table. Either box can be left empty (e.g. just 'below 10' for items running low).
+        """
+        column = self.filter_column_var.get()
+        low_str = self.filter_low_entry.get().strip()
+        high_str = self.filter_high_entry.get().strip()
+        try:
+            low = float(low_str) if low_str else None
+            high = float(high_str) if high_str else None
+        except ValueError:
+            messagebox.showerror("Input Error", "Please enter numbers (e.g., 0 and 10) for the filter range, or leave a box empty.")
+            return
+        if low is None and high is None:
+            self._clear_filter_gui()
+            return
+        if low is not None and high is not None and low >= high:
+            messagebox.showerror("Input Error", "The 'from' value has to be smaller than the 'below' value.")
+            return
+
+        self._row_filter = (column, low, high)
+        self._row_offset = 0
+        self._update_item_list()
+
+    def _clear_filter_gui(self):
+        """Handles the 'Show All' button: drops the filter and shows every item again."""
+        self.filter_low_entry.delete(0, tk.END)
+        self.filter_high_entry.delete(0, tk.END)
+        if self._row_filter is not None:
+            self._row_filter = None
+            self._row_offset = 0
+            self._update_item_list()
+
+    # --- Virtual table: only the visible window of rows is ever created ---
+
+    def _virtual_row_id(self, position):
+        if self._sort_reverse:
+            return self._row_order[len(self._row_order) - 1 - position]
+        return self._row_order[position]
+
+    def _on_virtual_change(self, change, item_id):
+        """
+        Redraws the visible window after a change. A sorted or filtered table reads its rows off the
+        manager's sort indexes, which the change has already updated; otherwise the list of item ids
+        (in the order they were added) is kept in step here.
+        """
+        if not self._uses_manager_order():
+            if change == "deleted" and item_id in self._row_order:
+                self._row_order.remove(item_id)
+            elif change == "added":
+                self._row_order.append(item_id)
+        self._render_virtual_window()
+
+    def _virtual_row_count(self):
+        if self._row_filter is not None:
+            column, low, high = self._row_filter
+            return self.inventory_manager.count_items(self.column_fields[column], low, high)
+        if self._sort_column is not None:
+            return len(self.inventory_manager.items_view())
+        return len(self._row_order)
+
+    def _virtual_rows(self, first_row, row_count):
+        """The (item_id, item) pairs shown in rows first_row, first_row + 1, ... of the virtual table."""
+        if self._uses_manager_order():
+            # One short walk over a sort index, however big the inventory is.
+            return list(self.inventory_manager.iter_items(first_row, row_count, **self._table_query()))
+        all_items = self.inventory_manager.items_view()
+        last_row = min(len(self._row_order), first_row + row_count)
+        return [(item_id, all_items[item_id]) for item_id in map(self._virtual_row_id, range(first_row, last_row))]
+
+    def _render_virtual_window(self):
+        """
+        Fills the Treeview with just the rows from '_row_offset' onwards that fit on screen
+        (plus a couple of buffer rows), and moves the scrollbar to match.
+        """
+        total_rows = self._virtual_row_count()
+        self._row_offset = max(0, min(self._row_offset, total_rows - self._visible_rows))
+        first_row = self._row_offset
+
+        self.item_tree.delete(*self.item_tree.get_children())
+        for item_id, item_details in self._virtual_rows(first_row, self._visible_rows + self.virtual_buffer_rows):
+            row_tags = ("selected_row",) if item_id == self._selected_item_id else ()
+            self.item_tree.insert("", tk.END, iid=item_id, tags=row_tags,
+                                  values=self._tree_row_values(item_id, item_details))
+        if self._selected_item_id and self.item_tree.exists(self._selected_item_id):
+            self.item_tree.focus(self._selected_item_id)
+
+        if total_rows:
+            self.tree_scrollbar.set(first_row / total_rows, min(1.0, (first_row + self._visible_rows) / total_rows))
+        else:
+            self.tree_scrollbar.set(0.0, 1.0)
+
+    def _on_virtual_scroll(self, action, amount, unit=None):
+        """Handles the scrollbar: dragging ('moveto') and arrow/page clicks ('scroll')."""
+        if action == "moveto":
+            self._row_offset = int(float(amount) * self._virtual_row_count())
+        elif action == "scroll":
+            step = self._visible_rows if unit == "pages" else 1
+            self._row_offset += int(amount) * step
+        self._render_virtual_window()
+
+    def _on_virtual_mousewheel(self, event):
+        self._on_virtual_scroll("scroll", -3 if event.delta > 0 else 3, "units")
+        return "break"
+
+    def _on_virtual_resize(self, event):
+        """Works out how many rows fit now that the table changed size."""
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        # One row's worth of height goes to the column headings.
+        self._visible_rows = max(1, event.height // row_height - 1)
+        self._render_virtual_window()
+
+    def _on_virtual_arrow_key(self, step):
+        """
+        Arrow keys inside the window are left to the Treeview. At the top or bottom edge
+        we scroll the window by one row and select the next item, like a normal table would.
+        """
+        focused_item_id = self.item_tree.focus()
+        visible_ids = self.item_tree.get_children()[:self._visible_rows]
+        if focused_item_id not in visible_ids:
+            return None
+        next_index = visible_ids.index(focused_item_id) + step
+        if 0 <= next_index < len(visible_ids):
+            return None
+
+        next_position = self._row_offset + next_index
+        if not 0 <= next_position < self._virtual_row_count():
+            return "break"
+        self._on_virtual_scroll("scroll", step, "units")
+        for next_item_id, _item_details in self._virtual_rows(next_position, 1):
+            if self.item_tree.exists(next_item_id):
+                self.item_tree.selection_set(next_item_id)
+                self.item_tree.focus(next_item_id)
+        return "break"
+
     def _update_item_list(self):
-        
-        for item_in_tree in self.item_tree.get_children():
-            self.item_tree.delete(item_in_tree)
+        """
+        Rebuilds the whole inventory table from scratch. Day-to-day changes are patched in by
+        _on_inventory_change; this full rebuild is only used at startup and as a fallback.
+        """
+        if self.virtual_mode:
+            # Sorted or filtered, the rows are read off the manager's sort indexes (see _virtual_rows).
+            self._row_order = [] if self._uses_manager_order() else list(self.inventory_manager.items_view())
+            self._render_virtual_window()
+            self._update_autocomplete_suggestions()
+            self._update_total_value_label()
+            return
 
-        all_current_items = self.inventory_manager.get_all_items()
-        
-        for item_unique_id, item_details in all_current_items.items():
+        self.item_tree.delete(*self.item_tree.get_children())
+
+        if self._uses_manager_order():
+            table_rows = self.inventory_manager.iter_items(**self._table_query())
+        else:
+            # The window is the thread that changes the inventory, so it can read the live view without a copy.
+            table_rows = self.inventory_manager.items_view().items()
+        for item_unique_id, item_details in table_rows:
             self.item_tree.insert("", tk.END, iid=item_unique_id,
-                                  values=(item_details["name"],
-                                          item_details["quantity"],
-                                          f"₹{item_details['price']:.2f}",
-                                          f"₹{item_details['stock_value']:.2f}",
-                                          item_unique_id))
+                                  values=self._tree_row_values(item_unique_id, item_details))
         
         self._update_autocomplete_suggestions()
+        self._update_total_value_label()
 
 
-if __name__ == "__main__":
+# Scaled copies of the logo are cached in this folder next to the image.
+LOGO_CACHE_FOLDER = ".logo_cache"
+
+
+def _load_logo(image_path, target_width=50, target_height=50):
+    """
+    Returns the logo as a Tk image, scaled to fit in target_width x target_height (keeping its aspect ratio).
+
+    Scaling with Pillow's LANCZOS filter is one of the slowest steps of startup, so the scaled logo is saved as a PNG
+    whose name holds the source's modification time and the target size. Later starts load that file straight into
+    Tk without even importing Pillow. Editing the logo or asking for another size simply makes a new cache entry.
+    Raises FileNotFoundError if the image isn't there.
+    """
+    source_mtime = os.stat(image_path).st_mtime_ns
+    cache_folder = os.path.join(os.path.dirname(image_path), LOGO_CACHE_FOLDER)
+    cache_prefix = f"{os.path.splitext(os.path.basename(image_path))[0]}-{target_width}x{target_height}-"
+    cache_path = os.path.join(cache_folder, f"{cache_prefix}{source_mtime}.png")
+    if os.path.exists(cache_path):
+        try:
+            return tk.PhotoImage(file=cache_path)
+        except tk.TclError:
+            pass # A damaged cache file; it gets made again below.
+
+    _load_pillow()
+    original_image = Image.open(image_path)
+    # Resize image while maintaining aspect ratio
+    original_width, original_height = original_image.size
+    aspect_ratio = original_width / original_height
+    if target_width / target_height > aspect_ratio:
+        # Target is wider, so scale by height
+        new_height = target_height
+        new_width = int(new_height * aspect_ratio)
+    else:
+        # Target is taller or aspect ratios match, so scale by width
+        new_width = target_width
+        new_height = int(new_width / aspect_ratio)
+    resized_image = original_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+
+    try:
+        os.makedirs(cache_folder, exist_ok=True)
+        # Copies made from an older version of the logo are no use any more.
+        for old_name in os.listdir(cache_folder):
+            if old_name.startswith(cache_prefix):
+                os.remove(os.path.join(cache_folder, old_name))
+        resized_image.save(cache_path + ".tmp", "PNG")
+        os.replace(cache_path + ".tmp", cache_path)
+    except OSError as e:
+        print(f"Couldn't cache the scaled logo (it will be scaled again next time): {e}")
+    return ImageTk.PhotoImage(resized_image)
+
+
+def run_gui(startup_report=False, instrumentation=None):
+    """Opens the inventory window and runs it until it's closed."""
+    _load_gui_modules()
+    print('-------------------------------------------------------------------------------------------------')
     root = tk.Tk()
-    app = InventoryApp(root)
+    app = InventoryApp(root, startup_report=startup_report, instrumentation=instrumentation)
     root.mainloop()
+
+
+def _report_instrumentation(instrumentation, profile_folder):
+    """Prints what the instrumentation recorded and saves the profiles, if any were taken."""
+    instrumentation.sink.report()
+    for path in instrumentation.dump_profiles(profile_folder):
+        print(f"Profile saved to '{path}' (open it with: python -m pstats {path}).")
+
+
+def _find_item_id(manager, name_or_id):
+    """Command-line items can be given by name or by ID."""
+    if name_or_id in manager.items:
+        return name_or_id
+    found = manager.get_item_by_name(name_or_id)
+    return found[0] if found else None
+
+
+def _show_locations(locations, item_name=None):
+    """The 'locations' command: every location's stock, or how much of one item each location has."""
+    if item_name is not None:
+        stock = locations.global_stock(item_name)
+        for location, quantity in sorted(stock["locations"].items()):
+            print(f"{location:<20} {quantity:>10}")
+        print(f"'{item_name}': {stock['quantity']} in stock across {len(stock['locations'])} locations, worth ₹{stock['stock_value']:.2f}.")
+        return 0 if stock["locations"] else 1
+    by_location = locations.stock_by_location()
+    for location, summary in by_location.items():
+        print(f"{location:<20} {summary['items']:>8} items  ₹{summary['stock_value']:>14.2f}")
+    print(f"Total stock value: ₹{math.fsum(summary['stock_value'] for summary in by_location.values()):.2f} "
+          f"across {len(by_location)} locations.")
+    return 0
+
+
+def main(argv=None):
+    """
+    The command line. Without a command it opens the window, just like before (python mod.py).
+    With a command it works on the inventory without any GUI, for scripts and batch jobs:
+
+        python mod.py add "Blue Pens" 100 12.5
+        python mod.py spend "Blue Pens" 3
+        python mod.py list --limit 20
+        python mod.py import deliveries.csv
+        python mod.py --location mumbai add "Blue Pens" 40 12.5
+        python mod.py locations --item "Blue Pens"
+
+    Returns the exit code: 0 on success, 1 if the inventory said no.
+    """
+    parser = argparse.ArgumentParser(prog="mod.py", description="NeoASJ's Inventory System. Run without a command to open the window.")
+    parser.add_argument("--data-file", default="inventory.json", help="Inventory file (default: inventory.json).")
+    parser.add_argument("--storage-mode", default="journal", choices=("snapshot", "journal", "sqlite"),
+                        help="How changes are saved (default: journal, like the window).")
+    parser.add_argument("--snapshot-format", default="json", choices=("json", "binary"), help="Snapshot file format (default: json).")
+    parser.add_argument("--location", help="Work on this location's inventory in --locations-folder instead of --data-file (commands only, not the window).")
+    parser.add_argument("--locations-folder", default="locations", help="Where the location inventories live (default: locations).")
+    parser.add_argument("--metrics", action="store_true", help="Time the hot paths and print the numbers at the end.")
+    parser.add_argument("--profile", action="append", default=[], metavar="OPERATION",
+                        help="Run this operation under cProfile, e.g. add_item, storage.save_all or app._update_item_list (repeatable).")
+    parser.add_argument("--profile-dir", default="profiles", help="Where --profile saves its stats (default: profiles).")
+    commands = parser.add_subparsers(dest="command")
+    gui_parser = commands.add_parser("gui", help="Open the window (the default).")
+    gui_parser.add_argument("--startup-report", action="store_true", help="Print how long each step of startup took.")
+    list_parser = commands.add_parser("list", help="List items in name order.")
+    list_parser.add_argument("--offset", type=int, default=0)
+    list_parser.add_argument("--limit", type=int, default=50)
+    show_parser = commands.add_parser("show", help="Show one item.")
+    show_parser.add_argument("item", help="Item name or ID.")
+    add_parser = commands.add_parser("add", help="Add stock (creates the item or adds to it).")
+    add_parser.add_argument("name")
+    add_parser.add_argument("quantity", type=int)
+    add_parser.add_argument("price", type=float)
+    spend_parser = commands.add_parser("spend", help="Record units of an item as spent.")
+    spend_parser.add_argument("item", help="Item name or ID.")
+    spend_parser.add_argument("amount", type=int)
+    update_parser = commands.add_parser("update", help="Set an item's quantity and/or price.")
+    update_parser.add_argument("item", help="Item name or ID.")
+    update_parser.add_argument("--quantity", type=int)
+    update_parser.add_argument("--price", type=float)
+    delete_parser = commands.add_parser("delete", help="Delete an item.")
+    delete_parser.add_argument("item", help="Item name or ID.")
+    import_parser = commands.add_parser("import", help="Import a CSV or JSON Lines file.")
+    import_parser.add_argument("path")
+    export_parser = commands.add_parser("export", help="Export to a CSV or JSON Lines file.")
+    export_parser.add_argument("path")
+    commands.add_parser("value", help="Show the total stock value.")
+    locations_parser = commands.add_parser("locations", help="Show the stock of every location (or of one item across them).")
+    locations_parser.add_argument("--item", help="Item name to add up across all locations.")
+    locations_parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU, 0 for none).")
+    args = parser.parse_args(argv)
+    instrumentation = Instrumentation(profile=args.profile) if args.metrics or args.profile else None
+
+    if args.command in (None, "gui"):
+        run_gui(startup_report=getattr(args, "startup_report", False), instrumentation=instrumentation)
+        if instrumentation is not None:
+            _report_instrumentation(instrumentation, args.profile_dir)
+        return 0
+
+    if args.command == "locations" or args.location is not None:
+        locations = ShardedInventory(args.locations_folder, storage_mode=args.storage_mode, snapshot_format=args.snapshot_format,
+                                     workers=getattr(args, "workers", None), instrumentation=instrumentation)
+        if args.command == "locations":
+            try:
+                return _show_locations(locations, args.item)
+            finally:
+                locations.close()
+        try:
+            manager = locations.location(args.location)
+        except ValueError as e:
+            locations.close()
+            parser.error(str(e))
+    else:
+        locations = None
+        manager = InventoryManager(args.data_file, storage_mode=args.storage_mode, snapshot_format=args.snapshot_format,
+                                   instrumentation=instrumentation)
+    try:
+        if args.command == "list":
+            total, page = manager.list_items(args.offset, args.limit)
+            for item_id, item in page:
+                print(f"{item['name']:<30} {item['quantity']:>8}  ₹{item['price']:>10.2f}  ₹{item['stock_value']:>12.2f}  {item_id}")
+            print(f"Showing {len(page)} of {total} items.")
+            return 0
+        if args.command == "value":
+            print(f"Total stock value: ₹{manager.total_stock_value():.2f} across {len(manager.items)} items.")
+            return 0
+        if args.command == "import":
+            summary = manager.import_file(args.path)
+            return 1 if summary["errors"] else 0
+        if args.command == "export":
+            manager.export_file(args.path)
+            return 0
+        if args.command == "add":
+            message = manager.add_item(args.name, args.quantity, args.price)
+        else:
+            item_id = _find_item_id(manager, args.item)
+            if item_id is None:
+                message = f"Error: Couldn't find an item named (or with ID) '{args.item}'."
+            elif args.command == "show":
+                item = manager.items[item_id]
+                message = (f"Success: '{item['name']}' (ID: {item_id}): {item['quantity']} in stock at ₹{item['price']:.2f} each, "
+                           f"worth ₹{item['stock_value']:.2f}.")
+            elif args.command == "spend":
+                message = manager.record_spend(item_id, args.amount)
+            elif args.command == "update":
+                message = manager.update_item(item_id, args.quantity, args.price)
+            else:
+                message = manager.delete_item(item_id)
+        print(message)
+        return 0 if message.startswith("Success") else 1
+    finally:
+        if locations is not None:
+            locations.close()
+        else:
+            manager.close()
+        if instrumentation is not None:
+            _report_instrumentation(instrumentation, args.profile_dir)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
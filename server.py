@@ -0,0 +1,330 @@
+"""
+A small HTTP/JSON API for the inventory, so other systems (tills, scanners, reports) can use it too.
+
+Start it from the project folder:
+
+    python server.py --port 8080
+
+and talk to it with any HTTP client:
+
+    GET    /items?offset=0&limit=50     one page of items in name order, plus the total count
+    POST   /items                       {"name": ..., "quantity": ..., "price": ...}, same rules as Add Item
+    GET    /items/<id>                  one item
+    PATCH  /items/<id>                  {"quantity": ...} and/or {"price": ...}
+    POST   /items/<id>/spend            {"amount": ...}
+    DELETE /items/<id>
+    GET    /lookup?name=<name>          find an item by name (case-insensitive)
+    GET    /names?prefix=<text>         item names starting with 'prefix' (for autocomplete)
+
+Every answer is JSON. Items look like {"id", "name", "quantity", "price", "stock_value"};
+failures look like {"error": "..."} with a 4xx status.
+
+The server runs on one asyncio event loop, so thousands of open connections cost very little.
+Lookups are answered right on the loop (they never wait for writers), while changes are handed
+to a thread pool because saving them can block on the disk.
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import math
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from mod import InventoryManager
+
+
+# Biggest request body we accept. Item changes are tiny, so anything bigger is a mistake.
+MAX_BODY_BYTES = 1024 * 1024
+
+_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+            405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    """Raised while handling a request to answer it with an error status and message."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _item_payload(item_id, item):
+    return {"id": item_id, "name": item["name"], "quantity": item["quantity"],
+            "price": item["price"], "stock_value": item["stock_value"]}
+
+
+def _query_int(query, name, default, minimum=0):
+    try:
+        value = int(query.get(name, [default])[0])
+    except ValueError:
+        raise HttpError(400, f"'{name}' must be a whole number.")
+    if value < minimum:
+        raise HttpError(400, f"'{name}' can't be less than {minimum}.")
+    return value
+
+
+def _body_number(body, name):
+    """
+    Reads a number from the JSON body, or None if it isn't there. Only the JSON type is checked here;
+    whether it's an acceptable quantity or price is up to the manager, so the API follows the same rules as Add Item.
+    """
+    value = body.get(name)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise HttpError(400, f"'{name}' must be a number.")
+    # json.loads() accepts NaN and Infinity, which no quantity or price can be.
+    if isinstance(value, float) and not math.isfinite(value):
+        raise HttpError(400, f"'{name}' must be a finite number.")
+    return value
+
+
+class InventoryServer:
+    """
+    Serves an InventoryManager over HTTP with JSON bodies (see the module docstring for the routes).
+    'executor' runs the changes; by default a pool of 'worker_threads' threads is created and shut down with the server.
+    """
+
+    def __init__(self, manager, host="127.0.0.1", port=8080, executor=None, worker_threads=8):
+        self.manager = manager
+        self.host = host
+        self.port = port
+        self._own_executor = executor is None
+        self.executor = executor or concurrent.futures.ThreadPoolExecutor(worker_threads, thread_name_prefix="inventory-api")
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port, backlog=1024)
+        # With port=0 the OS picks a free port; remember which one.
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"Inventory API listening on http://{self.host}:{self.port}/")
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        """Stops accepting connections and waits for the changes already handed to the workers."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._own_executor:
+            await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+
+    # --- HTTP plumbing ---
+
+    async def _handle_connection(self, reader, writer):
+        """Answers requests on one connection until the client closes it (keep-alive is supported)."""
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HttpError as e:
+                    await self._send(writer, e.status, {"error": e.message}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, target, headers, body, keep_alive = request
+                try:
+                    status, payload = await self._dispatch(method, target, body)
+                except HttpError as e:
+                    status, payload = e.status, {"error": e.message}
+                except Exception as e:
+                    print(f"Oops! The inventory API hit an unexpected error: {e}")
+                    status, payload = 500, {"error": "Something went wrong on the server."}
+                await self._send(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        """Reads one request. Returns (method, target, headers, body, keep_alive), or None once the client is done."""
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return None
+            parts = request_line.decode("latin-1").split()
+            if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+                raise HttpError(400, "That doesn't look like an HTTP request.")
+            method, target, version = parts
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+        except (ValueError, asyncio.LimitOverrunError):
+            raise HttpError(400, "The request line or headers are too long.")
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HttpError(400, "Content-Length must be a number.")
+        if length < 0:
+            raise HttpError(400, "Content-Length can't be negative.")
+        if length > MAX_BODY_BYTES:
+            raise HttpError(413, f"Request bodies can be at most {MAX_BODY_BYTES} bytes.")
+        body = await reader.readexactly(length) if length > 0 else b""
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        return method.upper(), target, headers, body, keep_alive
+
+    async def _send(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    @staticmethod
+    def _json_body(body):
+        if not body:
+            return {}
+        try:
+            parsed = json.loads(body)
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise HttpError(400, "The request body must be valid JSON.")
+        if not isinstance(parsed, dict):
+            raise HttpError(400, "The request body must be a JSON object.")
+        return parsed
+
+    async def _run_change(self, change, *args):
+        """Runs a manager method that changes (and saves) the inventory on the worker threads."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, change, *args)
+
+    # --- Routes ---
+
+    async def _dispatch(self, method, target, body):
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        parts = [unquote(part) for part in url.path.strip("/").split("/") if part]
+
+        if parts == ["items"]:
+            if method == "GET":
+                return self._list_items(query)
+            if method == "POST":
+                return await self._add_item(self._json_body(body))
+        elif len(parts) == 2 and parts[0] == "items":
+            item_id = parts[1]
+            if method == "GET":
+                return 200, self._existing_item(item_id)
+            if method == "PATCH":
+                return await self._update_item(item_id, self._json_body(body))
+            if method == "DELETE":
+                self._existing_item(item_id)
+                return self._result(await self._run_change(self.manager.delete_item, item_id), {"id": item_id})
+        elif len(parts) == 3 and parts[0] == "items" and parts[2] == "spend":
+            if method == "POST":
+                return await self._record_spend(parts[1], self._json_body(body))
+        elif parts == ["lookup"]:
+            if method == "GET":
+                return self._lookup(query)
+        elif parts == ["names"]:
+            if method == "GET":
+                limit = _query_int(query, "limit", 20, minimum=1)
+                return 200, {"names": self.manager.get_names_with_prefix(query.get("prefix", [""])[0], limit=limit)}
+        else:
+            raise HttpError(404, f"There's nothing at '{url.path}'.")
+        raise HttpError(405, f"'{url.path}' doesn't support {method}.")
+
+    def _existing_item(self, item_id):
+        item = self.manager.items_view().get(item_id)
+        if item is None:
+            raise HttpError(404, f"Couldn't find any item with ID '{item_id}'.")
+        return _item_payload(item_id, item)
+
+    def _result(self, message, payload):
+        """Turns the manager's "Success..."/"Error: ..." message into a response."""
+        if not message.startswith("Success"):
+            raise HttpError(400, message)
+        payload["message"] = message
+        return 200, payload
+
+    def _list_items(self, query):
+        offset = _query_int(query, "offset", 0)
+        limit = min(_query_int(query, "limit", 50, minimum=1), 1000)
+        total, page = self.manager.list_items(offset, limit)
+        return 200, {"total": total, "offset": offset, "limit": limit,
+                     "items": [_item_payload(item_id, item) for item_id, item in page]}
+
+    def _lookup(self, query):
+        name = query.get("name", [""])[0]
+        found = self.manager.get_item_by_name(name)
+        if found is None:
+            raise HttpError(404, f"Couldn't find an item named '{name}'.")
+        return 200, _item_payload(*found)
+
+    async def _add_item(self, body):
+        name = body.get("name")
+        if not isinstance(name, str):
+            raise HttpError(400, "'name' must be a string.")
+        quantity = _body_number(body, "quantity")
+        price = _body_number(body, "price")
+        if quantity is None or price is None:
+            raise HttpError(400, "New stock needs a 'quantity' and a 'price'.")
+        message = await self._run_change(self.manager.add_item, name, quantity, price)
+        if not message.startswith("Success"):
+            raise HttpError(400, message)
+        found = self.manager.get_item_by_name(name)
+        payload = _item_payload(*found) if found else {}
+        payload["message"] = message
+        return (201 if message.startswith("Success!") else 200), payload
+
+    async def _update_item(self, item_id, body):
+        self._existing_item(item_id)
+        quantity = _body_number(body, "quantity")
+        price = _body_number(body, "price")
+        message = await self._run_change(self.manager.update_item, item_id, quantity, price)
+        status, payload = self._result(message, {})
+        return status, dict(self._existing_item(item_id), **payload)
+
+    async def _record_spend(self, item_id, body):
+        self._existing_item(item_id)
+        amount = _body_number(body, "amount")
+        if amount is None:
+            raise HttpError(400, "Say how much was spent with 'amount'.")
+        message = await self._run_change(self.manager.record_spend, item_id, amount)
+        status, payload = self._result(message, {})
+        return status, dict(self._existing_item(item_id), **payload)
+
+
+async def run_server(manager, host, port, worker_threads):
+    server = InventoryServer(manager, host, port, worker_threads=worker_threads)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the inventory over a local HTTP/JSON API.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1, this machine only).")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080).")
+    parser.add_argument("--data-file", default="inventory.json", help="Inventory file to serve (default: inventory.json).")
+    parser.add_argument("--storage-mode", default="journal", choices=("snapshot", "journal", "sqlite"),
+                        help="How changes are saved (default: journal).")
+    parser.add_argument("--workers", type=int, default=8, help="Threads that apply and save changes (default: 8).")
+    args = parser.parse_args()
+
+    manager = InventoryManager(args.data_file, storage_mode=args.storage_mode)
+    try:
+        asyncio.run(run_server(manager, args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        print("Shutting down the inventory API...")
+    finally:
+        manager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import os
+import shutil
+import struct
+import tempfile
+import time
+import unittest
+import uuid
+
+from mod import InventoryManager, MovementLedger
+
+
+class FailingLedgerTests(unittest.TestCase):
+    """A ledger write that fails must leave the inventory exactly as it was."""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.data_file = os.path.join(self.folder, "inventory.json")
+        self.manager = InventoryManager(self.data_file)
+        self.manager.add_item("Flour", 10, 2.0)
+        self.manager.add_item("Sugar", 4, 3.5)
+        self.flour_id = self._id_of("Flour")
+        # Build the sort indexes up front, so the test also covers keeping them in step.
+        self.manager.build_sort_indexes()
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def _id_of(self, name):
+        return next(item_id for item_id, item in self.manager.items.items() if item["name"] == name)
+
+    def _state(self):
+        items = {item_id: (item["name"], item["quantity"], item["price"]) for item_id, item in self.manager.items.items()}
+        by_quantity = [item_id for item_id, _item in self.manager.iter_items(sort_key="quantity")]
+        with open(self.data_file, 'rb') as f:
+            on_disk = f.read()
+        return items, dict(self.manager._name_index), self.manager.total_stock_value(), by_quantity, on_disk
+
+    def _break_ledger(self):
+        def record_many(movements, timestamp=None):
+            raise OSError("No space left on device")
+        self.manager.ledger.record_many = record_many
+
+    def assertUnchangedAfter(self, change):
+        before = self._state()
+        self._break_ledger()
+        with self.assertRaises(OSError):
+            change()
+        self.assertEqual(self._state(), before)
+
+    def test_add_new_item(self):
+        self.assertUnchangedAfter(lambda: self.manager.add_item("Salt", 5, 1.0))
+
+    def test_add_to_existing_item(self):
+        self.assertUnchangedAfter(lambda: self.manager.add_item("Flour", 2.5, 2.0))
+
+    def test_spend(self):
+        self.assertUnchangedAfter(lambda: self.manager.record_spend(self.flour_id, 1.5))
+
+    def test_update(self):
+        self.assertUnchangedAfter(lambda: self.manager.update_item(self.flour_id, 7, 9.0))
+
+    def test_delete(self):
+        self.assertUnchangedAfter(lambda: self.manager.delete_item(self.flour_id))
+
+    def test_transaction(self):
+        def change():
+            with self.manager.transaction() as batch:
+                batch.spend(self.flour_id, 3)
+                batch.add("Salt", 5, 1.0)
+        self.assertUnchangedAfter(change)
+
+
+class TransactionMovementTests(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.manager = InventoryManager(os.path.join(self.folder, "inventory.json"))
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_item_added_and_deleted_in_one_transaction_leaves_no_movements(self):
+        transaction = self.manager.transaction()
+        first = transaction.add("Flour", 10, 2.0)
+        transaction.spend(first, 4)
+        transaction.delete(first)
+        transaction.add("Flour", 3, 2.0)
+        self.assertTrue(transaction.commit()["applied"])
+
+        (flour_id, flour), = self.manager.items.items()
+        self.assertEqual(flour["quantity"], 3)
+        self.assertEqual([(kind, change) for _t, kind, change, _price, _key in self.manager.ledger.movements()], [("add", 3)])
+        self.assertEqual(self.manager.ledger.rollup(flour_id, "day", 1)[0][1:], (3, 0))
+
+
+    def test_add_to_existing_item_returns_a_usable_id(self):
+        self.manager.add_item("Flour", 5, 2.0)
+        flour_id = next(iter(self.manager.items))
+        with self.manager.transaction() as transaction:
+            added_id = transaction.add("flour ", 10, 2.0)
+            transaction.spend(added_id, 4)
+        self.assertEqual(list(self.manager.items), [flour_id])
+        self.assertEqual(self.manager.items[flour_id]["quantity"], 11)
+        self.assertEqual([(kind, change) for _t, kind, change, _price, _key in self.manager.ledger.movements()],
+                         [("add", 5), ("add", 10), ("spend", -4)])
+
+
+class LedgerFormatTests(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.ledger_file = os.path.join(self.folder, "inventory.ledger")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_fractional_quantities_are_kept(self):
+        ledger = MovementLedger(self.ledger_file)
+        item_id = str(uuid.uuid4())
+        ledger.record("add", item_id, 2.5, 4.0)
+        ledger.record("spend", item_id, -0.75, 4.0)
+        ledger.close()
+
+        reopened = MovementLedger(self.ledger_file)
+        self.assertEqual([change for _t, _kind, change, _price, _key in reopened.movements(item_id)], [2.5, -0.75])
+        _start, added, spent = reopened.rollup(item_id, "day", 1)[0]
+        self.assertEqual((added, spent), (2.5, 0.75))
+        reopened.close()
+
+    def test_old_whole_number_ledger_is_upgraded(self):
+        item_id = str(uuid.uuid4())
+        old_record = struct.Struct("<dBqd16s")
+        with open(self.ledger_file, 'wb') as f:
+            f.write(b"INVLEDG1")
+            f.write(old_record.pack(time.time(), 1, 10, 2.0, uuid.UUID(item_id).bytes))
+            f.write(old_record.pack(time.time(), 2, -3, 2.0, uuid.UUID(item_id).bytes))
+
+        ledger = MovementLedger(self.ledger_file)
+        ledger.record("spend", item_id, -0.5, 2.0)
+        self.assertEqual([change for _t, _kind, change, _price, _key in ledger.movements(item_id)], [10, -3, -0.5])
+        ledger.close()
+        with open(self.ledger_file, 'rb') as f:
+            self.assertEqual(f.read(8), MovementLedger._MAGIC)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import array
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from mod import BinarySnapshotStorage, InventoryManager, SQLiteStorage
+
+
+class BinarySnapshotTests(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.data_file = os.path.join(self.folder, "inventory.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def _reloaded_quantities(self, storage_mode):
+        manager = InventoryManager(self.data_file, storage_mode=storage_mode, snapshot_format="binary")
+        manager.add_item("Flour", 2.5, 2.0)
+        manager.add_item("Sugar", 4, 3.5)
+        manager.close()
+        reloaded = InventoryManager(self.data_file, storage_mode=storage_mode, snapshot_format="binary")
+        quantities = {item["name"]: item["quantity"] for item in reloaded.items.values()}
+        reloaded.close()
+        return quantities
+
+    def test_fractional_quantity_survives_a_reload(self):
+        for storage_mode in ("snapshot", "journal"):
+            with self.subTest(storage_mode=storage_mode):
+                quantities = self._reloaded_quantities(storage_mode)
+                self.assertEqual(quantities, {"Flour": 2.5, "Sugar": 4})
+                self.assertIsInstance(quantities["Sugar"], int)
+                shutil.rmtree(self.folder)
+                os.mkdir(self.folder)
+
+    def test_old_whole_number_snapshot_still_loads(self):
+        storage = BinarySnapshotStorage(os.path.join(self.folder, "old.snap"))
+        id_offsets, id_text = storage._pack_texts(["a1"])
+        name_offsets, name_text = storage._pack_texts(["Flour"])
+        body = bytearray()
+        for section in (storage._array_bytes(id_offsets), id_text.encode("utf-8"),
+                        storage._array_bytes(name_offsets), name_text.encode("utf-8"),
+                        storage._array_bytes(array.array("q", [7])), storage._array_bytes(array.array("d", [2.0]))):
+            body += storage._SECTION_LENGTH.pack(len(section)) + section
+        with open(storage.data_file, 'wb') as f:
+            f.write(storage._HEADER.pack(b"INVSNAP1", 1, hashlib.sha256(body).digest()) + bytes(body))
+
+        items = storage.load()
+        self.assertEqual((items["a1"]["name"], items["a1"]["quantity"], items["a1"]["price"]), ("Flour", 7, 2.0))
+
+
+class SQLiteStorageTests(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.data_file = os.path.join(self.folder, "inventory.json")
+        self.db_file = os.path.join(self.folder, "inventory.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def _saved_quantities(self):
+        storage = SQLiteStorage(self.db_file)
+        quantities = {details["name"]: details["quantity"] for details in storage.read_items().values()}
+        storage.close({})
+        return quantities
+
+    def test_locked_database_is_reported_and_caught_up_later(self):
+        manager = InventoryManager(self.data_file, storage_mode="sqlite", sqlite_commit_every=1)
+        # Fail straight away instead of waiting for the lock.
+        manager.storage._connection.execute("PRAGMA busy_timeout = 0")
+        other = sqlite3.connect(self.db_file)
+        other.execute("BEGIN IMMEDIATE")
+        try:
+            self.assertTrue(manager.add_item("Flour", 2.5, 2.0).startswith("Success"))
+        finally:
+            other.rollback()
+            other.close()
+        self.assertEqual(self._saved_quantities(), {})
+
+        manager.add_item("Sugar", 4, 3.5)
+        self.assertEqual(self._saved_quantities(), {"Flour": 2.5, "Sugar": 4})
+        manager.close()
+
+    def test_value_sqlite_cant_hold_is_reported_not_raised(self):
+        storage = SQLiteStorage(self.db_file)
+        items = {"a1": {"name": "Flour", "quantity": 10 ** 30, "price": 2.0}}
+        self.assertFalse(storage.write_changes(items, ["a1"]))
+        items["a1"]["quantity"] = 7
+        self.assertTrue(storage.flush(items))
+        storage.close(items)
+        self.assertEqual(self._saved_quantities(), {"Flour": 7})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+import asyncio
+import math
+import os
+import shutil
+import tempfile
+import unittest
+
+from mod import InventoryManager, TransactionError
+from server import HttpError, InventoryServer, _body_number
+
+
+class NonFiniteNumberTests(unittest.TestCase):
+    """NaN and infinity would poison the running totals and the sort indexes, so they're refused everywhere."""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.manager = InventoryManager(os.path.join(self.folder, "inventory.json"))
+        self.manager.add_item("Flour", 10, 2.0)
+        self.flour_id = next(iter(self.manager.items))
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_manager_refuses_non_finite_numbers(self):
+        for bad in (math.nan, math.inf):
+            self.assertTrue(self.manager.add_item("Salt", bad, 1.0).startswith("Error"))
+            self.assertTrue(self.manager.add_item("Salt", 1, bad).startswith("Error"))
+            self.assertTrue(self.manager.update_item(self.flour_id, new_quantity=bad).startswith("Error"))
+            self.assertTrue(self.manager.update_item(self.flour_id, new_price=bad).startswith("Error"))
+            self.assertTrue(self.manager.record_spend(self.flour_id, bad).startswith("Error"))
+        self.assertEqual(list(self.manager.items), [self.flour_id])
+        self.assertEqual(self.manager.total_stock_value(), 20.0)
+
+    def test_transaction_refuses_non_finite_numbers(self):
+        with self.assertRaises(TransactionError):
+            with self.manager.transaction() as batch:
+                batch.spend(self.flour_id, math.nan)
+        self.assertEqual(self.manager.items[self.flour_id]["quantity"], 10)
+
+    def test_quantities_past_the_storable_bound_are_refused(self):
+        too_many = InventoryManager.max_quantity + 1
+        self.assertTrue(self.manager.update_item(self.flour_id, new_quantity=10 ** 30).startswith("Error"))
+        self.assertTrue(self.manager.update_item(self.flour_id, new_quantity=too_many).startswith("Error"))
+        self.assertTrue(self.manager.add_item("Salt", too_many, 1.0).startswith("Error"))
+        self.assertTrue(self.manager.record_spend(self.flour_id, too_many).startswith("Error"))
+        # Merging a delivery into an existing item can't go past the bound either.
+        self.assertTrue(self.manager.add_item("Flour", InventoryManager.max_quantity, 2.0).startswith("Error"))
+        with self.assertRaises(TransactionError):
+            with self.manager.transaction() as batch:
+                batch.update(self.flour_id, quantity=too_many)
+        self.assertEqual(self.manager.items[self.flour_id]["quantity"], 10)
+        self.assertTrue(self.manager.update_item(self.flour_id, new_quantity=InventoryManager.max_quantity).startswith("Success"))
+
+    def test_api_refuses_non_finite_numbers(self):
+        for bad in (math.nan, math.inf, -math.inf):
+            with self.assertRaises(HttpError) as raised:
+                _body_number({"price": bad}, "price")
+            self.assertEqual(raised.exception.status, 400)
+        self.assertEqual(_body_number({"price": 2.5}, "price"), 2.5)
+        # Fractional quantities get through to the manager, which applies the Add Item rules.
+        self.assertEqual(_body_number({"quantity": 2.5}, "quantity"), 2.5)
+
+    def test_api_refuses_negative_content_length(self):
+        async def read(raw):
+            reader = asyncio.StreamReader()
+            reader.feed_data(raw)
+            reader.feed_eof()
+            return await InventoryServer(self.manager)._read_request(reader)
+
+        with self.assertRaises(HttpError) as raised:
+            asyncio.run(read(b"POST /items HTTP/1.1\r\nContent-Length: -5\r\n\r\n"))
+        self.assertEqual(raised.exception.status, 400)
+        self.assertEqual(asyncio.run(read(b"POST /items HTTP/1.1\r\nContent-Length: 2\r\n\r\n{}"))[3], b"{}")
+
+
+class RunningTotalTests(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.manager = InventoryManager(os.path.join(self.folder, "inventory.json"))
+        self.manager.add_item("Flour", 10, 2.0)
+        self.manager.add_item("Salt", 3, 1.0)
+        self.flour_id = self.manager.get_item_by_name("Flour")[0]
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_total_recovers_after_a_huge_value_leaves(self):
+        self.manager.update_item(self.flour_id, new_quantity=InventoryManager.max_quantity, new_price=1e18)
+        self.manager.update_item(self.flour_id, new_quantity=10, new_price=2.0)
+        self.assertEqual(self.manager.total_stock_value(), 23.0)
+
+        self.manager.update_item(self.flour_id, new_price=1e30)
+        self.manager.delete_item(self.flour_id)
+        self.assertEqual(self.manager.total_stock_value(), 3.0)
+
+
+class FilterBoundTests(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.manager = InventoryManager(os.path.join(self.folder, "inventory.json"))
+        self.manager.add_item("Flour", 10, 2.0)
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_bounds_must_match_the_field(self):
+        for field, bound in (("id", 5.0), ("quantity", "5"), ("price", True), ("stock_value", math.nan)):
+            with self.subTest(field=field, bound=bound):
+                with self.assertRaisesRegex(ValueError, "'low' has to be"):
+                    self.manager.count_items(field, low=bound)
+                with self.assertRaisesRegex(ValueError, "'high' has to be"):
+                    self.manager.iter_items(filter_field=field, high=bound)
+        self.assertEqual(self.manager.count_items("quantity", 5, 20), 1)
+        self.assertEqual(len(list(self.manager.iter_items(filter_field="id", low=""))), 1)
+
+
+class BulkUpsertTests(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.manager = InventoryManager(os.path.join(self.folder, "inventory.json"))
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_quantities_follow_the_add_item_rule(self):
+        summary = self.manager.bulk_upsert([
+            {"name": "Flour", "quantity": "4", "price": "2.5"},
+            {"name": "Sugar", "quantity": 2.7, "price": 1.0},
+            {"name": "Salt", "quantity": True, "price": 1.0},
+            {"name": "Rice", "quantity": "3.5", "price": 1.0},
+            {"name": "Oats", "quantity": "lots", "price": 1.0},
+            {"name": "Corn", "quantity": InventoryManager.max_quantity + 1, "price": 1.0},
+            {"name": "Rye", "quantity": 0, "price": 1.0},
+        ])
+        self.assertEqual(summary["added"], 3)
+        self.assertEqual([message.split(":")[0] for _record, message in summary["errors"]], ["Line 3", "Line 5", "Line 6", "Line 7"])
+        self.assertEqual(sorted((item["name"], item["quantity"]) for item in self.manager.items.values()),
+                         [("Flour", 4), ("Rice", 3.5), ("Sugar", 2.7)])
+
+        # add_item draws the line in the same places.
+        for quantity, accepted in ((2.7, True), (True, False), (InventoryManager.max_quantity + 1, False), (0, False)):
+            self.assertEqual(self.manager.add_item("Barley", quantity, 1.0).startswith("Success"), accepted)
+
+    def test_import_reports_file_line_numbers(self):
+        path = os.path.join(self.folder, "feed.jsonl")
+        with open(path, 'w') as f:
+            f.write('{"name": "Flour", "quantity": 4, "price": 2.5}\n\n{"name": "Sugar", "quantity": -1, "price": 1.0}\nnot json\n')
+        summary = self.manager.import_file(path)
+        self.assertEqual([message.split(":")[0] for _record, message in summary["errors"]], ["Line 3", "Line 4"])
+
+
+if __name__ == "__main__":
+    unittest.main()